@@ -0,0 +1,23 @@
+"""
+Benchmarks de ColorExcel.
+
+- ``generate`` construit des classeurs source/cible synthétiques ;
+- ``bench_logic`` mesure le temps et la mémoire des fonctions de ``logic``
+  et écrit les résultats en JSON ;
+- ``bench_startup`` mesure le temps d'import de ``colorexcel`` (scripts,
+  ligne de commande, interface) dans un interpréteur neuf ;
+- ``load_service`` est un test de charge local du service HTTP
+  (``colorexcel serve``).
+
+Exemple, depuis la racine du dépôt::
+
+    python -m benchmarks.bench_logic --rows 10000 100000 --output resultats.json
+"""
+
+import sys
+from pathlib import Path
+
+# Permettre l'exécution depuis la racine du dépôt sans installation du paquet
+_SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(_SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(_SRC_DIR))
@@ -0,0 +1,346 @@
+"""
+Benchmarks des fonctions de ``colorexcel.logic``.
+
+Chaque mesure est exécutée dans un processus neuf, afin que le pic de mémoire
+(RSS) d'une fonction ne soit pas masqué par les mesures précédentes. Les
+résultats sont écrits en JSON pour comparer les moteurs entre eux et détecter
+les régressions entre deux versions (``--baseline``).
+
+Utilisation::
+
+    python -m benchmarks.bench_logic --rows 10000 100000 1000000 \\
+        --output resultats.json --baseline precedents.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from importlib import metadata
+from multiprocessing import get_context
+from pathlib import Path
+
+from . import generate
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BENCHMARKS = (
+    "extract_theme_colors",
+    "get_sheet_names",
+    "get_implantation_colors",
+    "apply_color_map",
+    "apply_colors_to_file2",
+)
+
+# Seuil par défaut au-delà duquel un ralentissement est signalé
+DEFAULT_THRESHOLD = 1.25
+
+
+def _peak_rss_mb() -> float | None:
+    """Pic de mémoire résidente du processus courant, en Mio."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sous macOS et en kio ailleurs
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _summary(value):
+    """Résumé JSON du résultat d'une fonction mesurée."""
+    if isinstance(value, (dict, list)):
+        return {"entries": len(value)}
+    if isinstance(value, str) and os.path.exists(value):
+        return {"output_bytes": os.path.getsize(value)}
+    return {"value": None if value is None else str(value)}
+
+
+def run_case(case: dict) -> dict:
+    """
+    Exécute une mesure (dans le processus courant).
+
+    Args:
+        case: Description de la mesure (benchmark, fichiers, variante)
+
+    Returns:
+        Dictionnaire des résultats de la mesure
+    """
+    from colorexcel import logic
+    from colorexcel.output import is_scratch_output, release_output
+
+    benchmark = case["benchmark"]
+    source, target = case["source"], case["target"]
+    source_sheet, target_sheet = generate.SOURCE_SHEET, generate.TARGET_SHEET
+    output = Path(case["workdir"]) / f"sortie_{os.getpid()}.xlsx"
+
+    if benchmark == "extract_theme_colors":
+        call = partial(logic.extract_theme_colors, source)
+    elif benchmark == "get_sheet_names":
+        call = partial(logic.get_sheet_names, target)
+    elif benchmark == "get_implantation_colors":
+        call = partial(
+            logic.get_implantation_colors, source, source_sheet, engine=case["variant"]
+        )
+    elif benchmark == "apply_color_map":
+        # La carte est extraite avant la mesure : seule l'écriture est chronométrée
+        data_colors = logic.get_implantation_colors(source, source_sheet)
+        call = partial(
+            logic.apply_color_map,
+            data_colors,
+            target,
+            target_sheet,
+            output_path=str(output),
+            writer=case["variant"],
+        )
+    elif benchmark == "apply_colors_to_file2":
+        call = partial(
+            logic.apply_colors_to_file2,
+            source,
+            source_sheet,
+            target,
+            target_sheet,
+            writer=case["variant"],
+            use_cache=False,
+        )
+    else:
+        raise ValueError(f"Benchmark inconnu : {benchmark}")
+
+    rss_before = _peak_rss_mb()
+    if case["tracemalloc"]:
+        tracemalloc.start()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    value = call()
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    traced_peak = None
+    if case["tracemalloc"]:
+        traced_peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+
+    result = {
+        "benchmark": benchmark,
+        "variant": case["variant"],
+        "rows": case["rows"],
+        "wall_s": round(wall, 4),
+        "cpu_s": round(cpu, 4),
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": _peak_rss_mb(),
+        "tracemalloc_peak_mb": traced_peak,
+        **_summary(value),
+    }
+    if isinstance(value, str) and os.path.exists(value):
+        if is_scratch_output(value):
+            release_output(value)
+        else:
+            os.remove(value)
+    return result
+
+
+def _cases(args, rows: int, source: Path, target: Path):
+    """Énumère les mesures à effectuer pour une taille donnée."""
+    common = {
+        "rows": rows,
+        "source": str(source),
+        "target": str(target),
+        "workdir": str(args.workdir),
+        "tracemalloc": args.tracemalloc,
+    }
+    for benchmark in args.benchmarks:
+        if benchmark == "get_implantation_colors":
+            variants = args.engines
+        elif benchmark in ("apply_color_map", "apply_colors_to_file2"):
+            variants = args.writers
+        else:
+            variants = [None]
+        for variant in variants:
+            for _ in range(args.repeat):
+                yield {**common, "benchmark": benchmark, "variant": variant}
+
+
+def _package_version() -> str | None:
+    try:
+        return metadata.version("colorexcel")
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def compare(results: list[dict], baseline: list[dict], threshold: float) -> int:
+    """
+    Compare des résultats à ceux d'une exécution précédente.
+
+    Args:
+        results: Résultats de l'exécution courante
+        baseline: Résultats de référence
+        threshold: Rapport de temps au-delà duquel une mesure est en régression
+
+    Returns:
+        Nombre de mesures en régression
+    """
+
+    def best(entries):
+        times = {}
+        for entry in entries:
+            key = (entry["benchmark"], entry["variant"], entry["rows"])
+            times[key] = min(times.get(key, float("inf")), entry["wall_s"])
+        return times
+
+    current, previous = best(results), best(baseline)
+    regressions = 0
+    for key in sorted(current, key=str):
+        if key not in previous or not previous[key]:
+            continue
+        ratio = current[key] / previous[key]
+        flag = ""
+        if ratio > threshold:
+            regressions += 1
+            flag = "  <-- régression"
+        benchmark, variant, rows = key
+        label = f"{benchmark}[{variant}]" if variant else benchmark
+        print(
+            f"  {label:40s} {rows:>9d} lignes  "
+            f"{previous[key]:8.3f} s -> {current[key]:8.3f} s  x{ratio:.2f}{flag}",
+            file=sys.stderr,
+        )
+    return regressions
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Construit l'analyseur des arguments des benchmarks."""
+    from colorexcel.logic import (
+        ENGINE_OPENPYXL,
+        ENGINE_READONLY,
+        ENGINE_XML,
+        WRITER_OPENPYXL,
+        WRITER_XML,
+    )
+
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.bench_logic",
+        description="Mesure le temps et la mémoire des fonctions de colorexcel.logic.",
+    )
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000], help="Tailles (lignes)"
+    )
+    parser.add_argument("--width", type=int, default=12, help="Colonnes de la cible")
+    parser.add_argument("--fill-ratio", type=float, default=0.8)
+    parser.add_argument("--theme-ratio", type=float, default=0.5)
+    parser.add_argument("--tint-ratio", type=float, default=0.5)
+    parser.add_argument("--match-ratio", type=float, default=0.7)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--benchmarks", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS)
+    )
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        default=[ENGINE_OPENPYXL, ENGINE_READONLY, ENGINE_XML],
+        help="Moteurs d'extraction à comparer",
+    )
+    parser.add_argument(
+        "--writers",
+        nargs="+",
+        choices=(WRITER_OPENPYXL, WRITER_XML),
+        default=[WRITER_OPENPYXL, WRITER_XML],
+        help="Modes d'écriture à comparer",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Répétitions par mesure")
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="Mesurer aussi le pic tracemalloc (ralentit nettement les mesures)",
+    )
+    parser.add_argument(
+        "--workdir",
+        type=Path,
+        default=Path(tempfile.gettempdir()) / "colorexcel-bench",
+        help="Dossier des classeurs générés (réutilisés d'une exécution à l'autre)",
+    )
+    parser.add_argument("--output", help="Fichier JSON des résultats (défaut : stdout)")
+    parser.add_argument("--baseline", help="Résultats JSON de référence à comparer")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Rapport de temps signalé comme régression",
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Point d'entrée des benchmarks.
+
+    Returns:
+        Code de sortie (1 si des régressions sont détectées)
+    """
+    args = build_parser().parse_args(argv)
+    args.workdir.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    for rows in args.rows:
+        print(f"Génération des classeurs ({rows} lignes)...", file=sys.stderr)
+        source, target = generate.make_pair(
+            args.workdir,
+            rows,
+            width=args.width,
+            fill_ratio=args.fill_ratio,
+            theme_ratio=args.theme_ratio,
+            tint_ratio=args.tint_ratio,
+            match_ratio=args.match_ratio,
+            seed=args.seed,
+        )
+        for case in _cases(args, rows, source, target):
+            # Un processus neuf par mesure pour un pic RSS significatif
+            with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+                result = executor.submit(run_case, case).result()
+            results.append(result)
+            label = case["benchmark"]
+            if case["variant"]:
+                label += f"[{case['variant']}]"
+            print(
+                f"  {label:40s} {rows:>9d} lignes  {result['wall_s']:8.3f} s",
+                file=sys.stderr,
+            )
+
+    report = {
+        "version": _package_version(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "width": args.width,
+            "fill_ratio": args.fill_ratio,
+            "theme_ratio": args.theme_ratio,
+            "tint_ratio": args.tint_ratio,
+            "match_ratio": args.match_ratio,
+            "seed": args.seed,
+            "tracemalloc": args.tracemalloc,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        print("Comparaison avec la référence :", file=sys.stderr)
+        if compare(results, baseline["results"], args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
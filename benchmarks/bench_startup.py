@@ -0,0 +1,213 @@
+"""
+Benchmarks du temps de démarrage de ColorExcel.
+
+Chaque import est mesuré dans un interpréteur neuf : ``colorexcel.logic``
+(chemin sans interface utilisé par les scripts), ``colorexcel.cli``
+(sous-commandes ``batch``/``watch``) et ``colorexcel.app`` (lancement de
+l'interface Toga). Chaque mesure relève aussi les dépendances lourdes
+chargées par l'import, afin qu'une régression (par exemple un import
+d'openpyxl ou de pandas remonté au niveau d'un module) soit visible même
+quand le temps reste faible sur la machine de mesure.
+
+Utilisation::
+
+    python -m benchmarks.bench_startup --repeat 5 \\
+        --output demarrage.json --baseline precedents.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from . import _SRC_DIR
+from .bench_logic import DEFAULT_THRESHOLD, _package_version
+
+# Module importé par chaque mesure
+TARGETS = {
+    "logic": "colorexcel.logic",
+    "cli": "colorexcel.cli",
+    "gui": "colorexcel.app",
+}
+
+# Dépendances lourdes dont le chargement est relevé
+HEAVY_MODULES = ("toga", "pandas", "numpy", "openpyxl", "lxml")
+
+# Script exécuté dans l'interpréteur neuf : il écrit la mesure en JSON
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+error = None
+try:
+    import {module}
+except ImportError as exc:
+    error = str(exc)
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "import_s": round(elapsed, 4),
+    "loaded": [name for name in {heavy!r} if name in sys.modules],
+    "error": error,
+}}))
+"""
+
+
+def run_case(name: str) -> dict:
+    """
+    Mesure l'import d'un module dans un interpréteur neuf.
+
+    Args:
+        name: Clé de TARGETS
+
+    Returns:
+        Dictionnaire des résultats de la mesure
+    """
+    module = TARGETS[name]
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, (str(_SRC_DIR), env.get("PYTHONPATH")))
+    )
+    probe = _PROBE.format(module=module, heavy=HEAVY_MODULES)
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", probe],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    process = time.perf_counter() - start
+    return {
+        "benchmark": name,
+        "module": module,
+        "process_s": round(process, 4),
+        **json.loads(completed.stdout.strip().splitlines()[-1]),
+    }
+
+
+def compare(results: list[dict], baseline: list[dict], threshold: float) -> int:
+    """
+    Compare des résultats à ceux d'une exécution précédente.
+
+    Un import plus lent que la référence au-delà du seuil, ou qui charge une
+    dépendance lourde absente de la référence, est compté comme régression.
+
+    Args:
+        results: Résultats de l'exécution courante
+        baseline: Résultats de référence
+        threshold: Rapport de temps au-delà duquel une mesure est en régression
+
+    Returns:
+        Nombre de mesures en régression
+    """
+
+    def best(entries):
+        times, loaded = {}, {}
+        for entry in entries:
+            if entry.get("error"):
+                continue
+            key = entry["benchmark"]
+            times[key] = min(times.get(key, float("inf")), entry["import_s"])
+            loaded[key] = set(entry["loaded"])
+        return times, loaded
+
+    (current, current_loaded), (previous, previous_loaded) = (
+        best(results),
+        best(baseline),
+    )
+    regressions = 0
+    for key in sorted(current):
+        if key not in previous or not previous[key]:
+            continue
+        ratio = current[key] / previous[key]
+        added = sorted(current_loaded[key] - previous_loaded[key])
+        flag = ""
+        if ratio > threshold or added:
+            regressions += 1
+            flag = "  <-- régression"
+        if added:
+            flag += f" (charge {', '.join(added)})"
+        print(
+            f"  {key:10s} {previous[key] * 1000:8.1f} ms -> "
+            f"{current[key] * 1000:8.1f} ms  x{ratio:.2f}{flag}",
+            file=sys.stderr,
+        )
+    return regressions
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Construit l'analyseur des arguments des benchmarks."""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.bench_startup",
+        description="Mesure le temps d'import de colorexcel.",
+    )
+    parser.add_argument(
+        "--benchmarks", nargs="+", choices=tuple(TARGETS), default=list(TARGETS)
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Répétitions par mesure")
+    parser.add_argument("--output", help="Fichier JSON des résultats (défaut : stdout)")
+    parser.add_argument("--baseline", help="Résultats JSON de référence à comparer")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Rapport de temps signalé comme régression",
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Point d'entrée des benchmarks.
+
+    Returns:
+        Code de sortie (1 si des régressions sont détectées)
+    """
+    args = build_parser().parse_args(argv)
+
+    results = []
+    for name in args.benchmarks:
+        for _ in range(args.repeat):
+            result = run_case(name)
+            results.append(result)
+            if result["error"]:
+                print(
+                    f"  {name:10s} import impossible : {result['error']}",
+                    file=sys.stderr,
+                )
+                break
+            print(
+                f"  {name:10s} {result['import_s'] * 1000:8.1f} ms  "
+                f"(processus {result['process_s'] * 1000:.0f} ms)  "
+                f"{', '.join(result['loaded']) or '-'}",
+                file=sys.stderr,
+            )
+
+    report = {
+        "version": _package_version(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {"repeat": args.repeat},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        print("Comparaison avec la référence :", file=sys.stderr)
+        if compare(results, baseline["results"], args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,261 @@
+"""
+Générateur de classeurs source/cible synthétiques pour les benchmarks.
+
+Les classeurs sont écrits en mode ``write_only`` d'openpyxl, ce qui permet de
+produire des feuilles d'un million de lignes en mémoire constante.
+
+Utilisation::
+
+    python -m benchmarks.generate --rows 100000 --width 12 --out /tmp/bench
+"""
+
+import argparse
+import random
+from pathlib import Path
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill
+from openpyxl.styles.colors import Color
+
+SOURCE_SHEET = "Source"
+TARGET_SHEET = "Cible"
+
+# Couleurs RGB explicites utilisées dans les sources
+RGB_PALETTE = (
+    "FFFF0000",
+    "FF00B050",
+    "FF0070C0",
+    "FFFFC000",
+    "FF7030A0",
+    "FF92D050",
+    "FFC00000",
+    "FF00B0F0",
+)
+
+# Indices de thème (accent1 à accent6) et tints utilisés
+THEME_INDICES = (4, 5, 6, 7, 8, 9)
+TINTS = (0.8, 0.6, 0.4, -0.25, -0.5)
+
+IMPLANTATIONS = ("Wavre", "Nivelles", "Ottignies", "Jodoigne", "Tubize", "Braine")
+
+
+def source_key(index: int) -> tuple[str, str, str]:
+    """
+    Clé (implantation, nom, prénom) de la ligne ``index`` de la source.
+
+    Args:
+        index: Numéro de la ligne de données (à partir de 0)
+
+    Returns:
+        Tuple unique (implantation, nom, prénom)
+    """
+    return (
+        IMPLANTATIONS[index % len(IMPLANTATIONS)],
+        f"Nom{index:07d}",
+        f"Prenom{index % 97}",
+    )
+
+
+def _fill_palette(theme_ratio: float, tint_ratio: float, rng: random.Random):
+    """Construit la liste des remplissages pondérée par les proportions demandées."""
+    rgb_fills = [PatternFill("solid", fgColor=value) for value in RGB_PALETTE]
+    theme_fills = [
+        PatternFill("solid", fgColor=Color(theme=theme)) for theme in THEME_INDICES
+    ]
+    tint_fills = [
+        PatternFill("solid", fgColor=Color(theme=theme, tint=tint))
+        for theme in THEME_INDICES
+        for tint in TINTS
+    ]
+
+    def pick() -> PatternFill:
+        if rng.random() < theme_ratio:
+            if rng.random() < tint_ratio:
+                return rng.choice(tint_fills)
+            return rng.choice(theme_fills)
+        return rng.choice(rgb_fills)
+
+    return pick
+
+
+def make_source(
+    path,
+    rows: int,
+    width: int = 6,
+    fill_ratio: float = 0.8,
+    theme_ratio: float = 0.5,
+    tint_ratio: float = 0.5,
+    seed: int = 1,
+) -> Path:
+    """
+    Écrit un classeur source dont la colonne Implantation est colorée.
+
+    Args:
+        path: Chemin du classeur à écrire
+        rows: Nombre de lignes de données
+        width: Nombre total de colonnes (au moins 4)
+        fill_ratio: Proportion de lignes colorées
+        theme_ratio: Proportion de couleurs de thème (le reste en RGB)
+        tint_ratio: Proportion de couleurs de thème avec un tint
+        seed: Graine du générateur aléatoire
+
+    Returns:
+        Chemin du classeur écrit
+    """
+    rng = random.Random(seed)
+    pick_fill = _fill_palette(theme_ratio, tint_ratio, rng)
+    width = max(width, 4)
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(SOURCE_SHEET)
+    sheet.append(
+        ["Id", "Implantation", "Nom", "Prénom"]
+        + [f"Info{col}" for col in range(width - 4)]
+    )
+    extra = [f"valeur {col}" for col in range(width - 4)]
+    for index in range(rows):
+        implantation, nom, prenom = source_key(index)
+        impl_cell = WriteOnlyCell(sheet, value=implantation)
+        if rng.random() < fill_ratio:
+            impl_cell.fill = pick_fill()
+        sheet.append([index, impl_cell, nom, prenom] + extra)
+    workbook.create_sheet("Notes").append(["Classeur généré pour les benchmarks"])
+
+    workbook.save(path)
+    return Path(path)
+
+
+def make_target(
+    path,
+    rows: int,
+    source_rows: int,
+    width: int = 12,
+    match_ratio: float = 0.7,
+    seed: int = 2,
+) -> Path:
+    """
+    Écrit un classeur cible, colonnes clés dans un autre ordre que la source.
+
+    Args:
+        path: Chemin du classeur à écrire
+        rows: Nombre de lignes de données
+        source_rows: Nombre de lignes de la source (pour tirer des clés existantes)
+        width: Nombre total de colonnes (au moins 3)
+        match_ratio: Proportion de lignes dont la clé existe dans la source
+        seed: Graine du générateur aléatoire
+
+    Returns:
+        Chemin du classeur écrit
+    """
+    rng = random.Random(seed)
+    width = max(width, 3)
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(TARGET_SHEET)
+    sheet.append(
+        ["Prénom", "Nom", "Implantation"] + [f"Col{col}" for col in range(width - 3)]
+    )
+    for index in range(rows):
+        if source_rows and rng.random() < match_ratio:
+            implantation, nom, prenom = source_key(rng.randrange(source_rows))
+        else:
+            implantation, nom, prenom = source_key(source_rows + index)
+            nom = f"Absent{index:07d}"
+        sheet.append([prenom, nom, implantation] + [index] * (width - 3))
+
+    workbook.save(path)
+    return Path(path)
+
+
+def make_pair(
+    directory,
+    rows: int,
+    width: int = 12,
+    fill_ratio: float = 0.8,
+    theme_ratio: float = 0.5,
+    tint_ratio: float = 0.5,
+    match_ratio: float = 0.7,
+    seed: int = 1,
+) -> tuple[Path, Path]:
+    """
+    Construit (ou réutilise) une paire source/cible de ``rows`` lignes.
+
+    Les noms de fichiers encodent tous les paramètres, si bien qu'une paire
+    déjà générée avec les mêmes paramètres est réutilisée telle quelle.
+
+    Args:
+        directory: Dossier des classeurs générés
+        rows: Nombre de lignes de la source et de la cible
+        width: Nombre de colonnes de la cible (la source en a la moitié)
+        fill_ratio: Proportion de lignes source colorées
+        theme_ratio: Proportion de couleurs de thème
+        tint_ratio: Proportion de couleurs de thème avec un tint
+        match_ratio: Proportion de lignes cibles présentes dans la source
+        seed: Graine du générateur aléatoire
+
+    Returns:
+        Tuple (chemin source, chemin cible)
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    tag = (
+        f"{rows}r_{width}c_f{fill_ratio:g}_t{theme_ratio:g}"
+        f"_ti{tint_ratio:g}_m{match_ratio:g}_s{seed}"
+    )
+    source = directory / f"source_{tag}.xlsx"
+    target = directory / f"cible_{tag}.xlsx"
+    if not source.exists():
+        make_source(
+            source,
+            rows,
+            width=max(width // 2, 4),
+            fill_ratio=fill_ratio,
+            theme_ratio=theme_ratio,
+            tint_ratio=tint_ratio,
+            seed=seed,
+        )
+    if not target.exists():
+        make_target(
+            target, rows, rows, width=width, match_ratio=match_ratio, seed=seed + 1
+        )
+    return source, target
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Construit l'analyseur des arguments du générateur."""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.generate",
+        description="Génère une paire de classeurs source/cible synthétiques.",
+    )
+    parser.add_argument("--rows", type=int, required=True, help="Nombre de lignes")
+    parser.add_argument("--width", type=int, default=12, help="Colonnes de la cible")
+    parser.add_argument("--fill-ratio", type=float, default=0.8)
+    parser.add_argument("--theme-ratio", type=float, default=0.5)
+    parser.add_argument("--tint-ratio", type=float, default=0.5)
+    parser.add_argument("--match-ratio", type=float, default=0.7)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", required=True, help="Dossier de sortie")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Point d'entrée du générateur."""
+    args = build_parser().parse_args(argv)
+    source, target = make_pair(
+        args.out,
+        args.rows,
+        width=args.width,
+        fill_ratio=args.fill_ratio,
+        theme_ratio=args.theme_ratio,
+        tint_ratio=args.tint_ratio,
+        match_ratio=args.match_ratio,
+        seed=args.seed,
+    )
+    print(f"Source : {source}")
+    print(f"Cible  : {target}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,276 @@
+"""
+Test de charge du service HTTP local (``colorexcel serve``).
+
+Le service est démarré dans ce processus sur un port libre de 127.0.0.1
+(ou ``--url`` désigne un service déjà lancé sur la machine), puis plusieurs
+clients concurrents déposent chacun des travaux sur une paire de classeurs
+synthétiques, suivent leur progression et téléchargent le résultat. Un dépôt
+refusé parce que la file est pleine (HTTP 503) est réessayé après le délai
+``Retry-After`` : le nombre de refus mesure la contre-pression.
+
+Le cache des résultats est désactivé par défaut dans le service démarré ici,
+sans quoi tous les travaux sauf le premier réutiliseraient le même résultat.
+
+Utilisation::
+
+    python -m benchmarks.load_service --rows 5000 --jobs 20 --clients 8 \\
+        --workers 2 --max-queued 4 --output charge.json
+"""
+
+import argparse
+import io
+import json
+import platform
+import secrets
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from . import generate
+from .bench_logic import _package_version
+
+# États finaux d'un travail (voir colorexcel.jobs)
+FINAL_STATES = ("done", "failed", "cancelled", "timeout")
+
+# Intervalle de suivi d'un travail (secondes)
+POLL_INTERVAL = 0.2
+
+
+def _form(fields: list[tuple[str, str]], files: dict) -> tuple[bytes, str]:
+    """Encode un formulaire multipart/form-data (champs, fichiers)."""
+    boundary = secrets.token_hex(16)
+    body = io.BytesIO()
+    for name, value in fields:
+        body.write(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"'
+            f"\r\n\r\n{value}\r\n".encode("utf-8")
+        )
+    for name, path in files.items():
+        body.write(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+            f'filename="{Path(path).name}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n".encode("utf-8")
+        )
+        body.write(Path(path).read_bytes())
+        body.write(b"\r\n")
+    body.write(f"--{boundary}--\r\n".encode("utf-8"))
+    return body.getvalue(), f"multipart/form-data; boundary={boundary}"
+
+
+def _request(url: str, method: str = "GET", body=None, content_type=None):
+    """Envoie une requête ; renvoie (code HTTP, corps, en-têtes)."""
+    request = urllib.request.Request(url, data=body, method=method)
+    if content_type:
+        request.add_header("Content-Type", content_type)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.read(), response.headers
+    except urllib.error.HTTPError as exc:
+        return exc.code, exc.read(), exc.headers
+
+
+def run_job(base_url: str, form: tuple[bytes, str], timeout: float) -> dict:
+    """
+    Dépose un travail, le suit jusqu'à sa fin et télécharge son résultat.
+
+    Args:
+        base_url: Adresse du service
+        form: Corps et type du formulaire de dépôt
+        timeout: Délai maximal d'attente du travail (secondes)
+
+    Returns:
+        Mesures du travail
+    """
+    start = time.perf_counter()
+    rejected = 0
+    while True:
+        status, body, headers = _request(f"{base_url}/jobs", "POST", *form)
+        if status != 503:
+            break
+        rejected += 1
+        time.sleep(float(headers.get("Retry-After", 1)))
+    accepted = time.perf_counter()
+    if status != 202:
+        return {
+            "state": "refused",
+            "error": body.decode("utf-8", "replace"),
+            "rejected": rejected,
+        }
+
+    job = json.loads(body)
+    while job["state"] not in FINAL_STATES:
+        if time.perf_counter() - accepted > timeout:
+            _request(f"{base_url}/jobs/{job['id']}", "DELETE")
+            break
+        time.sleep(POLL_INTERVAL)
+        job = json.loads(_request(f"{base_url}/jobs/{job['id']}")[1])
+    finished = time.perf_counter()
+
+    valid = False
+    if job["state"] == "done":
+        status, content, _headers = _request(f"{base_url}/jobs/{job['id']}/result")
+        valid = status == 200 and zipfile.is_zipfile(io.BytesIO(content))
+        _request(f"{base_url}/jobs/{job['id']}", "DELETE")
+    return {
+        "state": job["state"],
+        "error": job.get("error"),
+        "rejected": rejected,
+        "submit_s": round(accepted - start, 4),
+        "turnaround_s": round(finished - accepted, 4),
+        "run_s": job.get("seconds"),
+        "valid_result": valid,
+    }
+
+
+def _percentile(values: list[float], fraction: float) -> float | None:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Construit l'analyseur des arguments du test de charge."""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.load_service",
+        description="Test de charge du service HTTP local de colorexcel.",
+    )
+    parser.add_argument("--rows", type=int, default=2000, help="Lignes par classeur")
+    parser.add_argument("--jobs", type=int, default=12, help="Nombre de travaux")
+    parser.add_argument("--clients", type=int, default=4, help="Clients concurrents")
+    parser.add_argument(
+        "--url",
+        default=None,
+        help="Service déjà lancé (ex. http://127.0.0.1:8765) ; par défaut, un "
+        "service est démarré dans ce processus",
+    )
+    parser.add_argument("--workers", type=int, default=2, help="Processus du service")
+    parser.add_argument(
+        "--max-queued", type=int, default=2, help="Travaux en attente au plus"
+    )
+    parser.add_argument(
+        "--job-timeout",
+        type=float,
+        default=600.0,
+        help="Durée maximale d'un travail (secondes)",
+    )
+    parser.add_argument(
+        "--result-cache",
+        action="store_true",
+        help="Activer le cache des résultats du service démarré ici",
+    )
+    parser.add_argument(
+        "--workdir",
+        type=Path,
+        default=Path(tempfile.gettempdir()) / "colorexcel-bench",
+        help="Dossier des classeurs générés",
+    )
+    parser.add_argument("--output", help="Fichier JSON des résultats (défaut : stdout)")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Point d'entrée du test de charge.
+
+    Returns:
+        Code de sortie (1 si un travail n'a pas abouti)
+    """
+    args = build_parser().parse_args(argv)
+    print(f"Génération des classeurs ({args.rows} lignes)...", file=sys.stderr)
+    source, target = generate.make_pair(args.workdir, args.rows)
+    form = _form(
+        [
+            ("source_sheet", generate.SOURCE_SHEET),
+            ("target_sheet", generate.TARGET_SHEET),
+        ],
+        {"source": source, "target": target},
+    )
+
+    server = queue = None
+    base_url = args.url
+    if base_url is None:
+        from colorexcel.jobs import JobQueue
+        from colorexcel.service import ServiceHTTPServer
+
+        queue = JobQueue(
+            workers=args.workers,
+            max_queued=args.max_queued,
+            timeout=args.job_timeout,
+            result_cache=args.result_cache,
+        )
+        server = ServiceHTTPServer(("127.0.0.1", 0), queue)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    base_url = base_url.rstrip("/")
+    print(f"{args.jobs} travaux, {args.clients} clients -> {base_url}", file=sys.stderr)
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(args.clients) as clients:
+            results = list(
+                clients.map(
+                    lambda _: run_job(base_url, form, args.job_timeout * 2),
+                    range(args.jobs),
+                )
+            )
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            queue.close()
+    wall = time.perf_counter() - start
+
+    done = [result for result in results if result["state"] == "done"]
+    turnaround = [result["turnaround_s"] for result in done]
+    summary = {
+        "jobs": args.jobs,
+        "done": len(done),
+        "failed": len(results) - len(done),
+        "invalid_results": sum(1 for result in done if not result["valid_result"]),
+        "rejected_503": sum(result["rejected"] for result in results),
+        "wall_s": round(wall, 3),
+        "jobs_per_s": round(len(done) / wall, 3) if wall else None,
+        "turnaround_p50_s": _percentile(turnaround, 0.5),
+        "turnaround_p95_s": _percentile(turnaround, 0.95),
+        "run_mean_s": (
+            round(statistics.mean(r["run_s"] for r in done), 4) if done else None
+        ),
+    }
+    for name, value in summary.items():
+        print(f"  {name:20s} {value}", file=sys.stderr)
+
+    report = {
+        "version": _package_version(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "rows": args.rows,
+            "clients": args.clients,
+            "url": args.url,
+            "workers": None if args.url else args.workers,
+            "max_queued": None if args.url else args.max_queued,
+            "result_cache": None if args.url else args.result_cache,
+        },
+        "summary": summary,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+    return 1 if summary["failed"] or summary["invalid_results"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,1210 @@
+"""
+Interface graphique Toga de l'application ColorExcel.
+
+Ce module n'est importé que pour lancer l'interface : la ligne de commande et
+``colorexcel.logic`` ne dépendent pas de Toga.
+"""
+
+import asyncio
+import logging
+import shutil
+import time
+from pathlib import Path
+import toga
+from toga.style import Pack
+from toga.style.pack import COLUMN, ROW
+
+from .dryrun import dry_run
+from .logic import (
+    ALL_SHEETS,
+    PAINT_CELLS,
+    WRITER_OPENPYXL,
+    apply_color_map,
+    apply_colors_to_file2,
+    get_implantation_colors,
+    get_sheet_names,
+)
+from .output import is_scratch_output, release_output, scratch_output_path
+from .progress import (
+    PHASE_LOAD,
+    PHASE_SAVE,
+    PHASE_SOURCE,
+    PHASE_SOURCES,
+    PHASE_TARGET,
+    CancelToken,
+    ProcessingCancelled,
+)
+from .matching import DEFAULT_FUZZY_THRESHOLD
+from .results import default_result_cache, result_key, sources_digest
+from .sources import PRECEDENCE_FIRST, get_merged_colors
+
+logger = logging.getLogger(__name__)
+
+# Constantes UI
+TITLE_FONT_SIZE = 22
+SECTION_FONT_SIZE = 16
+
+# Intervalle de rafraîchissement de la progression (secondes)
+PROGRESS_REFRESH = 0.25
+
+# Choix de la liste des feuilles cibles : toutes les feuilles ayant les colonnes clés
+ALL_SHEETS_LABEL = "(Toutes les feuilles)"
+
+# Libellés des phases de traitement
+PHASE_LABELS = {
+    PHASE_SOURCE: "Lecture du fichier source",
+    PHASE_SOURCES: "Lecture des fichiers sources",
+    PHASE_LOAD: "Chargement du fichier cible",
+    PHASE_TARGET: "Coloration du fichier cible",
+    PHASE_SAVE: "Enregistrement du fichier",
+}
+
+# Libellés des phases de la simulation (aucun fichier n'est écrit)
+DRY_RUN_PHASE_LABELS = {
+    PHASE_SOURCE: "Lecture du fichier source",
+    PHASE_TARGET: "Lecture des clés du fichier cible",
+}
+
+# Nom du rapport CSV de la simulation
+DRY_RUN_CSV_NAME = "simulation.csv"
+
+
+def format_duration(seconds: float) -> str:
+    """
+    Formate une durée en minutes et secondes.
+
+    Args:
+        seconds: Durée en secondes
+
+    Returns:
+        Texte de la forme '1 min 05 s' ou '42 s'
+    """
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    if minutes:
+        return f"{minutes} min {seconds:02d} s"
+    return f"{seconds} s"
+
+
+class ColorExcel(toga.App):
+    """
+    Application principale ColorExcel.
+
+    Cette classe représente l'application Beeware/Toga qui permet
+    de manipuler les couleurs dans les fichiers Excel.
+    """
+
+    def startup(self):
+        """
+        Construit et affiche l'interface graphique de l'application.
+
+        Cette méthode est appelée automatiquement au démarrage de l'application.
+        """
+        # Définir l'icône de l'application
+        self.icon = "resources/logo.png"
+
+        # Initialisation des variables d'état
+        self.source_file_path = None
+        self.source_sheet_name = None
+        self.target_file_path = None
+        self.target_sheet_name = None
+        self.processed_file_path = None
+        # Sources retenues pour la fusion (fichier, feuille), par ordre de priorité
+        self.merge_sources = []
+
+        # Pré-extraction des couleurs source en arrière-plan
+        self.prefetch_task = None
+        self.prefetch_token = None
+        self.prefetch_key = None
+
+        self.commands.clear()
+
+        # Conteneur principal
+        main_box = toga.Box(style=Pack(direction=COLUMN, margin=10))
+
+        # Titre de l'application
+        title_label = toga.Label(
+            "Manipulation de fichiers Excel",
+            style=Pack(
+                margin=(0, 10),
+                font_size=TITLE_FONT_SIZE,
+                font_weight="bold",
+                text_align="center",
+            ),
+        )
+
+        # Boutons de contrôle (À propos et Quitter) juste après le titre
+        control_buttons_box = toga.Box(style=Pack(direction=ROW, margin=(5, 0)))
+
+        about_button = toga.Button(
+            "À propos",
+            on_press=self.show_about,
+            style=Pack(margin=5, flex=1),
+        )
+
+        exit_button = toga.Button(
+            "Quitter",
+            on_press=self.exit_app,
+            style=Pack(margin=5, flex=1),
+        )
+
+        control_buttons_box.add(about_button)
+        control_buttons_box.add(exit_button)
+
+        # Divider après les boutons de contrôle
+        divider1 = toga.Divider(style=Pack(margin=(5, 0)))
+
+        # Section Fichier Source
+        source_section_label = toga.Label(
+            "Fichier Source",
+            style=Pack(
+                margin=(10, 5),
+                font_size=SECTION_FONT_SIZE,
+                font_weight="bold",
+                text_align="center",
+            ),
+        )
+
+        self.source_button = toga.Button(
+            "Choisir fichier source",
+            on_press=self.select_source_file,
+            style=Pack(margin=5),
+        )
+
+        self.source_file_label = toga.Label(
+            "Aucun fichier sélectionné", style=Pack(margin=(0, 5), font_style="italic")
+        )
+
+        # Selection dropdown pour la feuille source (initialement caché)
+        self.source_sheet_box = toga.Box(style=Pack(direction=COLUMN, margin=(5, 0)))
+        source_sheet_label = toga.Label("Feuille source:", style=Pack(margin=(5, 5)))
+        self.source_sheet_selection = toga.Selection(
+            on_change=self.on_source_sheet_change, style=Pack(margin=5, flex=1)
+        )
+        self.source_sheet_box.add(source_sheet_label)
+        self.source_sheet_box.add(self.source_sheet_selection)
+
+        # Fusion de plusieurs sources : la sélection courante est ajoutée à la
+        # liste, puis une autre source peut être choisie
+        self.add_merge_source_button = toga.Button(
+            "Ajouter à la fusion",
+            on_press=self.add_merge_source,
+            style=Pack(margin=5),
+        )
+        self.merge_sources_label = toga.Label(
+            "", style=Pack(margin=(0, 5), font_style="italic")
+        )
+        self.source_sheet_box.add(self.add_merge_source_button)
+        self.source_sheet_box.add(self.merge_sources_label)
+
+        # Divider après la section source
+        divider2 = toga.Divider(style=Pack(margin=(10, 0)))
+
+        # Section Fichier Cible
+        target_section_label = toga.Label(
+            "Fichier Cible",
+            style=Pack(
+                margin=(10, 5),
+                font_size=SECTION_FONT_SIZE,
+                font_weight="bold",
+                text_align="center",
+            ),
+        )
+
+        self.target_button = toga.Button(
+            "Choisir fichier cible",
+            on_press=self.select_target_file,
+            style=Pack(margin=5),
+        )
+
+        self.target_file_label = toga.Label(
+            "Aucun fichier sélectionné", style=Pack(margin=(0, 5), font_style="italic")
+        )
+
+        # Selection dropdown pour la feuille cible (initialement caché)
+        self.target_sheet_box = toga.Box(style=Pack(direction=COLUMN, margin=(5, 0)))
+        target_sheet_label = toga.Label("Feuille cible:", style=Pack(margin=(5, 5)))
+        self.target_sheet_selection = toga.Selection(
+            on_change=self.on_target_sheet_change, style=Pack(margin=5, flex=1)
+        )
+        self.target_sheet_box.add(target_sheet_label)
+        self.target_sheet_box.add(self.target_sheet_selection)
+
+        # Divider avant le bouton de traitement
+        divider3 = toga.Divider(style=Pack(margin=(10, 0)))
+
+        # Bouton "Lancer le traitement" (initialement désactivé)
+        self.process_button = toga.Button(
+            "Lancer le traitement",
+            on_press=self.start_processing,
+            enabled=False,
+            style=Pack(margin=10),
+        )
+
+        # Bouton de simulation : statistiques d'appariement sans écrire de fichier
+        self.dry_run_button = toga.Button(
+            "Simuler (statistiques)",
+            on_press=self.start_dry_run,
+            enabled=False,
+            style=Pack(margin=(0, 10, 10, 10)),
+        )
+
+        # Réutilisation du résultat d'un traitement identique (mêmes fichiers,
+        # mêmes feuilles) ; désactiver pour forcer un nouveau traitement
+        self.result_cache_switch = toga.Switch(
+            "Réutiliser le résultat d'un traitement identique",
+            value=True,
+            style=Pack(margin=(0, 10, 10, 10)),
+        )
+
+        # Barre de progression (initialement cachée)
+        self.progress_box = toga.Box(style=Pack(direction=COLUMN, margin=(10, 0)))
+        self.progress_label = toga.Label(
+            "⏳ Traitement en cours",
+            style=Pack(
+                margin=10, text_align="center", font_size=14, font_weight="bold"
+            ),
+        )
+        self.progress_bar = toga.ProgressBar(max=1.0, style=Pack(margin=(0, 10)))
+        self.progress_stats_label = toga.Label(
+            "", style=Pack(margin=5, text_align="center")
+        )
+        self.cancel_button = toga.Button(
+            "Annuler",
+            on_press=self.cancel_processing,
+            style=Pack(margin=5),
+        )
+        self.progress_box.add(self.progress_label)
+        self.progress_box.add(self.progress_bar)
+        self.progress_box.add(self.progress_stats_label)
+        self.progress_box.add(self.cancel_button)
+        self.progress_task = None
+        self.cancel_token = None
+        # Dernier état (phase, lignes traitées, total) publié par le thread de
+        # traitement
+        self.progress_state = None
+        self.phase_labels = PHASE_LABELS
+
+        # Message de résultat (initialement caché)
+        self.result_box = toga.Box(style=Pack(direction=COLUMN, margin=(10, 0)))
+        self.result_label = toga.Label(
+            "", style=Pack(margin=5, text_align="center", font_weight="bold")
+        )
+        self.result_box.add(self.result_label)
+
+        # Boutons post-traitement (initialement cachés)
+        self.post_process_box = toga.Box(style=Pack(direction=ROW, margin=(10, 0)))
+        self.save_as_button = toga.Button(
+            "Enregistrer sous...",
+            on_press=self.save_as_file,
+            style=Pack(margin=5, flex=1),
+        )
+        self.new_process_button = toga.Button(
+            "Nouveau traitement",
+            on_press=self.reset_interface,
+            style=Pack(margin=5, flex=1),
+        )
+        self.post_process_box.add(self.save_as_button)
+        self.post_process_box.add(self.new_process_button)
+
+        # Ajout des widgets au conteneur principal
+        main_box.add(title_label)
+        main_box.add(control_buttons_box)
+        main_box.add(divider1)
+        main_box.add(source_section_label)
+        main_box.add(self.source_button)
+        main_box.add(self.source_file_label)
+        # source_sheet_box sera ajouté dynamiquement
+
+        main_box.add(divider2)
+        main_box.add(target_section_label)
+        main_box.add(self.target_button)
+        main_box.add(self.target_file_label)
+        # target_sheet_box sera ajouté dynamiquement
+
+        main_box.add(divider3)
+        main_box.add(self.process_button)
+        main_box.add(self.dry_run_button)
+        main_box.add(self.result_cache_switch)
+        # progress_box, result_box et post_process_box seront ajoutés dynamiquement
+
+        # Création de la fenêtre principale
+        self.main_window = toga.MainWindow(title=self.formal_name)
+        self.main_window.content = main_box
+        self.main_window.show()
+
+        logger.info("Application démarrée")
+
+    async def exit_app(self, widget):
+        """
+        Quitte l'application.
+
+        Args:
+            widget: Le widget qui a déclenché l'événement
+        """
+        self.exit()
+
+    async def show_about(self, widget):
+        """
+        Affiche la boîte de dialogue About ColorExcel.
+
+        Args:
+            widget: Le widget qui a déclenché l'événement
+        """
+        await self.main_window.dialog(
+            toga.InfoDialog(
+                "About ColorExcel",
+                "ColorExcel\n\n"
+                "Version: 1.0\n"
+                "Auteur: Adrien Mertens\n\n"
+                "Application de manipulation de couleurs dans fichiers Excel",
+            )
+        )
+
+    async def select_source_file(self, widget):
+        """
+        Ouvre une boîte de dialogue pour sélectionner le fichier Excel source.
+
+        Args:
+            widget: Le widget qui a déclenché l'événement (bouton)
+        """
+        try:
+            logger.info("Ouverture du sélecteur de fichier source")
+            file_path = await self.main_window.dialog(
+                toga.OpenFileDialog(
+                    title="Sélectionner le fichier Excel source",
+                    file_types=["xlsx", "xls"],
+                )
+            )
+
+            if file_path:
+                self.source_file_path = str(file_path)
+                filename = Path(file_path).name
+                self.source_file_label.text = f"Fichier: {filename}"
+                logger.info(f"Fichier source sélectionné: {self.source_file_path}")
+
+                # Récupération des noms de feuilles (hors boucle d'événements)
+                sheet_names = await asyncio.to_thread(
+                    get_sheet_names, self.source_file_path
+                )
+
+                if sheet_names:
+                    # Mise à jour de la liste déroulante
+                    self.source_sheet_selection.items = sheet_names
+                    self.source_sheet_selection.value = sheet_names[0]
+                    self.source_sheet_name = sheet_names[0]
+                    self.start_source_prefetch()
+
+                    # Affichage du sélecteur de feuille
+                    if self.source_sheet_box not in self.main_window.content.children:
+                        # Trouver l'index après source_file_label
+                        children = list(self.main_window.content.children)
+                        idx = children.index(self.source_file_label) + 1
+                        self.main_window.content.insert(idx, self.source_sheet_box)
+
+                    logger.info(f"Feuilles disponibles: {sheet_names}")
+                else:
+                    await self.main_window.dialog(
+                        toga.ErrorDialog(
+                            "Erreur",
+                            f"Impossible de lire les feuilles du fichier:\n{filename}",
+                        )
+                    )
+                    self.source_file_path = None
+                    self.source_file_label.text = "Aucun fichier sélectionné"
+
+                # Vérifier si le bouton de traitement doit être activé
+                self.update_process_button_state()
+
+        except Exception as e:
+            logger.error(
+                f"Erreur lors de la sélection du fichier source: {e}", exc_info=True
+            )
+            await self.main_window.dialog(
+                toga.ErrorDialog(
+                    "Erreur",
+                    "Une erreur s'est produite lors de la sélection du fichier:\n"
+                    f"{str(e)}",
+                )
+            )
+
+    async def select_target_file(self, widget):
+        """
+        Ouvre une boîte de dialogue pour sélectionner le fichier Excel cible.
+
+        Args:
+            widget: Le widget qui a déclenché l'événement (bouton)
+        """
+        try:
+            logger.info("Ouverture du sélecteur de fichier cible")
+            file_path = await self.main_window.dialog(
+                toga.OpenFileDialog(
+                    title="Sélectionner le fichier Excel cible",
+                    file_types=["xlsx", "xls"],
+                )
+            )
+
+            if file_path:
+                self.target_file_path = str(file_path)
+                filename = Path(file_path).name
+                self.target_file_label.text = f"Fichier: {filename}"
+                logger.info(f"Fichier cible sélectionné: {self.target_file_path}")
+
+                # Récupération des noms de feuilles (hors boucle d'événements)
+                sheet_names = await asyncio.to_thread(
+                    get_sheet_names, self.target_file_path
+                )
+
+                if sheet_names:
+                    # Mise à jour de la liste déroulante ; plusieurs feuilles
+                    # peuvent être colorées en un seul passage
+                    self.target_sheet_selection.items = (
+                        sheet_names + [ALL_SHEETS_LABEL]
+                        if len(sheet_names) > 1
+                        else sheet_names
+                    )
+                    self.target_sheet_selection.value = sheet_names[0]
+                    self.target_sheet_name = sheet_names[0]
+
+                    # Affichage du sélecteur de feuille
+                    if self.target_sheet_box not in self.main_window.content.children:
+                        # Trouver l'index après target_file_label
+                        children = list(self.main_window.content.children)
+                        idx = children.index(self.target_file_label) + 1
+                        self.main_window.content.insert(idx, self.target_sheet_box)
+
+                    logger.info(f"Feuilles disponibles: {sheet_names}")
+                else:
+                    await self.main_window.dialog(
+                        toga.ErrorDialog(
+                            "Erreur",
+                            f"Impossible de lire les feuilles du fichier:\n{filename}",
+                        )
+                    )
+                    self.target_file_path = None
+                    self.target_file_label.text = "Aucun fichier sélectionné"
+
+                # Vérifier si le bouton de traitement doit être activé
+                self.update_process_button_state()
+
+        except Exception as e:
+            logger.error(
+                f"Erreur lors de la sélection du fichier cible: {e}", exc_info=True
+            )
+            await self.main_window.dialog(
+                toga.ErrorDialog(
+                    "Erreur",
+                    "Une erreur s'est produite lors de la sélection du fichier:\n"
+                    f"{str(e)}",
+                )
+            )
+
+    def on_source_sheet_change(self, widget):
+        """
+        Callback appelé quand la feuille source est changée.
+
+        Args:
+            widget: Le widget Selection
+        """
+        self.source_sheet_name = widget.value
+        logger.info(f"Feuille source sélectionnée: {self.source_sheet_name}")
+        self.start_source_prefetch()
+        self.update_process_button_state()
+
+    def add_merge_source(self, widget):
+        """
+        Ajoute la source sélectionnée à la liste des sources à fusionner.
+
+        La première source ajoutée est prioritaire pour une clé présente dans
+        plusieurs sources ; la sélection courante, si elle n'a pas été
+        ajoutée, est fusionnée en dernier.
+
+        Args:
+            widget: Le widget qui a déclenché l'événement (bouton)
+        """
+        if not self.source_file_path or not self.source_sheet_name:
+            return
+        source = (self.source_file_path, self.source_sheet_name)
+        if source not in self.merge_sources:
+            self.merge_sources.append(source)
+            logger.info(f"Source ajoutée à la fusion: {source[0]} [{source[1]}]")
+        self.merge_sources_label.text = "Sources à fusionner : " + ", ".join(
+            f"{Path(path).name} [{sheet}]" for path, sheet in self.merge_sources
+        )
+
+    def selected_sources(self):
+        """
+        Liste les sources du traitement, dans l'ordre de priorité.
+
+        Returns:
+            Liste de couples (fichier, feuille) : les sources ajoutées à la
+            fusion puis la sélection courante
+        """
+        sources = list(self.merge_sources)
+        current = (self.source_file_path, self.source_sheet_name)
+        if current not in sources:
+            sources.append(current)
+        return sources
+
+    def on_target_sheet_change(self, widget):
+        """
+        Callback appelé quand la feuille cible est changée.
+
+        Args:
+            widget: Le widget Selection
+        """
+        self.target_sheet_name = (
+            ALL_SHEETS if widget.value == ALL_SHEETS_LABEL else widget.value
+        )
+        logger.info(f"Feuille cible sélectionnée: {self.target_sheet_name}")
+        self.update_process_button_state()
+
+    def update_process_button_state(self):
+        """
+        Active ou désactive le bouton de traitement selon l'état des sélections.
+        """
+        all_selected = (
+            self.source_file_path is not None
+            and self.source_sheet_name is not None
+            and self.target_file_path is not None
+            and self.target_sheet_name is not None
+        )
+        self.process_button.enabled = all_selected
+        self.dry_run_button.enabled = all_selected
+        logger.debug(f"Bouton de traitement activé: {all_selected}")
+
+    def source_key(self):
+        """
+        Identifie la sélection source courante.
+
+        Returns:
+            Tuple (chemin, feuille, date de modification), ou None si la
+            sélection est incomplète ou le fichier inaccessible
+        """
+        if not self.source_file_path or not self.source_sheet_name:
+            return None
+        try:
+            mtime_ns = Path(self.source_file_path).stat().st_mtime_ns
+        except OSError:
+            return None
+        return (self.source_file_path, self.source_sheet_name, mtime_ns)
+
+    def start_source_prefetch(self):
+        """
+        Lance l'extraction des couleurs source en arrière-plan.
+
+        L'extraction commence dès que le fichier et la feuille source sont
+        choisis ; une extraction en cours pour une autre sélection est annulée.
+        """
+        key = self.source_key()
+        if key == self.prefetch_key and self.prefetch_task is not None:
+            return
+
+        self.cancel_source_prefetch()
+        if key is None:
+            return
+
+        logger.info(f"Pré-extraction des couleurs source: {key[0]} [{key[1]}]")
+        self.prefetch_key = key
+        self.prefetch_token = CancelToken()
+        self.prefetch_task = asyncio.create_task(
+            asyncio.to_thread(
+                get_implantation_colors,
+                key[0],
+                key[1],
+                use_cache=True,
+                progress=self.report_progress,
+                cancel_token=self.prefetch_token,
+            )
+        )
+        # Éviter l'avertissement « exception never retrieved » après annulation
+        self.prefetch_task.add_done_callback(
+            lambda task: task.cancelled() or task.exception()
+        )
+
+    def cancel_source_prefetch(self):
+        """
+        Annule la pré-extraction des couleurs source en cours, s'il y en a une.
+        """
+        if self.prefetch_token is not None:
+            self.prefetch_token.cancel()
+        self.prefetch_task = None
+        self.prefetch_token = None
+        self.prefetch_key = None
+
+    async def prefetched_source_colors(self):
+        """
+        Attend la pré-extraction correspondant à la sélection courante.
+
+        Returns:
+            La carte des couleurs source, ou None si aucune pré-extraction
+            valide n'est disponible (le traitement extrait alors la source)
+
+        Raises:
+            ProcessingCancelled: Si le traitement est annulé pendant l'attente
+        """
+        if self.prefetch_task is None or self.prefetch_key != self.source_key():
+            return None
+        try:
+            return await self.prefetch_task
+        except ProcessingCancelled:
+            if self.cancel_token is not None and self.cancel_token.cancelled:
+                raise
+            return None
+        except Exception:
+            logger.warning("Pré-extraction des couleurs échouée", exc_info=True)
+            return None
+
+    def report_progress(self, phase, done, total):
+        """
+        Rappel de progression appelé depuis le thread de traitement.
+
+        L'état est seulement mémorisé ; l'interface est rafraîchie par
+        update_progress dans la boucle d'événements.
+
+        Args:
+            phase: Phase en cours
+            done: Lignes traitées dans la phase
+            total: Nombre total de lignes de la phase, ou None si inconnu
+        """
+        self.progress_state = (phase, done, total)
+
+    async def update_progress(self):
+        """
+        Rafraîchit la barre de progression, le débit et le temps restant.
+        """
+        current_phase = None
+        phase_start = time.monotonic()
+
+        while True:
+            state = self.progress_state
+            if state is not None and not self.cancel_token.cancelled:
+                phase, done, total = state
+                if phase != current_phase:
+                    current_phase = phase
+                    phase_start = time.monotonic()
+                    self.progress_label.text = (
+                        f"⏳ {self.phase_labels.get(phase, phase)}"
+                    )
+                    if total:
+                        self.progress_bar.stop()
+                        self.progress_bar.max = 1.0
+                    else:
+                        self.progress_bar.max = None
+                        self.progress_bar.start()
+
+                elapsed = time.monotonic() - phase_start
+                rate = done / elapsed if elapsed > 0 else 0.0
+                unit = "sources" if phase == PHASE_SOURCES else "lignes"
+                if total:
+                    self.progress_bar.value = min(done / total, 1.0)
+                    if rate > 0:
+                        remaining = format_duration((total - done) / rate)
+                        self.progress_stats_label.text = (
+                            f"{done} / {total} {unit} - {rate:.0f} {unit}/s - "
+                            f"reste environ {remaining}"
+                        )
+                    else:
+                        self.progress_stats_label.text = f"{done} / {total} {unit}"
+                elif done:
+                    self.progress_stats_label.text = (
+                        f"{done} {unit} - {rate:.0f} {unit}/s"
+                    )
+                else:
+                    self.progress_stats_label.text = ""
+            await asyncio.sleep(PROGRESS_REFRESH)
+
+    async def stop_progress(self):
+        """
+        Arrête le rafraîchissement de la progression et cache la barre.
+        """
+        if self.progress_task:
+            self.progress_task.cancel()
+            try:
+                await self.progress_task
+            except asyncio.CancelledError:
+                pass
+            self.progress_task = None
+        self.progress_bar.stop()
+
+        if self.progress_box in self.main_window.content.children:
+            self.main_window.content.remove(self.progress_box)
+
+    async def cancel_processing(self, widget):
+        """
+        Demande l'arrêt du traitement en cours.
+
+        Args:
+            widget: Le widget qui a déclenché l'événement (bouton)
+        """
+        if self.cancel_token is not None:
+            logger.info("Annulation du traitement demandée")
+            self.cancel_token.cancel()
+            self.cancel_source_prefetch()
+            self.cancel_button.enabled = False
+            self.progress_label.text = "⏳ Annulation en cours..."
+
+    def result_cache_key(self, sources):
+        """
+        Calcule la clé du cache des résultats pour la sélection courante.
+
+        Les options sont celles de l'interface (écriture openpyxl, toutes les
+        cellules de la ligne, appariement exact), qui sont aussi les valeurs
+        par défaut de apply_colors_to_file2.
+
+        Args:
+            sources: Couples (fichier, feuille) des sources sélectionnées
+
+        Returns:
+            Clé hexadécimale, ou None si un fichier est illisible
+        """
+        return result_key(
+            sources_digest(sources, PRECEDENCE_FIRST),
+            self.target_file_path,
+            self.target_sheet_name,
+            writer=WRITER_OPENPYXL,
+            paint_mode=PAINT_CELLS,
+            column_range=None,
+            normalization=None,
+            fuzzy=False,
+            fuzzy_threshold=DEFAULT_FUZZY_THRESHOLD,
+        )
+
+    def store_result(self, key, sources, output_file):
+        """
+        Conserve le fichier coloré dans le cache des résultats.
+
+        Le résultat n'est pas conservé si un fichier a été modifié pendant le
+        traitement.
+
+        Args:
+            key: Clé calculée avant le traitement
+            sources: Couples (fichier, feuille) des sources sélectionnées
+            output_file: Chemin du fichier coloré
+        """
+        if self.result_cache_key(sources) == key:
+            default_result_cache().put(key, output_file)
+
+    async def run_processing(self, sources):
+        """
+        Extrait les couleurs des sources et colore le fichier cible.
+
+        Args:
+            sources: Couples (fichier, feuille) des sources sélectionnées
+
+        Returns:
+            Tuple (chemin du fichier coloré ou None, clés en conflit)
+        """
+        conflicts = []
+        if len(sources) > 1:
+            # Sources en cache relues directement, les autres extraites
+            # en parallèle puis fusionnées
+            merged = await asyncio.to_thread(
+                get_merged_colors,
+                sources,
+                use_cache=True,
+                progress=self.report_progress,
+                cancel_token=self.cancel_token,
+            )
+            data_colors, conflicts = merged.colors, merged.conflicts
+            if not data_colors:
+                raise Exception("Aucune couleur trouvée dans les sources")
+        else:
+            # Réutiliser les couleurs source déjà extraites en arrière-plan
+            data_colors = await self.prefetched_source_colors()
+
+        # Appel de la fonction de traitement dans un thread séparé
+        # pour ne pas bloquer l'interface utilisateur
+        if data_colors is not None:
+            logger.info("Couleurs source déjà extraites réutilisées")
+            output_file = await asyncio.to_thread(
+                apply_color_map,
+                data_colors,
+                self.target_file_path,
+                self.target_sheet_name,
+                progress=self.report_progress,
+                cancel_token=self.cancel_token,
+            )
+        else:
+            output_file = await asyncio.to_thread(
+                apply_colors_to_file2,
+                self.source_file_path,
+                self.source_sheet_name,
+                self.target_file_path,
+                self.target_sheet_name,
+                progress=self.report_progress,
+                cancel_token=self.cancel_token,
+                use_result_cache=False,
+            )
+        return output_file, conflicts
+
+    async def start_processing(self, widget):
+        """
+        Lance le traitement de copie des couleurs.
+
+        Args:
+            widget: Le widget qui a déclenché l'événement (bouton)
+        """
+        logger.info("Démarrage du traitement")
+
+        # Désactiver les boutons de sélection et de traitement
+        self.source_button.enabled = False
+        self.target_button.enabled = False
+        self.process_button.enabled = False
+        self.dry_run_button.enabled = False
+        self.source_sheet_selection.enabled = False
+        self.add_merge_source_button.enabled = False
+        self.target_sheet_selection.enabled = False
+
+        # Cacher le résultat d'un traitement annulé précédent
+        if self.result_box in self.main_window.content.children:
+            self.main_window.content.remove(self.result_box)
+
+        # Afficher la progression
+        self.phase_labels = PHASE_LABELS
+        self.progress_label.text = "⏳ Traitement en cours"
+        self.progress_bar.value = 0
+        self.progress_stats_label.text = ""
+        self.cancel_button.enabled = True
+        if self.progress_box not in self.main_window.content.children:
+            self.main_window.content.add(self.progress_box)
+
+        # Démarrer le rafraîchissement de la progression
+        self.cancel_token = CancelToken()
+        self.progress_state = None
+        self.progress_task = asyncio.create_task(self.update_progress())
+
+        try:
+            sources = self.selected_sources()
+            conflicts = []
+            key = None
+            output_file = None
+            if self.result_cache_switch.value:
+                # Empreintes des fichiers calculées hors de la boucle d'événements
+                key = await asyncio.to_thread(self.result_cache_key, sources)
+                output_file = await asyncio.to_thread(
+                    default_result_cache().get,
+                    key,
+                    None,
+                    Path(self.target_file_path).name,
+                )
+            from_cache = output_file is not None
+            if not from_cache:
+                output_file, conflicts = await self.run_processing(sources)
+                if output_file is not None and key is not None:
+                    await asyncio.to_thread(
+                        self.store_result, key, sources, output_file
+                    )
+
+            if output_file is None:
+                raise Exception("Erreur lors de la création du fichier coloré")
+
+            # Sauvegarder le chemin du fichier traité (le résultat précédent,
+            # jamais enregistré, est supprimé)
+            release_output(self.processed_file_path)
+            self.processed_file_path = output_file
+
+            logger.info("Traitement terminé avec succès")
+
+            # Arrêter et cacher la progression
+            await self.stop_progress()
+
+            # Afficher le message de succès
+            self.result_label.text = (
+                "Traitement terminé ! Cliquez sur 'Enregistrer sous...'"
+            )
+            if self.result_box not in self.main_window.content.children:
+                self.main_window.content.add(self.result_box)
+
+            # Afficher les boutons post-traitement
+            if self.post_process_box not in self.main_window.content.children:
+                self.main_window.content.add(self.post_process_box)
+
+            # Afficher une boîte de dialogue de confirmation
+            message = "Le traitement est terminé avec succès !"
+            if from_cache:
+                message += (
+                    "\n\nRésultat d'un traitement identique réutilisé "
+                    "(mêmes fichiers, mêmes feuilles)."
+                )
+            if conflicts:
+                message += (
+                    f"\n\n{len(conflicts)} clés ont des couleurs différentes selon "
+                    "les sources : la couleur de la première source a été retenue."
+                )
+            await self.main_window.dialog(
+                toga.InfoDialog(
+                    "Succès",
+                    message
+                    + "\n\nCliquez sur 'Enregistrer sous...' pour sauvegarder le "
+                    "fichier.",
+                )
+            )
+
+        except ProcessingCancelled:
+            logger.info("Traitement annulé")
+
+            # Arrêter et cacher la progression
+            await self.stop_progress()
+
+            # Afficher le message d'annulation
+            self.result_label.text = "Traitement annulé"
+            if self.result_box not in self.main_window.content.children:
+                self.main_window.content.add(self.result_box)
+
+            # Réactiver les boutons
+            self.source_button.enabled = True
+            self.target_button.enabled = True
+            self.source_sheet_selection.enabled = True
+            self.add_merge_source_button.enabled = True
+            self.target_sheet_selection.enabled = True
+            self.update_process_button_state()
+
+        except Exception as e:
+            logger.error(f"Erreur lors du traitement: {e}", exc_info=True)
+
+            # Arrêter et cacher la progression
+            await self.stop_progress()
+
+            # Afficher le message d'erreur
+            self.result_label.text = f"Erreur: {str(e)}"
+            if self.result_box not in self.main_window.content.children:
+                self.main_window.content.add(self.result_box)
+
+            # Afficher le bouton de nouveau traitement
+            if self.post_process_box not in self.main_window.content.children:
+                self.main_window.content.add(self.post_process_box)
+
+            # Afficher une boîte de dialogue d'erreur
+            await self.main_window.dialog(
+                toga.ErrorDialog(
+                    "Erreur de traitement",
+                    f"Une erreur s'est produite lors du traitement:\n{str(e)}",
+                )
+            )
+
+            # Réactiver les boutons
+            self.source_button.enabled = True
+            self.target_button.enabled = True
+            self.source_sheet_selection.enabled = True
+            self.add_merge_source_button.enabled = True
+            self.target_sheet_selection.enabled = True
+            self.update_process_button_state()
+
+    async def start_dry_run(self, widget):
+        """
+        Simule le traitement : lit les couleurs source et les seules colonnes
+        clés de la cible, puis affiche les statistiques d'appariement.
+
+        Aucun fichier Excel n'est écrit ; le détail (lignes non appariées,
+        clés en conflit, clés source inutilisées) peut être enregistré en CSV.
+
+        Args:
+            widget: Le widget qui a déclenché l'événement (bouton)
+        """
+        logger.info("Démarrage de la simulation")
+
+        # Désactiver les boutons de sélection et de traitement
+        self.source_button.enabled = False
+        self.target_button.enabled = False
+        self.process_button.enabled = False
+        self.dry_run_button.enabled = False
+        self.source_sheet_selection.enabled = False
+        self.add_merge_source_button.enabled = False
+        self.target_sheet_selection.enabled = False
+
+        if self.result_box in self.main_window.content.children:
+            self.main_window.content.remove(self.result_box)
+
+        # Afficher la progression
+        self.phase_labels = DRY_RUN_PHASE_LABELS
+        self.progress_label.text = "⏳ Simulation en cours"
+        self.progress_bar.value = 0
+        self.progress_stats_label.text = ""
+        self.cancel_button.enabled = True
+        if self.progress_box not in self.main_window.content.children:
+            self.main_window.content.add(self.progress_box)
+
+        self.cancel_token = CancelToken()
+        self.progress_state = None
+        self.progress_task = asyncio.create_task(self.update_progress())
+
+        csv_path = scratch_output_path(DRY_RUN_CSV_NAME)
+        try:
+            stats = await asyncio.to_thread(
+                dry_run,
+                self.source_file_path,
+                self.source_sheet_name,
+                self.target_file_path,
+                self.target_sheet_name,
+                csv_path=str(csv_path),
+                progress=self.report_progress,
+                cancel_token=self.cancel_token,
+            )
+            await self.stop_progress()
+            if stats is None:
+                raise Exception("Erreur lors de la lecture des fichiers")
+
+            logger.info("Simulation terminée")
+            self.result_label.text = (
+                f"Simulation : {stats.rows_matched} / {stats.target_rows} "
+                "lignes seraient colorées"
+            )
+            if self.result_box not in self.main_window.content.children:
+                self.main_window.content.add(self.result_box)
+
+            has_details = (
+                stats.rows_unmatched
+                or stats.source_conflicts
+                or stats.source_keys_unused
+            )
+            if not has_details:
+                await self.main_window.dialog(
+                    toga.InfoDialog("Simulation", stats.summary())
+                )
+            elif await self.main_window.dialog(
+                toga.QuestionDialog(
+                    "Simulation",
+                    f"{stats.summary()}\n\nEnregistrer le détail au format CSV ?",
+                )
+            ):
+                original_path = Path(self.target_file_path)
+                save_path = await self.main_window.dialog(
+                    toga.SaveFileDialog(
+                        title="Enregistrer le rapport de simulation...",
+                        suggested_filename=f"{original_path.stem}_simulation.csv",
+                        file_types=["csv"],
+                    )
+                )
+                if save_path:
+                    shutil.move(stats.csv_path, str(save_path))
+                    logger.info(f"Rapport de simulation enregistré sous: {save_path}")
+
+        except ProcessingCancelled:
+            logger.info("Simulation annulée")
+            await self.stop_progress()
+            self.result_label.text = "Simulation annulée"
+            if self.result_box not in self.main_window.content.children:
+                self.main_window.content.add(self.result_box)
+
+        except Exception as e:
+            logger.error(f"Erreur lors de la simulation: {e}", exc_info=True)
+            await self.stop_progress()
+            await self.main_window.dialog(
+                toga.ErrorDialog(
+                    "Erreur de simulation",
+                    f"Une erreur s'est produite lors de la simulation:\n{str(e)}",
+                )
+            )
+
+        finally:
+            release_output(csv_path)
+
+            # Réactiver les boutons
+            self.source_button.enabled = True
+            self.target_button.enabled = True
+            self.source_sheet_selection.enabled = True
+            self.add_merge_source_button.enabled = True
+            self.target_sheet_selection.enabled = True
+            self.update_process_button_state()
+
+    async def save_as_file(self, widget):
+        """
+        Permet de sauvegarder le fichier traité à un nouvel emplacement.
+
+        Args:
+            widget: Le widget qui a déclenché l'événement (bouton)
+        """
+        try:
+            logger.info("Ouverture du sélecteur pour enregistrer sous")
+
+            # Proposer un nom de fichier par défaut avec _colored
+            original_path = Path(self.target_file_path)
+            default_name = f"{original_path.stem}_colored{original_path.suffix}"
+
+            save_path = await self.main_window.dialog(
+                toga.SaveFileDialog(
+                    title="Enregistrer le fichier sous...",
+                    suggested_filename=default_name,
+                    file_types=["xlsx"],
+                )
+            )
+
+            if save_path:
+                if is_scratch_output(self.processed_file_path):
+                    # Déplacer le résultat hors du dossier de travail (simple
+                    # renommage sur le même disque) puis supprimer ce dossier
+                    shutil.move(self.processed_file_path, str(save_path))
+                    release_output(self.processed_file_path)
+                    self.processed_file_path = str(save_path)
+                else:
+                    # Copier le fichier traité vers le nouvel emplacement
+                    shutil.copy2(self.processed_file_path, str(save_path))
+
+                logger.info(f"Fichier enregistré sous: {save_path}")
+
+                await self.main_window.dialog(
+                    toga.InfoDialog(
+                        "Succès",
+                        "Le fichier a été enregistré avec succès:\n"
+                        f"{Path(save_path).name}",
+                    )
+                )
+
+        except Exception as e:
+            logger.error(f"Erreur lors de l'enregistrement: {e}", exc_info=True)
+            await self.main_window.dialog(
+                toga.ErrorDialog(
+                    "Erreur",
+                    f"Une erreur s'est produite lors de l'enregistrement:\n{str(e)}",
+                )
+            )
+
+    async def reset_interface(self, widget):
+        """
+        Réinitialise l'interface pour un nouveau traitement.
+
+        Args:
+            widget: Le widget qui a déclenché l'événement (bouton)
+        """
+        logger.info("Réinitialisation de l'interface")
+
+        # Réinitialiser les variables d'état
+        self.source_file_path = None
+        self.source_sheet_name = None
+        self.target_file_path = None
+        self.target_sheet_name = None
+        release_output(self.processed_file_path)
+        self.processed_file_path = None
+        self.merge_sources = []
+
+        # Réinitialiser les labels
+        self.source_file_label.text = "Aucun fichier sélectionné"
+        self.merge_sources_label.text = ""
+        self.target_file_label.text = "Aucun fichier sélectionné"
+
+        # Cacher les sélecteurs de feuilles
+        if self.source_sheet_box in self.main_window.content.children:
+            self.main_window.content.remove(self.source_sheet_box)
+        if self.target_sheet_box in self.main_window.content.children:
+            self.main_window.content.remove(self.target_sheet_box)
+
+        # Cacher les éléments post-traitement
+        if self.progress_box in self.main_window.content.children:
+            self.main_window.content.remove(self.progress_box)
+        if self.result_box in self.main_window.content.children:
+            self.main_window.content.remove(self.result_box)
+        if self.post_process_box in self.main_window.content.children:
+            self.main_window.content.remove(self.post_process_box)
+
+        # Réactiver les boutons
+        self.source_button.enabled = True
+        self.target_button.enabled = True
+        self.source_sheet_selection.enabled = True
+        self.add_merge_source_button.enabled = True
+        self.target_sheet_selection.enabled = True
+
+        # Désactiver les boutons de traitement et de simulation
+        self.process_button.enabled = False
+        self.dry_run_button.enabled = False
+
+        logger.info("Interface réinitialisée")
@@ -0,0 +1,207 @@
+"""
+Persistent on-disk cache of extracted source color maps.
+
+Extracting the colors of a large source sheet is the most expensive part of a
+run, and the same source file and sheet are often processed again. Each color
+map is stored as one compressed file under the user cache directory, keyed by
+the source path, size, modification time and sheet name. The directory is kept
+under a size budget by evicting the least recently used entries.
+"""
+
+import hashlib
+import logging
+import os
+import sys
+import tempfile
+import zlib
+from pathlib import Path
+
+from .colormap import ColorMap
+
+logger = logging.getLogger(__name__)
+
+# Variable d'environnement permettant de déplacer le cache
+CACHE_DIR_ENV = "COLOREXCEL_CACHE_DIR"
+
+# Taille maximale par défaut du cache des cartes de couleurs (octets)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# À incrémenter lorsque le format ou le calcul des cartes change
+CACHE_VERSION = 3
+
+_ENTRY_SUFFIX = ".colors"
+
+
+def user_cache_dir() -> Path:
+    """
+    Return the per-user cache directory of the application.
+
+    Returns:
+        Path of the cache directory (not necessarily existing yet)
+    """
+    override = os.environ.get(CACHE_DIR_ENV)
+    if override:
+        return Path(override)
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+        return Path(base) / "ColorExcel" / "Cache"
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Caches" / "ColorExcel"
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "colorexcel"
+
+
+class ColorMapCache:
+    """
+    Size-bounded LRU cache of color maps stored as files.
+
+    The recency of an entry is its file modification time, refreshed on
+    every hit, so the cache needs no separate index file.
+    """
+
+    def __init__(self, directory=None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory) if directory else user_cache_dir() / "colors"
+        self.max_bytes = max_bytes
+
+    def key(self, file_path: str, sheet_name: str) -> str | None:
+        """
+        Compute the cache key of a source sheet.
+
+        Args:
+            file_path: Path to the source Excel file
+            sheet_name: Name of the source sheet
+
+        Returns:
+            Hex digest identifying this version of the file and sheet, or
+            None if the file cannot be read
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        identity = "\0".join(
+            (
+                str(CACHE_VERSION),
+                os.path.abspath(file_path),
+                str(stat.st_size),
+                str(stat.st_mtime_ns),
+                sheet_name,
+            )
+        )
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / f"{key}{_ENTRY_SUFFIX}"
+
+    def contains(self, file_path: str, sheet_name: str) -> bool:
+        """
+        Tell whether the color map of a source sheet is cached, without reading it.
+
+        Args:
+            file_path: Path to the source Excel file
+            sheet_name: Name of the source sheet
+
+        Returns:
+            True if an entry exists for this version of the file and sheet
+        """
+        key = self.key(file_path, sheet_name)
+        return key is not None and self._entry_path(key).exists()
+
+    def get(self, file_path: str, sheet_name: str) -> ColorMap | None:
+        """
+        Return the cached color map of a source sheet.
+
+        Args:
+            file_path: Path to the source Excel file
+            sheet_name: Name of the source sheet
+
+        Returns:
+            The color map, or None on a cache miss
+        """
+        key = self.key(file_path, sheet_name)
+        if key is None:
+            return None
+        entry = self._entry_path(key)
+        try:
+            data = entry.read_bytes()
+            data_colors = ColorMap.from_bytes(zlib.decompress(data))
+        except FileNotFoundError:
+            logger.info("Cache des couleurs manquant : %s [%s]", file_path, sheet_name)
+            return None
+        except Exception:
+            logger.warning("Entrée de cache illisible : %s", entry, exc_info=True)
+            entry.unlink(missing_ok=True)
+            return None
+
+        # Rafraîchir la date d'accès pour l'éviction LRU
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        logger.info(
+            "Cache des couleurs utilisé : %s [%s] (%d entrées)",
+            file_path,
+            sheet_name,
+            len(data_colors),
+        )
+        return data_colors
+
+    def put(self, file_path: str, sheet_name: str, data_colors: dict) -> None:
+        """
+        Store the color map of a source sheet.
+
+        Args:
+            file_path: Path to the source Excel file
+            sheet_name: Name of the source sheet
+            data_colors: Color map to store
+        """
+        key = self.key(file_path, sheet_name)
+        if key is None:
+            return
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if not isinstance(data_colors, ColorMap):
+                data_colors = ColorMap(data_colors)
+            payload = zlib.compress(data_colors.to_bytes())
+            # Écriture atomique : fichier temporaire puis renommage
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(payload)
+            os.replace(tmp_path, self._entry_path(key))
+        except OSError:
+            logger.warning("Impossible d'écrire dans le cache", exc_info=True)
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache fits its budget."""
+        try:
+            entries = [
+                (entry.stat().st_mtime_ns, entry.stat().st_size, entry)
+                for entry in self.directory.glob(f"*{_ENTRY_SUFFIX}")
+            ]
+        except OSError:
+            return
+        total = sum(size for _mtime, size, _entry in entries)
+        for _mtime, size, entry in sorted(entries, key=lambda item: item[0]):
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+            logger.info("Entrée de cache évincée : %s", entry.name)
+
+    def clear(self) -> None:
+        """Remove every entry of the cache."""
+        for entry in self.directory.glob(f"*{_ENTRY_SUFFIX}"):
+            entry.unlink(missing_ok=True)
+
+
+_default_cache: ColorMapCache | None = None
+
+
+def default_cache() -> ColorMapCache:
+    """Return the process-wide color map cache in the user cache directory."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ColorMapCache()
+    return _default_cache
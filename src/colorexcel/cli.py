@@ -0,0 +1,962 @@
+"""
+Interface en ligne de commande (sans interface graphique) de ColorExcel.
+
+La commande ``batch`` extrait une seule fois la carte des couleurs du fichier
+source, puis recolore plusieurs fichiers cibles en parallèle dans un pool de
+processus::
+
+    colorexcel batch --source s.xlsx --source-sheet X --targets dir/*.xlsx --out outdir
+
+Plusieurs sources (un classeur par site, par exemple) sont fusionnées en
+répétant ``--source`` ; ``--source-sheet`` est alors donné une fois pour
+toutes les sources ou une fois par source, dans le même ordre.
+
+Avec ``--incremental``, un manifeste est écrit à côté de chaque fichier de
+sortie ; au lancement suivant, seules les lignes dont la couleur a changé sont
+recolorées dans le fichier de sortie existant.
+
+La commande ``watch`` garde la carte des couleurs en mémoire et recolore les
+cibles d'un dossier dès qu'elles, ou la source, sont modifiées::
+
+    colorexcel watch --source s.xlsx --source-sheet X --targets-dir dir --out outdir
+
+La commande ``dry-run`` affiche, sans rien écrire, combien de lignes cibles
+seraient colorées, les clés source inutilisées et les clés en conflit::
+
+    colorexcel dry-run --source s.xlsx --source-sheet X --target c.xlsx --csv r.csv
+
+La commande ``serve`` démarre un service HTTP local : les fichiers source et
+cible déposés sont recolorés dans un pool de processus borné, et le résultat
+est téléchargé une fois le travail terminé (voir colorexcel.service)::
+
+    colorexcel serve --port 8765 --workers 2 --max-queued 8
+"""
+
+import argparse
+import glob
+import hashlib
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from .dryrun import dry_run
+from .incremental import apply_color_map_incremental, source_checksum
+from .instrumentation import RunReport
+from .jobs import (
+    DEFAULT_HOST,
+    DEFAULT_KEEP,
+    DEFAULT_MAX_QUEUED,
+    DEFAULT_MAX_UPLOAD,
+    DEFAULT_PORT,
+    DEFAULT_TIMEOUT,
+    JobQueue,
+)
+from .logic import (
+    ALL_SHEETS,
+    ENGINE_OPENPYXL,
+    ENGINE_READONLY,
+    ENGINE_XML,
+    PAINT_CELLS,
+    PAINT_ROW,
+    WRITER_OPENPYXL,
+    WRITER_XML,
+    apply_color_map,
+    get_implantation_colors,
+    get_sheet_names,
+)
+from .matching import DEFAULT_FUZZY_THRESHOLD, MATCH_EXACT, NORMALIZATIONS
+from .results import default_result_cache, result_key, sources_digest
+from .sources import PRECEDENCE_FIRST, PRECEDENCES, get_merged_colors
+from .watch import DEFAULT_DEBOUNCE, DEFAULT_POLL_INTERVAL, WatchService
+
+logger = logging.getLogger(__name__)
+
+# Sous-commandes reconnues par le point d'entrée principal
+COMMANDS = ("batch", "dry-run", "watch", "serve")
+
+# Carte des couleurs partagée par les processus du pool (voir _init_worker)
+_worker_colors: dict = {}
+
+
+def _init_worker(data_colors: dict) -> None:
+    """
+    Initialise un processus du pool avec la carte des couleurs source.
+
+    La carte est transmise une seule fois par processus plutôt qu'à chaque
+    fichier cible.
+
+    Args:
+        data_colors: Carte (implantation, nom, prenom) -> RGB
+    """
+    global _worker_colors
+    _worker_colors = data_colors
+
+
+def colored_output_path(target_path: str, out_dir: str) -> str:
+    """
+    Construit le chemin de sortie d'un fichier cible recoloré.
+
+    Args:
+        target_path: Chemin du fichier cible
+        out_dir: Dossier de sortie
+
+    Returns:
+        Chemin '<out_dir>/<nom>_colored<extension>'
+    """
+    original = Path(target_path)
+    return str(Path(out_dir) / f"{original.stem}_colored{original.suffix}")
+
+
+def parse_column_range(text: str) -> tuple[int, int]:
+    """
+    Analyse une plage de colonnes de la forme 'A:K' ou '1:11'.
+
+    Args:
+        text: Plage saisie sur la ligne de commande
+
+    Returns:
+        Tuple (première, dernière) colonne, numérotées à partir de 1
+
+    Raises:
+        argparse.ArgumentTypeError: Si la plage est invalide
+    """
+    from openpyxl.utils.cell import column_index_from_string
+
+    try:
+        first, last = (
+            int(part) if part.isdigit() else column_index_from_string(part.upper())
+            for part in text.split(":")
+        )
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"plage de colonnes invalide : {text}")
+    if not 1 <= first <= last:
+        raise argparse.ArgumentTypeError(f"plage de colonnes invalide : {text}")
+    return first, last
+
+
+def _target_sheets(target_sheets: list[str] | None, target_path: str):
+    """
+    Détermine la sélection de feuilles cibles d'un fichier.
+
+    Args:
+        target_sheets: Feuilles demandées (``*`` pour toutes celles qui ont les
+            colonnes clés), ou None pour la première feuille
+        target_path: Chemin du fichier cible
+
+    Returns:
+        Nom de feuille, liste de noms ou ALL_SHEETS ; None si les feuilles du
+        fichier sont illisibles
+    """
+    if not target_sheets:
+        sheet_names = get_sheet_names(target_path)
+        return sheet_names[0] if sheet_names else None
+    if ALL_SHEETS in target_sheets:
+        return ALL_SHEETS
+    return target_sheets[0] if len(target_sheets) == 1 else list(target_sheets)
+
+
+def _source_pairs(
+    source_paths: list[str], source_sheets: list[str]
+) -> list[tuple[str, str]] | None:
+    """
+    Associe chaque fichier source à sa feuille.
+
+    Args:
+        source_paths: Fichiers sources, dans l'ordre de priorité
+        source_sheets: Une feuille pour toutes les sources, ou une par source
+
+    Returns:
+        Liste de couples (fichier, feuille), ou None si les nombres de
+        fichiers et de feuilles ne concordent pas
+    """
+    if len(source_sheets) == 1:
+        return [(path, source_sheets[0]) for path in source_paths]
+    if len(source_sheets) != len(source_paths):
+        return None
+    return list(zip(source_paths, source_sheets))
+
+
+def _sources_checksum(sources: list[tuple[str, str]], precedence: str) -> str | None:
+    """
+    Somme de contrôle de l'ensemble des sources, pour le mode incrémental.
+
+    Args:
+        sources: Couples (fichier, feuille) dans l'ordre de priorité
+        precedence: Priorité des sources (PRECEDENCE_FIRST ou PRECEDENCE_LAST)
+
+    Returns:
+        Empreinte hexadécimale, ou None si une source est illisible
+    """
+    checksums = [source_checksum(path, sheet) for path, sheet in sources]
+    if None in checksums:
+        return None
+    if len(checksums) == 1:
+        return checksums[0]
+    return hashlib.sha256("\0".join([precedence, *checksums]).encode()).hexdigest()
+
+
+def process_target(
+    target_path: str,
+    target_sheet: list[str] | None,
+    out_dir: str,
+    writer: str,
+    paint_mode: str = PAINT_CELLS,
+    column_range: tuple[int, int] | None = None,
+    report_path: str | None = None,
+    normalize: str = MATCH_EXACT,
+    fuzzy: bool = False,
+    fuzzy_threshold: float = DEFAULT_FUZZY_THRESHOLD,
+    incremental: bool = False,
+    source: str | None = None,
+    result_source: str | None = None,
+) -> tuple[str, str | None, float, str | None]:
+    """
+    Recolore un fichier cible avec la carte des couleurs du processus.
+
+    Args:
+        target_path: Chemin du fichier cible
+        target_sheet: Feuilles cibles (``*`` pour toutes celles qui ont les
+            colonnes clés), ou None pour la première feuille
+        out_dir: Dossier de sortie
+        writer: Mode d'écriture (WRITER_OPENPYXL ou WRITER_XML)
+        paint_mode: Mode de coloration (PAINT_CELLS ou PAINT_ROW)
+        column_range: Plage de colonnes à colorer, ou None
+        report_path: Fichier JSON lines recevant le rapport par phase, ou None
+        normalize: Préréglage de normalisation des clés (voir NORMALIZATIONS)
+        fuzzy: Apparier aussi les lignes restantes par similarité des noms
+        fuzzy_threshold: Similarité minimale d'un appariement approché
+        incremental: Ne recolorer que les lignes modifiées depuis le
+            traitement précédent du même fichier de sortie (écriture XML)
+        source: Somme de contrôle des sources, pour le mode incrémental
+        result_source: Empreinte des sources (voir results.sources_digest)
+            pour réutiliser le résultat en cache d'une cible inchangée, ou
+            None pour toujours traiter la cible ; ignorée en mode incrémental
+
+    Returns:
+        Tuple (target_path, output_path ou None, durée en secondes, erreur ou None)
+    """
+    start = time.perf_counter()
+    report = RunReport(label=target_path, jsonl_path=report_path)
+    sheet = _target_sheets(target_sheet, target_path)
+    if sheet is None:
+        return target_path, None, time.perf_counter() - start, "feuilles illisibles"
+
+    options = dict(
+        paint_mode=paint_mode,
+        column_range=column_range,
+        report=report,
+        normalization=NORMALIZATIONS[normalize],
+        fuzzy=fuzzy,
+        fuzzy_threshold=fuzzy_threshold,
+    )
+    output_path = colored_output_path(target_path, out_dir)
+
+    def run_key():
+        return result_key(
+            result_source,
+            target_path,
+            sheet,
+            writer=writer,
+            paint_mode=paint_mode,
+            column_range=column_range,
+            normalization=options["normalization"],
+            fuzzy=fuzzy,
+            fuzzy_threshold=fuzzy_threshold,
+        )
+
+    key = None
+    if result_source is not None and not incremental:
+        key = run_key()
+        output = default_result_cache().get(key, output_path)
+        if output is not None:
+            report.close()
+            return target_path, output, time.perf_counter() - start, None
+
+    if incremental:
+        output = apply_color_map_incremental(
+            _worker_colors, target_path, sheet, output_path, source=source, **options
+        )
+    else:
+        output = apply_color_map(
+            _worker_colors,
+            target_path,
+            sheet,
+            output_path=output_path,
+            writer=writer,
+            **options,
+        )
+    # Cible modifiée pendant le traitement : résultat non conservé
+    if output and key is not None and run_key() == key:
+        default_result_cache().put(key, output)
+    report.close()
+    error = None if output else "échec du traitement (voir les logs)"
+    return target_path, output, time.perf_counter() - start, error
+
+
+def expand_targets(patterns: list[str]) -> list[str]:
+    """
+    Développe les motifs glob des fichiers cibles (utile sous Windows).
+
+    Args:
+        patterns: Chemins ou motifs glob
+
+    Returns:
+        Liste triée et dédupliquée des fichiers trouvés
+    """
+    targets = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern)
+        if matches:
+            targets.update(matches)
+        elif os.path.exists(pattern):
+            targets.add(pattern)
+        else:
+            logger.warning("Aucun fichier ne correspond à : %s", pattern)
+    return sorted(targets)
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    """
+    Exécute la commande ``batch``.
+
+    Args:
+        args: Arguments analysés par argparse
+
+    Returns:
+        Code de sortie (0 si tous les fichiers ont été traités)
+    """
+    targets = expand_targets(args.targets)
+    if not targets:
+        print("Aucun fichier cible à traiter.", file=sys.stderr)
+        return 2
+
+    os.makedirs(args.out, exist_ok=True)
+
+    sources = _source_pairs(args.source, args.source_sheet)
+    if sources is None:
+        print(
+            "Indiquez une feuille source pour toutes les sources ou une par source.",
+            file=sys.stderr,
+        )
+        return 2
+
+    start = time.perf_counter()
+    # Empreinte des sources prise avant leur extraction
+    result_source = (
+        sources_digest(sources, args.precedence) if args.result_cache else None
+    )
+    if len(sources) == 1:
+        data_colors = get_implantation_colors(
+            *sources[0], engine=args.engine, use_cache=args.cache
+        )
+        conflicts = []
+    else:
+        merged = get_merged_colors(
+            sources,
+            engine=args.engine,
+            use_cache=args.cache,
+            precedence=args.precedence,
+            conflicts_csv=args.conflicts,
+        )
+        data_colors, conflicts = merged.colors, merged.conflicts
+    source_seconds = time.perf_counter() - start
+    if not data_colors:
+        print("Aucune couleur extraite des sources.", file=sys.stderr)
+        return 2
+    print(
+        f"Source : {len(data_colors)} couleurs extraites de {len(sources)} "
+        f"source(s) en {source_seconds:.2f} s"
+    )
+    if conflicts:
+        print(
+            f"  {len(conflicts)} clés colorées différemment selon les "
+            f"sources (priorité : {args.precedence})"
+        )
+
+    source = _sources_checksum(sources, args.precedence) if args.incremental else None
+    failures = 0
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        initializer=_init_worker,
+        initargs=(data_colors,),
+    ) as executor:
+        futures = [
+            executor.submit(
+                process_target,
+                target,
+                args.target_sheet,
+                args.out,
+                args.writer,
+                args.paint_mode,
+                args.columns,
+                args.report,
+                args.normalize,
+                args.fuzzy,
+                args.fuzzy_threshold,
+                args.incremental,
+                source,
+                result_source,
+            )
+            for target in targets
+        ]
+        for future in as_completed(futures):
+            target, output, seconds, error = future.result()
+            if output:
+                print(f"  OK     {seconds:7.2f} s  {target} -> {output}")
+            else:
+                failures += 1
+                print(f"  ERREUR {seconds:7.2f} s  {target} : {error}")
+
+    total = time.perf_counter() - start
+    print(
+        f"{len(targets) - failures}/{len(targets)} fichiers traités "
+        f"en {total:.2f} s"
+    )
+    return 1 if failures else 0
+
+
+def _print_result(
+    target: str, output: str | None, seconds: float, error: str | None
+) -> None:
+    """Affiche le résultat du traitement d'un fichier cible."""
+    if output:
+        print(f"  OK     {seconds:7.2f} s  {target} -> {output}", flush=True)
+    else:
+        print(f"  ERREUR {seconds:7.2f} s  {target} : {error}", flush=True)
+
+
+def run_watch(args: argparse.Namespace) -> int:
+    """
+    Exécute la commande ``watch`` jusqu'à Ctrl+C ou SIGTERM.
+
+    Args:
+        args: Arguments analysés par argparse
+
+    Returns:
+        Code de sortie (0 à l'arrêt normal)
+    """
+    if not os.path.isdir(args.targets_dir):
+        print(f"Dossier introuvable : {args.targets_dir}", file=sys.stderr)
+        return 2
+    sources = _source_pairs(args.source, args.source_sheet)
+    if sources is None:
+        print(
+            "Indiquez une feuille source pour toutes les sources ou une par source.",
+            file=sys.stderr,
+        )
+        return 2
+
+    try:
+        service = WatchService(
+            sources,
+            args.targets_dir,
+            args.out,
+            target_sheet=args.target_sheet,
+            options=dict(
+                writer=args.writer,
+                paint_mode=args.paint_mode,
+                column_range=args.columns,
+                report_path=args.report,
+                normalize=args.normalize,
+                fuzzy=args.fuzzy,
+                fuzzy_threshold=args.fuzzy_threshold,
+                incremental=args.incremental,
+            ),
+            result_cache=args.result_cache,
+            engine=args.engine,
+            use_cache=args.cache,
+            precedence=args.precedence,
+            workers=args.workers,
+            debounce=args.debounce,
+            poll_interval=args.poll_interval,
+            polling=args.polling,
+            on_result=_print_result,
+        )
+    except ValueError as exc:
+        print(str(exc), file=sys.stderr)
+        return 2
+
+    stop_event = threading.Event()
+    # Arrêt propre du service lancé en tâche de fond (systemd, docker...)
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    print(f"Surveillance de {args.targets_dir} (Ctrl+C pour arrêter)", flush=True)
+    try:
+        started = service.run(stop_event)
+    except KeyboardInterrupt:
+        started = True
+    if not started:
+        print("Aucune couleur extraite des sources.", file=sys.stderr)
+        return 2
+    print("Surveillance arrêtée.")
+    return 0
+
+
+def run_serve(args: argparse.Namespace) -> int:
+    """
+    Exécute la commande ``serve`` jusqu'à Ctrl+C ou SIGTERM.
+
+    Args:
+        args: Arguments analysés par argparse
+
+    Returns:
+        Code de sortie (0 à l'arrêt normal)
+    """
+    # Importé ici seulement : http.server alourdirait le démarrage des
+    # autres commandes
+    from .service import ServiceHTTPServer
+
+    try:
+        queue = JobQueue(
+            work_dir=args.work_dir,
+            workers=args.workers,
+            max_queued=args.max_queued,
+            timeout=args.timeout or None,
+            keep=args.keep,
+            result_cache=args.result_cache,
+        )
+    except (ValueError, OSError) as exc:
+        print(str(exc), file=sys.stderr)
+        return 2
+    try:
+        server = ServiceHTTPServer(
+            (args.host, args.port), queue, max_upload=args.max_upload_mb * 1024 * 1024
+        )
+    except OSError as exc:
+        queue.close()
+        print(
+            f"Impossible d'écouter sur {args.host}:{args.port} : {exc}", file=sys.stderr
+        )
+        return 2
+
+    # Arrêt propre du service lancé en tâche de fond (systemd, docker...) ;
+    # shutdown() attend la fin de serve_forever, donc depuis un autre thread
+    signal.signal(
+        signal.SIGTERM,
+        lambda signum, frame: threading.Thread(target=server.shutdown).start(),
+    )
+    host, port = server.server_address[:2]
+    print(
+        f"Service en écoute sur http://{host}:{port} ({queue.workers} processus, "
+        f"{queue.max_queued} travaux en attente au plus ; Ctrl+C pour arrêter)",
+        flush=True,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        queue.close()
+    print("Service arrêté.")
+    return 0
+
+
+def run_dry_run(args: argparse.Namespace) -> int:
+    """
+    Exécute la commande ``dry-run``.
+
+    Args:
+        args: Arguments analysés par argparse
+
+    Returns:
+        Code de sortie (0 si la simulation a abouti)
+    """
+    target_sheet = _target_sheets(args.target_sheet, args.target)
+    if target_sheet is None:
+        print(f"Feuilles illisibles : {args.target}", file=sys.stderr)
+        return 2
+
+    report = RunReport(label=args.target, jsonl_path=args.report)
+    stats = dry_run(
+        args.source,
+        args.source_sheet,
+        args.target,
+        target_sheet,
+        engine=args.engine,
+        normalization=NORMALIZATIONS[args.normalize],
+        fuzzy=args.fuzzy,
+        fuzzy_threshold=args.fuzzy_threshold,
+        csv_path=args.csv,
+        report=report,
+    )
+    report.close()
+    if stats is None:
+        print("Échec de la simulation (voir les logs).", file=sys.stderr)
+        return 2
+    print(stats.summary())
+    print(f"Simulation en {stats.wall_s:.2f} s")
+    return 0
+
+
+def _add_matching_arguments(parser: argparse.ArgumentParser) -> None:
+    """Ajoute les options d'appariement des clés communes aux commandes."""
+    parser.add_argument(
+        "--normalize",
+        choices=tuple(NORMALIZATIONS),
+        default=MATCH_EXACT,
+        help="Comparer aussi les clés normalisées : espaces, casse et Unicode "
+        "(standard), et accents (accents)",
+    )
+    parser.add_argument(
+        "--fuzzy",
+        action="store_true",
+        help="Apparier les lignes restantes au nom le plus proche de la même "
+        "implantation",
+    )
+    parser.add_argument(
+        "--fuzzy-threshold",
+        type=float,
+        default=DEFAULT_FUZZY_THRESHOLD,
+        help="Similarité minimale (0 à 1) d'un appariement approché",
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Construit l'analyseur des arguments de la ligne de commande."""
+    parser = argparse.ArgumentParser(
+        prog="colorexcel",
+        description="Traitements ColorExcel sans interface graphique.",
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="Afficher les logs détaillés"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    batch = subparsers.add_parser(
+        "batch", help="Recolorer plusieurs fichiers cibles depuis une même source"
+    )
+    batch.add_argument(
+        "--source",
+        required=True,
+        action="append",
+        help="Fichier Excel source ; à répéter pour fusionner plusieurs sources",
+    )
+    batch.add_argument(
+        "--source-sheet",
+        required=True,
+        action="append",
+        help="Feuille source, commune à toutes les sources ou répétée pour chacune",
+    )
+    batch.add_argument(
+        "--precedence",
+        choices=PRECEDENCES,
+        default=PRECEDENCE_FIRST,
+        help="Source retenue pour une clé présente dans plusieurs sources : la "
+        "première ou la dernière indiquée",
+    )
+    batch.add_argument(
+        "--conflicts",
+        default=None,
+        help="Fichier CSV recevant les clés colorées différemment selon les sources",
+    )
+    batch.add_argument(
+        "--targets",
+        required=True,
+        nargs="+",
+        help="Fichiers cibles ou motifs glob (ex. dossier/*.xlsx)",
+    )
+    batch.add_argument(
+        "--target-sheet",
+        nargs="+",
+        default=None,
+        help="Feuilles cibles, ou '*' pour toutes celles qui ont les colonnes "
+        "clés (par défaut : première feuille de chaque fichier)",
+    )
+    batch.add_argument("--out", required=True, help="Dossier de sortie")
+    batch.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Nombre de processus (par défaut : nombre de cœurs)",
+    )
+    batch.add_argument(
+        "--engine",
+        choices=(ENGINE_OPENPYXL, ENGINE_READONLY, ENGINE_XML),
+        default=ENGINE_OPENPYXL,
+        help="Moteur d'extraction des couleurs source",
+    )
+    batch.add_argument(
+        "--writer",
+        choices=(WRITER_OPENPYXL, WRITER_XML),
+        default=WRITER_OPENPYXL,
+        help="Mode d'écriture des fichiers cibles",
+    )
+    batch.add_argument(
+        "--paint-mode",
+        choices=(PAINT_CELLS, PAINT_ROW),
+        default=PAINT_CELLS,
+        help="Colorer toutes les cellules de la ligne, ou un style de ligne "
+        "et les seules cellules renseignées",
+    )
+    batch.add_argument(
+        "--columns",
+        type=parse_column_range,
+        default=None,
+        help="Plage de colonnes à colorer (ex. A:K)",
+    )
+    _add_matching_arguments(batch)
+    batch.add_argument(
+        "--report",
+        default=None,
+        help="Fichier JSON lines recevant le temps et la mémoire de chaque "
+        "phase, par fichier cible",
+    )
+    batch.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Écrire un manifeste à côté de chaque fichier de sortie et, au "
+        "lancement suivant, ne recolorer que les lignes dont la couleur a "
+        "changé (mode d'écriture xml)",
+    )
+    batch.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="Ne pas utiliser le cache des couleurs source",
+    )
+    batch.add_argument(
+        "--no-result-cache",
+        dest="result_cache",
+        action="store_false",
+        help="Toujours traiter les cibles, même si le résultat d'une cible et "
+        "d'une source inchangées est en cache",
+    )
+    batch.set_defaults(func=run_batch)
+
+    watch = subparsers.add_parser(
+        "watch",
+        help="Recolorer les cibles d'un dossier dès qu'elles ou la source changent",
+    )
+    watch.add_argument(
+        "--source",
+        required=True,
+        action="append",
+        help="Fichier Excel source ; à répéter pour fusionner plusieurs sources",
+    )
+    watch.add_argument(
+        "--source-sheet",
+        required=True,
+        action="append",
+        help="Feuille source, commune à toutes les sources ou répétée pour chacune",
+    )
+    watch.add_argument(
+        "--precedence",
+        choices=PRECEDENCES,
+        default=PRECEDENCE_FIRST,
+        help="Source retenue pour une clé présente dans plusieurs sources",
+    )
+    watch.add_argument(
+        "--targets-dir",
+        required=True,
+        help="Dossier des fichiers cibles surveillés (sans les sous-dossiers)",
+    )
+    watch.add_argument(
+        "--target-sheet",
+        nargs="+",
+        default=None,
+        help="Feuilles cibles, ou '*' pour toutes celles qui ont les colonnes "
+        "clés (par défaut : première feuille de chaque fichier)",
+    )
+    watch.add_argument(
+        "--out",
+        required=True,
+        help="Dossier de sortie, différent du dossier surveillé",
+    )
+    watch.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Nombre maximal de fichiers traités en même temps (par défaut : "
+        "nombre de cœurs)",
+    )
+    watch.add_argument(
+        "--debounce",
+        type=float,
+        default=DEFAULT_DEBOUNCE,
+        help="Délai sans modification (secondes) avant de traiter un fichier",
+    )
+    watch.add_argument(
+        "--poll-interval",
+        type=float,
+        default=DEFAULT_POLL_INTERVAL,
+        help="Intervalle (secondes) de vérification des fichiers",
+    )
+    watch.add_argument(
+        "--polling",
+        action="store_true",
+        help="Scruter les fichiers même si watchdog est installé (partages "
+        "réseau sans notifications)",
+    )
+    watch.add_argument(
+        "--engine",
+        choices=(ENGINE_OPENPYXL, ENGINE_READONLY, ENGINE_XML),
+        default=ENGINE_XML,
+        help="Moteur d'extraction des couleurs source",
+    )
+    watch.add_argument(
+        "--writer",
+        choices=(WRITER_OPENPYXL, WRITER_XML),
+        default=WRITER_XML,
+        help="Mode d'écriture des fichiers cibles",
+    )
+    watch.add_argument(
+        "--paint-mode",
+        choices=(PAINT_CELLS, PAINT_ROW),
+        default=PAINT_CELLS,
+        help="Colorer toutes les cellules de la ligne, ou un style de ligne "
+        "et les seules cellules renseignées",
+    )
+    watch.add_argument(
+        "--columns",
+        type=parse_column_range,
+        default=None,
+        help="Plage de colonnes à colorer (ex. A:K)",
+    )
+    _add_matching_arguments(watch)
+    watch.add_argument(
+        "--report",
+        default=None,
+        help="Fichier JSON lines recevant le temps et la mémoire de chaque "
+        "phase, par fichier cible",
+    )
+    watch.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Ne recolorer que les lignes dont la couleur a changé depuis le "
+        "traitement précédent de chaque fichier de sortie",
+    )
+    watch.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="Ne pas utiliser le cache des couleurs source",
+    )
+    watch.add_argument(
+        "--no-result-cache",
+        dest="result_cache",
+        action="store_false",
+        help="Toujours traiter les cibles, même si le résultat d'une cible et "
+        "d'une source inchangées est en cache",
+    )
+    watch.set_defaults(func=run_watch)
+
+    serve = subparsers.add_parser(
+        "serve",
+        help="Service HTTP local recolorant les fichiers déposés par les clients",
+    )
+    serve.add_argument(
+        "--host",
+        default=DEFAULT_HOST,
+        help="Adresse d'écoute (par défaut : la machine locale seulement ; le "
+        "service n'a pas d'authentification)",
+    )
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port d'écoute")
+    serve.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Nombre de travaux exécutés en même temps (par défaut : nombre de "
+        "cœurs)",
+    )
+    serve.add_argument(
+        "--max-queued",
+        type=int,
+        default=DEFAULT_MAX_QUEUED,
+        help="Nombre de travaux en attente au-delà duquel les dépôts sont "
+        "refusés (HTTP 503)",
+    )
+    serve.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help="Durée maximale d'un travail en secondes (0 : sans limite)",
+    )
+    serve.add_argument(
+        "--max-upload-mb",
+        type=int,
+        default=DEFAULT_MAX_UPLOAD // (1024 * 1024),
+        help="Taille maximale d'un dépôt (Mio)",
+    )
+    serve.add_argument(
+        "--keep",
+        type=float,
+        default=DEFAULT_KEEP,
+        help="Durée de conservation des résultats en secondes",
+    )
+    serve.add_argument(
+        "--work-dir",
+        default=None,
+        help="Dossier des fichiers des travaux (par défaut : dossier temporaire "
+        "supprimé à l'arrêt)",
+    )
+    serve.add_argument(
+        "--no-result-cache",
+        dest="result_cache",
+        action="store_false",
+        help="Toujours traiter les travaux, même si le résultat de fichiers "
+        "identiques est en cache",
+    )
+    serve.set_defaults(func=run_serve)
+
+    simulation = subparsers.add_parser(
+        "dry-run",
+        help="Compter les lignes cibles qui seraient colorées, sans rien écrire",
+    )
+    simulation.add_argument("--source", required=True, help="Fichier Excel source")
+    simulation.add_argument("--source-sheet", required=True, help="Feuille source")
+    simulation.add_argument("--target", required=True, help="Fichier Excel cible")
+    simulation.add_argument(
+        "--target-sheet",
+        nargs="+",
+        default=None,
+        help="Feuilles cibles, ou '*' pour toutes celles qui ont les colonnes "
+        "clés (par défaut : première feuille du fichier)",
+    )
+    simulation.add_argument(
+        "--engine",
+        choices=(ENGINE_OPENPYXL, ENGINE_READONLY, ENGINE_XML),
+        default=ENGINE_XML,
+        help="Moteur d'extraction des couleurs source",
+    )
+    _add_matching_arguments(simulation)
+    simulation.add_argument(
+        "--csv",
+        default=None,
+        help="Fichier CSV recevant les lignes non appariées, les clés en "
+        "conflit et les clés source inutilisées",
+    )
+    simulation.add_argument(
+        "--report",
+        default=None,
+        help="Fichier JSON lines recevant le temps et la mémoire de chaque phase",
+    )
+    simulation.set_defaults(func=run_dry_run)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Point d'entrée de la ligne de commande.
+
+    Args:
+        argv: Arguments (sans le nom du programme), sys.argv[1:] par défaut
+
+    Returns:
+        Code de sortie
+    """
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        force=True,
+    )
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
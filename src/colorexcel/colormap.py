@@ -0,0 +1,417 @@
+"""
+Compact colour map for very large source sheets.
+
+A plain ``dict[(implantation, nom, prenom)] -> (r, g, b)`` costs several
+hundred bytes per entry (the dict slot, the key tuple, its strings and the
+colour tuple). ColorMap stores the same mapping as:
+
+* a sorted ``array('Q')`` of 64-bit BLAKE2b hashes of the encoded keys;
+* a parallel array of indices into a small palette of distinct colours;
+* a parallel array of offsets into a single ``bytearray`` holding the
+  encoded keys, so that lookups compare the exact key and two keys sharing a
+  hash are both kept (a collision only costs one more comparison).
+
+This is around 50 bytes per entry for typical names. The map behaves like a
+dict (MutableMapping) and converts to and from bytes in one pass, for the
+cache and for transfer between processes.
+
+Insertions are appended to an unsorted tail indexed by a small dict, and
+sorted into place once the tail grows to half the sorted part (or before
+iterating), so building a map row by row stays linear even when lookups
+and insertions alternate. Iteration follows hash order, not insertion
+order.
+"""
+
+import pickle
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import ItemsView, MutableMapping
+from hashlib import blake2b as _blake2b
+
+# En-tête du format sérialisé : signature, version, nombre d'entrées,
+# taille de la palette, taille du bloc de clés, octets par indice de couleur
+_MAGIC = b"CXCM"
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sHQIQB")
+
+# Séparateur des clés composées uniquement de texte (encodage rapide)
+_TEXT_SEPARATOR = "\x1f"
+
+# Préfixes d'encodage : clé texte, clé générique et types des composants
+_TEXT_KEY = b"T"
+_GENERIC_KEY = b"G"
+_PART_STR = b"s"
+_PART_INT = b"i"
+_PART_FLOAT = b"f"
+_PART_PICKLE = b"p"
+
+_LENGTH = struct.Struct("<I")
+
+# Taille minimale de la file d'attente avant de la trier dans les entrées
+_COMPACT_MIN = 65536
+
+
+def encode_key(key: tuple) -> bytes:
+    """
+    Encode a key into canonical bytes.
+
+    Keys that compare equal as dict keys get the same encoding (an integral
+    float such as 3.0 is encoded like the integer 3).
+
+    Args:
+        key: Tuple of cell values
+
+    Returns:
+        Encoded key
+    """
+    try:
+        text = _TEXT_SEPARATOR.join(key)
+    except TypeError:
+        pass
+    else:
+        if text.count(_TEXT_SEPARATOR) == len(key) - 1:
+            return _TEXT_KEY + text.encode("utf-8", "surrogatepass")
+    chunks = [_GENERIC_KEY]
+    for part in key:
+        if isinstance(part, str):
+            tag, data = _PART_STR, part.encode("utf-8", "surrogatepass")
+        elif isinstance(part, float) and part.is_integer():
+            tag, data = _PART_INT, str(int(part)).encode("ascii")
+        elif isinstance(part, int):
+            tag, data = _PART_INT, str(int(part)).encode("ascii")
+        elif isinstance(part, float):
+            tag, data = _PART_FLOAT, repr(part).encode("ascii")
+        else:
+            # Dates, heures et autres valeurs de cellule
+            tag, data = _PART_PICKLE, pickle.dumps(part, protocol=4)
+        chunks += (tag, _LENGTH.pack(len(data)), data)
+    return b"".join(chunks)
+
+
+def decode_key(data: bytes) -> tuple:
+    """
+    Decode a key encoded by encode_key.
+
+    Args:
+        data: Encoded key
+
+    Returns:
+        Tuple of cell values
+    """
+    if data[:1] == _TEXT_KEY:
+        return tuple(data[1:].decode("utf-8", "surrogatepass").split(_TEXT_SEPARATOR))
+    parts = []
+    position = 1
+    while position < len(data):
+        tag = data[position : position + 1]
+        (length,) = _LENGTH.unpack_from(data, position + 1)
+        position += 1 + _LENGTH.size
+        chunk = bytes(data[position : position + length])
+        position += length
+        if tag == _PART_STR:
+            parts.append(chunk.decode("utf-8", "surrogatepass"))
+        elif tag == _PART_INT:
+            parts.append(int(chunk))
+        elif tag == _PART_FLOAT:
+            parts.append(float(chunk))
+        else:
+            parts.append(pickle.loads(chunk))
+    return tuple(parts)
+
+
+def key_hash(encoded: bytes) -> int:
+    """Return the 64-bit hash of an encoded key."""
+    return int.from_bytes(_blake2b(encoded, digest_size=8).digest(), "little")
+
+
+def _little_endian(values: array) -> bytes:
+    """Bytes of an array in little-endian order, whatever the platform."""
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data) -> array:
+    """Array of ``typecode`` read from little-endian bytes."""
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+class ColorMap(MutableMapping):
+    """
+    Dict-like mapping (implantation, nom, prenom) -> (R, G, B) stored compactly.
+
+    Args:
+        items: Optional mapping or iterable of (key, colour) pairs to add
+    """
+
+    def __init__(self, items=()):
+        self._hashes = array("Q")
+        self._colors = array("H")
+        self._offsets = array("Q")
+        self._keys = bytearray()
+        self._palette: list[tuple[int, int, int]] = []
+        self._palette_ids: dict[tuple[int, int, int], int] = {}
+        # Les entrées [0:_sorted] sont triées et uniques, les suivantes en attente
+        self._sorted = 0
+        # Entrées en attente : clé encodée -> indice
+        self._pending: dict[bytes, int] = {}
+        if items:
+            self.update(items)
+
+    # -- Stockage ------------------------------------------------------------
+
+    def _color_id(self, rvb_color) -> int:
+        rvb_color = tuple(rvb_color)
+        color_id = self._palette_ids.get(rvb_color)
+        if color_id is None:
+            color_id = self._palette_ids[rvb_color] = len(self._palette)
+            self._palette.append(rvb_color)
+            if color_id > 0xFFFF and self._colors.typecode == "H":
+                self._colors = array("I", self._colors)
+        return color_id
+
+    def _key_at(self, index: int) -> bytearray:
+        offset = self._offsets[index]
+        (length,) = _LENGTH.unpack_from(self._keys, offset)
+        start = offset + _LENGTH.size
+        return self._keys[start : start + length]
+
+    def _append(self, hash_value: int, encoded: bytes, color_id: int) -> None:
+        self._pending[encoded] = len(self._hashes)
+        self._hashes.append(hash_value)
+        self._colors.append(color_id)
+        self._offsets.append(len(self._keys))
+        self._keys += _LENGTH.pack(len(encoded))
+        self._keys += encoded
+
+    def _compact(self) -> None:
+        """Sort pending insertions into place, keeping the last value of each key."""
+        if self._sorted == len(self._hashes):
+            return
+        self._pending.clear()
+        hashes = self._hashes
+        # Tri stable : à hachage égal, l'ordre d'insertion est conservé
+        order = sorted(range(len(hashes)), key=hashes.__getitem__)
+        keep = []
+        start = 0
+        while start < len(order):
+            end = start + 1
+            hash_value = hashes[order[start]]
+            while end < len(order) and hashes[order[end]] == hash_value:
+                end += 1
+            if end - start == 1:
+                keep.append(order[start])
+            else:
+                # Même hachage : une entrée par clé distincte, la plus récente
+                latest = {}
+                for index in order[start:end]:
+                    latest[bytes(self._key_at(index))] = index
+                keep.extend(sorted(latest.values()))
+            start = end
+        self._hashes = array("Q", (hashes[index] for index in keep))
+        self._colors = array(
+            self._colors.typecode, (self._colors[index] for index in keep)
+        )
+        self._offsets = array("Q", (self._offsets[index] for index in keep))
+        self._sorted = len(keep)
+
+    def _find_sorted(self, encoded: bytes, hash_value: int) -> int:
+        """Index of an encoded key in the sorted entries, or -1."""
+        hashes = self._hashes
+        count = self._sorted
+        index = bisect_left(hashes, hash_value, 0, count)
+        while index < count and hashes[index] == hash_value:
+            if self._key_at(index) == encoded:
+                return index
+            index += 1
+        return -1
+
+    def _find(self, encoded: bytes) -> int:
+        """Index of an encoded key in the sorted or pending entries, or -1."""
+        if self._sorted:
+            index = self._find_sorted(encoded, key_hash(encoded))
+            if index >= 0:
+                return index
+        return self._pending.get(encoded, -1)
+
+    # -- Interface dict ------------------------------------------------------
+
+    def __getitem__(self, key):
+        index = self._find(encode_key(key))
+        if index < 0:
+            raise KeyError(key)
+        return self._palette[self._colors[index]]
+
+    def get(self, key, default=None):
+        index = self._find(encode_key(key))
+        if index < 0:
+            return default
+        return self._palette[self._colors[index]]
+
+    def __contains__(self, key) -> bool:
+        return self._find(encode_key(key)) >= 0
+
+    def __setitem__(self, key, rvb_color) -> None:
+        encoded = encode_key(key)
+        hash_value = key_hash(encoded)
+        color_id = self._color_id(rvb_color)
+        # Mise à jour en place d'une clé déjà présente
+        index = self._find_sorted(encoded, hash_value) if self._sorted else -1
+        if index < 0:
+            index = self._pending.get(encoded, -1)
+        if index >= 0:
+            self._colors[index] = color_id
+            return
+        self._append(hash_value, encoded, color_id)
+        if len(self._pending) > max(_COMPACT_MIN, self._sorted // 2):
+            self._compact()
+
+    def __delitem__(self, key) -> None:
+        self._compact()
+        index = self._find(encode_key(key))
+        if index < 0:
+            raise KeyError(key)
+        del self._hashes[index]
+        del self._colors[index]
+        del self._offsets[index]
+        self._sorted -= 1
+
+    def __iter__(self):
+        self._compact()
+        for index in range(len(self._hashes)):
+            yield decode_key(self._key_at(index))
+
+    def items(self):
+        """Return a view of the (key, colour) pairs, iterated in hash order."""
+        return _ItemsView(self)
+
+    def _iter_items(self):
+        self._compact()
+        palette = self._palette
+        for index in range(len(self._hashes)):
+            yield decode_key(self._key_at(index)), palette[self._colors[index]]
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __repr__(self) -> str:
+        return f"ColorMap({len(self)} entrées, {len(self._palette)} couleurs)"
+
+    def __reduce__(self):
+        return (ColorMap.from_bytes, (self.to_bytes(),))
+
+    @property
+    def palette(self) -> list[tuple[int, int, int]]:
+        """Distinct colours referenced by the map."""
+        return list(self._palette)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the stored entries, in bytes."""
+        return (
+            self._hashes.itemsize * len(self._hashes)
+            + self._colors.itemsize * len(self._colors)
+            + self._offsets.itemsize * len(self._offsets)
+            + len(self._keys)
+        )
+
+    # -- Sérialisation -------------------------------------------------------
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialise the map.
+
+        Returns:
+            Bytes readable by ColorMap.from_bytes on any platform
+        """
+        self._compact()
+        # Réécrire les clés dans l'ordre trié, sans les entrées remplacées
+        keys = bytearray()
+        offsets = array("Q")
+        for index in range(len(self._hashes)):
+            offsets.append(len(keys))
+            start = self._offsets[index]
+            (length,) = _LENGTH.unpack_from(self._keys, start)
+            keys += self._keys[start : start + _LENGTH.size + length]
+        palette = bytes(channel for rvb_color in self._palette for channel in rvb_color)
+        header = _HEADER.pack(
+            _MAGIC,
+            _FORMAT_VERSION,
+            len(self._hashes),
+            len(self._palette),
+            len(keys),
+            self._colors.itemsize,
+        )
+        return b"".join(
+            (
+                header,
+                palette,
+                _little_endian(self._hashes),
+                _little_endian(self._colors),
+                _little_endian(offsets),
+                keys,
+            )
+        )
+
+    @classmethod
+    def from_bytes(cls, data) -> "ColorMap":
+        """
+        Rebuild a map serialised by to_bytes.
+
+        Args:
+            data: Bytes-like object returned by to_bytes
+
+        Returns:
+            New ColorMap
+
+        Raises:
+            ValueError: If the data is not a serialised ColorMap
+        """
+        view = memoryview(data)
+        try:
+            magic, version, count, palette_size, keys_size, color_size = (
+                _HEADER.unpack_from(view)
+            )
+        except struct.error:
+            raise ValueError("Carte de couleurs sérialisée tronquée")
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            raise ValueError("Format de carte de couleurs inconnu")
+        color_type = "H" if color_size == 2 else "I"
+        position = _HEADER.size
+
+        def take(size: int) -> memoryview:
+            nonlocal position
+            chunk = view[position : position + size]
+            if len(chunk) != size:
+                raise ValueError("Carte de couleurs sérialisée tronquée")
+            position += size
+            return chunk
+
+        color_map = cls()
+        palette = take(3 * palette_size)
+        color_map._palette = [
+            tuple(palette[i : i + 3]) for i in range(0, len(palette), 3)
+        ]
+        color_map._palette_ids = {
+            rvb_color: color_id for color_id, rvb_color in enumerate(color_map._palette)
+        }
+        color_map._hashes = _from_little_endian("Q", take(8 * count))
+        color_map._colors = _from_little_endian(color_type, take(color_size * count))
+        color_map._offsets = _from_little_endian("Q", take(8 * count))
+        color_map._keys = bytearray(take(keys_size))
+        color_map._sorted = count
+        return color_map
+
+
+class _ItemsView(ItemsView):
+    """Items view decoding each entry once instead of looking every key up."""
+
+    def __iter__(self):
+        return self._mapping._iter_items()
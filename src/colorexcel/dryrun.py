@@ -0,0 +1,357 @@
+"""
+Dry run: match statistics of a run without writing anything.
+
+dry_run extracts the source colour map and streams only the key columns of
+the target sheet; it loads no target style and saves no file. It tells how
+many target rows a real run would colour (per matching tier), how many
+source keys no target row uses, and which source keys appear several times
+with different colours. The unmatched target rows, the conflicting source
+keys and the unused source keys can be streamed to a CSV report.
+"""
+
+import csv
+import logging
+import time
+import zipfile
+
+from .colormap import ColorMap
+from .instrumentation import (
+    COUNT_ROWS_MATCHED,
+    COUNT_SOURCE_COLORS,
+    COUNT_TARGET_ROWS,
+    NULL_REPORT,
+    RunReport,
+)
+from .logic import (
+    ENGINE_XML,
+    SOURCE_ENGINES,
+    dimension_rows,
+    format_hex,
+    key_column_indices,
+    select_target_sheets,
+    xml_header_row,
+)
+from .matching import (
+    DEFAULT_FUZZY_THRESHOLD,
+    MATCH_EXACT,
+    MATCH_FUZZY,
+    MATCH_NORMALIZED,
+    KeyMatcher,
+    Normalization,
+)
+from .output import AtomicOutput
+from .progress import (
+    PHASE_TARGET,
+    CancelToken,
+    ProcessingCancelled,
+    ProgressCallback,
+    ProgressReporter,
+)
+from .xlsx_stream import XlsxPackage
+
+logger = logging.getLogger(__name__)
+
+# Types de lignes du rapport CSV
+CSV_UNMATCHED = "non_appariee"
+CSV_CONFLICT = "conflit"
+CSV_UNUSED = "source_inutilisee"
+
+# En-tête du rapport CSV (séparateur « ; » et BOM, pour Excel en français)
+CSV_HEADER = (
+    "type",
+    "feuille",
+    "ligne",
+    "implantation",
+    "nom",
+    "prenom",
+    "couleurs",
+)
+CSV_DELIMITER = ";"
+
+
+class DryRunStats:
+    """
+    Match statistics of a dry run.
+
+    Attributes:
+        source_entries: Coloured source rows with a complete key
+        source_keys: Distinct source keys (size of the colour map)
+        source_duplicates: Source rows repeating a key already seen
+        source_conflicts: Distinct source keys seen with different colours
+        target_sheets: Target sheets scanned
+        target_rows: Data rows of the target sheets (headers excluded)
+        target_rows_without_key: Target rows with an empty key cell
+        matched: Target rows matched at each tier (MATCH_* keys)
+        rows_unmatched: Target rows with a complete key and no colour
+        source_keys_unused: Source keys matched by no target row
+        wall_s: Duration of the dry run in seconds
+        csv_path: Path of the CSV report, or None
+    """
+
+    __slots__ = (
+        "source_entries",
+        "source_keys",
+        "source_duplicates",
+        "source_conflicts",
+        "target_sheets",
+        "target_rows",
+        "target_rows_without_key",
+        "matched",
+        "rows_unmatched",
+        "source_keys_unused",
+        "wall_s",
+        "csv_path",
+    )
+
+    def __init__(self):
+        self.source_entries = 0
+        self.source_keys = 0
+        self.source_duplicates = 0
+        self.source_conflicts = 0
+        self.target_sheets = []
+        self.target_rows = 0
+        self.target_rows_without_key = 0
+        self.matched = {MATCH_EXACT: 0, MATCH_NORMALIZED: 0, MATCH_FUZZY: 0}
+        self.rows_unmatched = 0
+        self.source_keys_unused = 0
+        self.wall_s = 0.0
+        self.csv_path = None
+
+    @property
+    def rows_matched(self) -> int:
+        """Target rows a real run would colour."""
+        return sum(self.matched.values())
+
+    def to_dict(self) -> dict:
+        """Return the statistics as a JSON-serialisable dictionary."""
+        return {
+            "source_entries": self.source_entries,
+            "source_keys": self.source_keys,
+            "source_duplicates": self.source_duplicates,
+            "source_conflicts": self.source_conflicts,
+            "target_sheets": list(self.target_sheets),
+            "target_rows": self.target_rows,
+            "target_rows_without_key": self.target_rows_without_key,
+            "rows_matched": self.rows_matched,
+            "rows_matched_exact": self.matched[MATCH_EXACT],
+            "rows_matched_normalized": self.matched[MATCH_NORMALIZED],
+            "rows_matched_fuzzy": self.matched[MATCH_FUZZY],
+            "rows_unmatched": self.rows_unmatched,
+            "source_keys_unused": self.source_keys_unused,
+            "wall_s": round(self.wall_s, 6),
+            "csv_path": self.csv_path,
+        }
+
+    def summary(self) -> str:
+        """Return a short human-readable summary, in French."""
+        lines = [
+            f"Lignes cibles : {self.target_rows} "
+            f"({len(self.target_sheets)} feuille(s))",
+            f"  colorées : {self.rows_matched} ({self.matched[MATCH_EXACT]} exactes, "
+            f"{self.matched[MATCH_NORMALIZED]} normalisées, "
+            f"{self.matched[MATCH_FUZZY]} approchées)",
+            f"  sans correspondance : {self.rows_unmatched}",
+            f"  clé incomplète : {self.target_rows_without_key}",
+            f"Clés source : {self.source_keys} "
+            f"({self.source_entries} lignes colorées)",
+            f"  inutilisées : {self.source_keys_unused}",
+            f"  en double : {self.source_duplicates} lignes, dont "
+            f"{self.source_conflicts} clés de couleurs différentes",
+        ]
+        if self.csv_path:
+            lines.append(f"Rapport CSV : {self.csv_path}")
+        return "\n".join(lines)
+
+
+def _scan_source(engine: str, file_path: str, sheet_name: str, reporter, report):
+    """
+    Build the source colour map and find the keys repeated with other colours.
+
+    Black fills are ignored, as in get_implantation_colors, and the last colour
+    of a repeated key wins.
+
+    Returns:
+        Tuple (ColorMap, {key: [colours in order of appearance]}, coloured
+        rows, duplicate rows)
+    """
+    data_colors = ColorMap()
+    conflicts: dict[tuple, list] = {}
+    entries = duplicates = 0
+    for key, rvb_color in SOURCE_ENGINES[engine](
+        file_path, sheet_name, reporter, report
+    ):
+        if rvb_color == (0, 0, 0):
+            continue
+        entries += 1
+        previous = data_colors.get(key)
+        if previous is not None:
+            duplicates += 1
+            # Une clé répétée avec la même couleur n'est pas un conflit
+            if previous != rvb_color:
+                colors = conflicts.setdefault(key, [previous])
+                if rvb_color not in colors:
+                    colors.append(rvb_color)
+        data_colors[key] = rvb_color
+    return data_colors, conflicts, entries, duplicates
+
+
+def dry_run(
+    file1_path: str,
+    file1_sheet: str,
+    file2_path,
+    file2_sheet: str | list[str],
+    engine: str = ENGINE_XML,
+    normalization: Normalization | None = None,
+    fuzzy: bool = False,
+    fuzzy_threshold: float = DEFAULT_FUZZY_THRESHOLD,
+    csv_path: str | None = None,
+    progress: ProgressCallback | None = None,
+    cancel_token: CancelToken | None = None,
+    report: RunReport | None = None,
+) -> DryRunStats | None:
+    """
+    Compute the match statistics of a run without colouring the target.
+
+    Args:
+        file1_path: Path to the source Excel file
+        file1_sheet: Sheet name in source file
+        file2_path: Path to the target Excel file, or a binary buffer
+        file2_sheet: Sheet name, list of sheet names or ALL_SHEETS
+        engine: Source extraction engine (see get_implantation_colors)
+        normalization: Normalisation of the second matching tier, or None
+        fuzzy: Also match the remaining rows by name similarity
+        fuzzy_threshold: Minimum similarity of a fuzzy match
+        csv_path: Optional CSV file receiving one line per unmatched target
+            row, conflicting source key and unused source key
+        progress: Optional callback (phase, rows processed, total rows or None)
+        cancel_token: Optional CancelToken checked while scanning rows
+        report: Optional RunReport receiving the phases and counters
+
+    Returns:
+        DryRunStats, or None on error
+
+    Raises:
+        ProcessingCancelled: If the run was cancelled through cancel_token
+    """
+    if engine not in SOURCE_ENGINES:
+        logger.error("Moteur d'extraction inconnu : %s", engine)
+        return None
+
+    start = time.perf_counter()
+    report = report or NULL_REPORT
+    reporter = ProgressReporter(progress, cancel_token)
+    stats = DryRunStats()
+    output = AtomicOutput(csv_path) if csv_path else None
+    csv_file = None
+    try:
+        data_colors, conflicts, stats.source_entries, stats.source_duplicates = (
+            _scan_source(engine, file1_path, file1_sheet, reporter, report)
+        )
+        stats.source_keys = len(data_colors)
+        stats.source_conflicts = len(conflicts)
+        report.count(COUNT_SOURCE_COLORS, stats.source_keys)
+        if conflicts:
+            logger.warning(
+                "%d clés source répétées avec des couleurs différentes",
+                len(conflicts),
+            )
+
+        if output is not None:
+            csv_file = open(output.target, "w", newline="", encoding="utf-8-sig")
+            writer = csv.writer(csv_file, delimiter=CSV_DELIMITER)
+            writer.writerow(CSV_HEADER)
+            for key, colors in conflicts.items():
+                writer.writerow((CSV_CONFLICT, "", "", *key, format_hex(colors)))
+
+        matcher = KeyMatcher(data_colors, normalization, fuzzy, fuzzy_threshold)
+        used = {MATCH_EXACT: set(), MATCH_NORMALIZED: set(), MATCH_FUZZY: set()}
+
+        with XlsxPackage(file2_path) as package:
+            with report.phase("target.header"):
+                sheets = select_target_sheets(
+                    file2_sheet,
+                    package.sheet_names,
+                    lambda name: xml_header_row(next(package.iter_rows(name), None)),
+                )
+            if sheets is None:
+                return None
+            sheet_rows = [
+                dimension_rows(package.sheet_dimension(name)) for name in sheets
+            ]
+            stats.target_sheets = list(sheets)
+
+            reporter.start(
+                PHASE_TARGET, None if None in sheet_rows else sum(sheet_rows)
+            )
+            with report.phase("target.scan"):
+                for sheet_name, col_indices in sheets.items():
+                    key_columns = key_column_indices(col_indices)
+                    for row_number, cells in package.iter_rows(
+                        sheet_name, columns=set(key_columns)
+                    ):
+                        if row_number < 2:
+                            continue
+                        stats.target_rows += 1
+                        reporter.update(stats.target_rows)
+                        key = tuple(cells.get(idx, (None, 0))[0] for idx in key_columns)
+                        if None in key:
+                            stats.target_rows_without_key += 1
+                            continue
+                        tier, rvb_color, ref = matcher.match(key)
+                        if tier is None:
+                            stats.rows_unmatched += 1
+                            if csv_file is not None:
+                                writer.writerow(
+                                    (CSV_UNMATCHED, sheet_name, row_number, *key, "")
+                                )
+                            continue
+                        used[tier].add(ref)
+                reporter.finish(stats.target_rows)
+        stats.matched.update(matcher.counts)
+        report.count(COUNT_TARGET_ROWS, stats.target_rows)
+        report.count(COUNT_ROWS_MATCHED, stats.rows_matched)
+        matcher.record(report)
+
+        # Clés source qu'aucune ligne cible n'a utilisées, à aucun niveau
+        with report.phase("source.unused"):
+            used = {tier: refs for tier, refs in used.items() if refs}
+            for key, rvb_color in data_colors.items():
+                if key in used.get(MATCH_EXACT, ()):
+                    continue
+                if any(tier != MATCH_EXACT for tier in used) and any(
+                    ref in used.get(tier, ())
+                    for tier, ref in matcher.references(key).items()
+                ):
+                    continue
+                stats.source_keys_unused += 1
+                if csv_file is not None:
+                    writer.writerow((CSV_UNUSED, "", "", *key, format_hex([rvb_color])))
+
+        if output is not None:
+            csv_file.close()
+            csv_file = None
+            stats.csv_path = output.commit()
+        stats.wall_s = time.perf_counter() - start
+        logger.info(
+            "Simulation : %d/%d lignes cibles appariées, %d clés source "
+            "inutilisées, %d conflits",
+            stats.rows_matched,
+            stats.target_rows,
+            stats.source_keys_unused,
+            stats.source_conflicts,
+        )
+        return stats
+    except ProcessingCancelled:
+        logger.info("Simulation annulée")
+        raise
+    except (OSError, zipfile.BadZipFile):
+        logger.error("Erreur lors de l'ouverture des fichiers", exc_info=True)
+        return None
+    except Exception:
+        logger.error("Erreur lors de la simulation", exc_info=True)
+        return None
+    finally:
+        if csv_file is not None:
+            csv_file.close()
+        if output is not None:
+            output.discard()
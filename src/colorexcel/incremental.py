@@ -0,0 +1,494 @@
+"""
+Incremental recolouring of a copy coloured by an earlier run.
+
+An incremental run writes, next to the coloured copy, a sidecar manifest
+(MANIFEST_SUFFIX) holding the identity of the target and of the copy, a
+checksum of the source sheet, the options of the run, the cell formats the
+XML writer added and, for every target row with a complete key, the colour
+applied. The next incremental run to the same output:
+
+- keeps the copy as is when the source sheet, its text, its styles and the
+  matching options did not change, without extracting the source;
+- otherwise compares the new colour map with the manifest key by key and
+  patches the previous copy: only the rows whose colour was added, changed
+  or removed are parsed and restyled, the other rows are streamed unchanged.
+
+Anything else (target modified, copy edited or deleted, other sheets or paint
+options, unreadable manifest) falls back to a full run, which writes a new
+manifest. Incremental runs always use the XML writer.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import xml.etree.ElementTree as ET
+import zipfile
+
+from .instrumentation import NULL_REPORT, RunReport
+from .logic import PAINT_CELLS, PAINT_ROW, WRITER_XML, apply_color_map
+from .matching import DEFAULT_FUZZY_THRESHOLD, KeyMatcher, Normalization
+from .output import AtomicOutput
+from .progress import (
+    PHASE_TARGET,
+    CancelToken,
+    ProcessingCancelled,
+    ProgressCallback,
+    ProgressReporter,
+)
+from .xlsx_patch import CLEAR_FILL, write_colored_sheets
+from .xlsx_stream import XlsxPackage
+
+logger = logging.getLogger(__name__)
+
+# Suffixe du manifeste écrit à côté de la copie colorée
+MANIFEST_SUFFIX = ".colorexcel.json"
+
+# Version du format du manifeste : un manifeste d'une autre version est ignoré
+MANIFEST_VERSION = 1
+
+# Types de valeurs de clé que le manifeste restitue à l'identique
+_KEY_TYPES = (str, int, float, bool)
+
+
+def manifest_path(output_path: str) -> str:
+    """Path of the manifest of a coloured copy."""
+    return f"{output_path}{MANIFEST_SUFFIX}"
+
+
+def file_identity(file_path: str) -> list | None:
+    """
+    Identify a version of a file by its size and modification time.
+
+    Returns:
+        [size, mtime in ns], or None if the file cannot be read
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def source_checksum(file_path: str, sheet_name: str) -> str | None:
+    """
+    Checksum of the parts a source colour map depends on.
+
+    The CRC-32 of the sheet, the workbook (sheet names, date system), the
+    shared strings (the text of the key cells), the styles and the theme
+    are read from the zip directory, so nothing is decompressed: saving the
+    source without changing these parts keeps the checksum. Editing the text
+    of another sheet also changes the shared strings, and so the checksum.
+
+    Args:
+        file_path: Path to the source Excel file
+        sheet_name: Name of the source sheet
+
+    Returns:
+        Hex digest, or None if the sheet cannot be read
+    """
+    try:
+        with XlsxPackage(file_path) as package:
+            sheet_part = package.sheet_part(sheet_name)
+            if sheet_part is None:
+                return None
+            digest = hashlib.sha256(sheet_name.encode("utf-8"))
+            parts = (
+                sheet_part,
+                package.workbook_part,
+                package.shared_strings_part,
+                package.styles_part,
+                package.theme_part,
+            )
+            for part in parts:
+                if part is not None:
+                    digest.update(repr((part, package.part_checksum(part))).encode())
+            return digest.hexdigest()
+    except (OSError, KeyError, zipfile.BadZipFile, ET.ParseError):
+        logger.warning(
+            "Somme de contrôle de la source impossible : %s", file_path, exc_info=True
+        )
+        return None
+
+
+def _jsonable(value):
+    """Return value as it reads back from JSON (tuples become lists)."""
+    return json.loads(json.dumps(value))
+
+
+def _hex(rvb_color) -> str | None:
+    return None if rvb_color is None else "%02X%02X%02X" % tuple(rvb_color)
+
+
+def _rgb(hex_color: str | None) -> tuple[int, int, int] | None:
+    if hex_color is None:
+        return None
+    return tuple(int(hex_color[i : i + 2], 16) for i in (0, 2, 4))
+
+
+class RunManifest:
+    """
+    Sidecar record of the last incremental run to an output.
+
+    Attributes:
+        target: Identity of the target file (see file_identity)
+        output: Identity of the coloured copy
+        source: Checksum of the source sheet (see source_checksum), or None
+        options: Options the copy depends on (sheets, paint mode, columns)
+        matching: Matching options (normalisation, fuzzy tier)
+        colored_from: Id of the first cell format added by the XML writer
+        colored_styles: (original style, colour) of each added cell format
+        sheets: {sheet name: {key: [colour applied or None, [row numbers]]}}
+        complete: False if a key could not be recorded; such a manifest is
+            not saved
+    """
+
+    __slots__ = (
+        "target",
+        "output",
+        "source",
+        "options",
+        "matching",
+        "colored_from",
+        "colored_styles",
+        "sheets",
+        "complete",
+    )
+
+    def __init__(self):
+        self.target = None
+        self.output = None
+        self.source = None
+        self.options = None
+        self.matching = None
+        self.colored_from = 0
+        self.colored_styles = []
+        self.sheets: dict[str, dict[tuple, list]] = {}
+        self.complete = True
+
+    def record_row(self, sheet_name: str, row_number: int, key: tuple, rvb_color):
+        """Record the colour applied to a target row (XML writer callback)."""
+        if not all(isinstance(value, _KEY_TYPES) for value in key):
+            # Dates et autres valeurs que JSON ne restitue pas à l'identique
+            self.complete = False
+            return
+        entry = self.sheets.setdefault(sheet_name, {}).get(key)
+        if entry is None:
+            self.sheets[sheet_name][key] = [rvb_color, [row_number]]
+        else:
+            entry[1].append(row_number)
+
+    def set_styles(self, colored_from: int, colored_styles: list) -> None:
+        """Record the cell formats added by the XML writer."""
+        self.colored_from = colored_from
+        self.colored_styles = [
+            (style_id, tuple(rvb_color)) for style_id, rvb_color in colored_styles
+        ]
+
+    def matches(self, target_path: str, output_path: str, options) -> bool:
+        """Tell whether this manifest describes the copy output_path of target_path."""
+        return (
+            self.options == options
+            and self.target == file_identity(target_path)
+            and self.output is not None
+            and self.output == file_identity(output_path)
+        )
+
+    def diff(self, data_colors) -> dict[str, dict[int, tuple]]:
+        """
+        Compare a new colour map with the colours applied, and record it.
+
+        Args:
+            data_colors: ColorMap, mapping or KeyMatcher giving the new colours
+
+        Returns:
+            {sheet name: {row number: new colour or CLEAR_FILL}} for the rows
+            whose colour was added, changed or removed
+        """
+        changes = {}
+        for sheet_name, entries in self.sheets.items():
+            sheet_changes = {}
+            for key, entry in entries.items():
+                rvb_color = data_colors.get(key)
+                if rvb_color == entry[0]:
+                    continue
+                entry[0] = rvb_color
+                fill = CLEAR_FILL if rvb_color is None else rvb_color
+                for row_number in entry[1]:
+                    sheet_changes[row_number] = fill
+            if sheet_changes:
+                changes[sheet_name] = sheet_changes
+        return changes
+
+    def to_dict(self) -> dict:
+        """Return the manifest as a JSON-serialisable dictionary."""
+        return {
+            "version": MANIFEST_VERSION,
+            "target": self.target,
+            "output": self.output,
+            "source": self.source,
+            "options": self.options,
+            "matching": self.matching,
+            "colored_from": self.colored_from,
+            "colored_styles": [
+                [style_id, _hex(rvb_color)]
+                for style_id, rvb_color in self.colored_styles
+            ],
+            "sheets": {
+                sheet_name: [
+                    [*key, _hex(rvb_color), rows]
+                    for key, (rvb_color, rows) in entries.items()
+                ]
+                for sheet_name, entries in self.sheets.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RunManifest":
+        """
+        Rebuild a manifest from to_dict().
+
+        Raises:
+            ValueError: If the manifest has another version
+        """
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Version de manifeste inconnue : {data.get('version')}")
+        manifest = cls()
+        manifest.target = data["target"]
+        manifest.output = data["output"]
+        manifest.source = data["source"]
+        manifest.options = data["options"]
+        manifest.matching = data["matching"]
+        manifest.colored_from = data["colored_from"]
+        manifest.colored_styles = [
+            (style_id, _rgb(hex_color))
+            for style_id, hex_color in data["colored_styles"]
+        ]
+        manifest.sheets = {
+            sheet_name: {
+                tuple(entry[:-2]): [_rgb(entry[-2]), entry[-1]] for entry in entries
+            }
+            for sheet_name, entries in data["sheets"].items()
+        }
+        return manifest
+
+    @classmethod
+    def load(cls, path: str) -> "RunManifest | None":
+        """
+        Read a manifest file.
+
+        Returns:
+            The manifest, or None if it is missing or unreadable
+        """
+        try:
+            with open(path, encoding="utf-8") as manifest_file:
+                return cls.from_dict(json.load(manifest_file))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError, IndexError):
+            logger.info("Manifeste illisible ignoré : %s", path, exc_info=True)
+            return None
+
+    def save(self, path: str) -> bool:
+        """
+        Write the manifest file under a temporary name, then rename it.
+
+        Returns:
+            True if the manifest was written
+        """
+        output = AtomicOutput(path)
+        try:
+            with open(output.target, "w", encoding="utf-8") as manifest_file:
+                json.dump(
+                    self.to_dict(),
+                    manifest_file,
+                    ensure_ascii=False,
+                    separators=(",", ":"),
+                )
+            output.commit()
+            return True
+        except (OSError, TypeError, ValueError):
+            logger.warning("Impossible d'écrire le manifeste : %s", path, exc_info=True)
+            return False
+        finally:
+            output.discard()
+
+
+def _patch_changed_rows(
+    manifest: RunManifest,
+    data_colors,
+    output_path: str,
+    row_style: bool,
+    column_range: tuple[int, int] | None,
+    reporter: ProgressReporter,
+    report,
+) -> str | None:
+    """Restyle the rows of the previous copy whose colour changed."""
+    with report.phase("manifest.diff"):
+        changes = manifest.diff(data_colors)
+    changed_rows = sum(len(sheet_changes) for sheet_changes in changes.values())
+    logger.info("Mise à jour incrémentale : %d lignes à recolorer", changed_rows)
+    if not changed_rows:
+        return output_path
+
+    rows_done = 0
+
+    def sheet_row_color(sheet_changes):
+        def row_color(row_number, cells):
+            nonlocal rows_done
+            rows_done += 1
+            reporter.update(rows_done)
+            return sheet_changes.get(row_number)
+
+        return row_color
+
+    reporter.start(PHASE_TARGET, changed_rows)
+    output = AtomicOutput(output_path)
+    try:
+        with report.phase("target.patch"):
+            colored = write_colored_sheets(
+                output_path,
+                output.target,
+                {
+                    sheet_name: sheet_row_color(sheet_changes)
+                    for sheet_name, sheet_changes in changes.items()
+                },
+                row_style=row_style,
+                column_range=column_range,
+                report=report,
+                rows={
+                    sheet_name: set(sheet_changes)
+                    for sheet_name, sheet_changes in changes.items()
+                },
+                previous_styles=(manifest.colored_from, manifest.colored_styles),
+            )
+        result = output.commit()
+    except ProcessingCancelled:
+        raise
+    except Exception:
+        logger.error(
+            "Erreur lors de la mise à jour incrémentale : %s",
+            output_path,
+            exc_info=True,
+        )
+        return None
+    finally:
+        output.discard()
+    reporter.finish(changed_rows)
+    manifest.set_styles(colored.colored_from, colored.colored_styles)
+    return result
+
+
+def apply_color_map_incremental(
+    data_colors,
+    file2_path: str,
+    file2_sheet: str | list[str],
+    output_path: str,
+    source: str | None = None,
+    paint_mode: str = PAINT_CELLS,
+    column_range: tuple[int, int] | None = None,
+    progress: ProgressCallback | None = None,
+    cancel_token: CancelToken | None = None,
+    report: RunReport | None = None,
+    normalization: Normalization | None = None,
+    fuzzy: bool = False,
+    fuzzy_threshold: float = DEFAULT_FUZZY_THRESHOLD,
+) -> str | None:
+    """
+    Colour the target into output_path, patching only what changed since the last run.
+
+    Args:
+        data_colors: Mapping (implantation, nom, prenom) -> RGB tuple, or a
+            callable returning it, called only if the copy must be updated
+        file2_path: Path to the target Excel file
+        file2_sheet: Sheet name, list of sheet names or ALL_SHEETS
+        output_path: Path of the coloured copy; its manifest is
+            output_path + MANIFEST_SUFFIX
+        source: Checksum of the source (see source_checksum); when equal to
+            the one of the manifest, with the same matching options, the copy
+            is kept without calling data_colors. None always compares the
+            colours.
+        paint_mode: PAINT_CELLS or PAINT_ROW, see logic.apply_color_map
+        column_range: Optional column range to colour, see
+            logic.apply_color_map
+        progress: Optional callback (phase, rows processed, total rows or
+            None); an incremental update reports the rows it recolours
+        cancel_token: Optional CancelToken checked while scanning rows
+        report: Optional RunReport receiving the phases and counters
+        normalization: Key normalisation tier, see logic.apply_color_map
+        fuzzy: Enable the fuzzy matching tier, see logic.apply_color_map
+        fuzzy_threshold: Minimum similarity of a fuzzy match
+
+    Returns:
+        output_path, or None if error
+
+    Raises:
+        ProcessingCancelled: If the run was cancelled through cancel_token
+    """
+    report = report or NULL_REPORT
+    path = manifest_path(output_path)
+    options = _jsonable(
+        {"sheets": file2_sheet, "paint_mode": paint_mode, "columns": column_range}
+    )
+    matching = _jsonable([normalization, fuzzy, fuzzy_threshold])
+
+    with report.phase("manifest.load"):
+        manifest = RunManifest.load(path)
+    if manifest is not None and not manifest.matches(file2_path, output_path, options):
+        logger.info("Manifeste périmé, coloration complète : %s", path)
+        manifest = None
+
+    if manifest is not None:
+        if source is not None and manifest.source == source:
+            if manifest.matching == matching:
+                logger.info("Source inchangée, copie conservée : %s", output_path)
+                return output_path
+        if callable(data_colors):
+            data_colors = data_colors()
+        if not data_colors:
+            # Une source illisible effacerait toutes les couleurs de la copie
+            logger.error("Aucune couleur source, copie conservée : %s", output_path)
+            return None
+        if normalization is not None or fuzzy:
+            data_colors = KeyMatcher(data_colors, normalization, fuzzy, fuzzy_threshold)
+        result = _patch_changed_rows(
+            manifest,
+            data_colors,
+            output_path,
+            paint_mode == PAINT_ROW,
+            column_range,
+            ProgressReporter(progress, cancel_token),
+            report,
+        )
+    else:
+        manifest = RunManifest()
+        result = apply_color_map(
+            data_colors,
+            file2_path,
+            file2_sheet,
+            output_path=output_path,
+            writer=WRITER_XML,
+            paint_mode=paint_mode,
+            column_range=column_range,
+            progress=progress,
+            cancel_token=cancel_token,
+            report=report,
+            normalization=normalization,
+            fuzzy=fuzzy,
+            fuzzy_threshold=fuzzy_threshold,
+            manifest=manifest,
+        )
+    if result is None:
+        return None
+
+    if not manifest.complete:
+        logger.info("Clés non enregistrables, pas de manifeste : %s", path)
+        return result
+    manifest.target = file_identity(file2_path)
+    manifest.output = file_identity(result)
+    manifest.source = source
+    manifest.options = options
+    manifest.matching = matching
+    with report.phase("manifest.save"):
+        manifest.save(path)
+    return result
@@ -0,0 +1,211 @@
+"""
+Per-phase timing and memory instrumentation of a run.
+
+The logic functions accept an optional RunReport. Each phase of a run
+(theme extraction, workbook loading, header lookup, row scan, save...) is
+measured with ``report.phase(name)``, and row loops add their totals with
+``report.count(name, n)`` once they are done. Without a report the functions
+use NULL_REPORT, whose methods do nothing, so disabled instrumentation costs
+one no-op call per phase and nothing per row.
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Variable d'environnement : fichier JSON lines recevant les rapports
+REPORT_FILE_ENV = "COLOREXCEL_REPORT_FILE"
+
+# Noms des compteurs renseignés par logic
+COUNT_SOURCE_ROWS = "source_rows_scanned"
+COUNT_SOURCE_COLORS = "source_colors"
+COUNT_TARGET_ROWS = "target_rows_scanned"
+COUNT_ROWS_MATCHED = "rows_matched"
+COUNT_CELLS_PAINTED = "cells_painted"
+COUNT_ROWS_STYLED = "rows_styled"
+COUNT_MATCHED_EXACT = "rows_matched_exact"
+COUNT_MATCHED_NORMALIZED = "rows_matched_normalized"
+COUNT_MATCHED_FUZZY = "rows_matched_fuzzy"
+
+
+def peak_rss_mb() -> float | None:
+    """
+    Return the peak resident memory of the process so far, in MiB.
+
+    Returns:
+        Peak RSS, or None where the resource module is unavailable
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sous macOS et en kio ailleurs
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class PhaseStats:
+    """
+    Measurements of one phase of a run.
+
+    Attributes:
+        name: Phase name (e.g. 'target.load')
+        wall_s: Elapsed wall-clock time in seconds
+        cpu_s: CPU time of the process in seconds
+        peak_rss_mb: Peak RSS of the process at the end of the phase
+        tracemalloc_peak_mb: Peak traced allocations during the phase, when
+            memory tracing is enabled
+    """
+
+    __slots__ = ("name", "wall_s", "cpu_s", "peak_rss_mb", "tracemalloc_peak_mb")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.peak_rss_mb = None
+        self.tracemalloc_peak_mb = None
+
+    def to_dict(self) -> dict:
+        """Return the measurements as a JSON-serialisable dictionary."""
+        return {
+            "name": self.name,
+            "wall_s": round(self.wall_s, 6),
+            "cpu_s": round(self.cpu_s, 6),
+            "peak_rss_mb": self.peak_rss_mb,
+            "tracemalloc_peak_mb": self.tracemalloc_peak_mb,
+        }
+
+
+class RunReport:
+    """
+    Collects the phases and counters of one run.
+
+    Args:
+        label: Free description of the run (e.g. the target file name)
+        trace_memory: Also record the tracemalloc peak of each phase; this
+            starts tracemalloc if needed and slows the run noticeably
+        jsonl_path: File to append the report to as one JSON line when
+            close() is called. Defaults to $COLOREXCEL_REPORT_FILE if set.
+    """
+
+    def __init__(
+        self,
+        label: str = "",
+        trace_memory: bool = False,
+        jsonl_path: str | None = None,
+    ):
+        self.label = label
+        self.trace_memory = trace_memory
+        self.jsonl_path = jsonl_path or os.environ.get(REPORT_FILE_ENV)
+        self.phases: list[PhaseStats] = []
+        self.counters: dict[str, int] = {}
+        self.started_at = datetime.now(timezone.utc)
+        self._started_tracing = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Measure the enclosed block as a phase of the run.
+
+        Args:
+            name: Phase name
+        """
+        stats = PhaseStats(name)
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield stats
+        finally:
+            stats.cpu_s = time.process_time() - cpu_start
+            stats.wall_s = time.perf_counter() - wall_start
+            stats.peak_rss_mb = peak_rss_mb()
+            if self.trace_memory and tracemalloc.is_tracing():
+                stats.tracemalloc_peak_mb = tracemalloc.get_traced_memory()[1] / (
+                    1024 * 1024
+                )
+            self.phases.append(stats)
+
+    def count(self, name: str, value: int) -> None:
+        """
+        Add ``value`` to a counter of the run.
+
+        Args:
+            name: Counter name (COUNT_* constants)
+            value: Amount to add
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    @property
+    def wall_s(self) -> float:
+        """Total wall time of the recorded phases."""
+        return sum(stats.wall_s for stats in self.phases)
+
+    def to_dict(self) -> dict:
+        """Return the report as a JSON-serialisable dictionary."""
+        return {
+            "label": self.label,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "wall_s": round(self.wall_s, 6),
+            "phases": [stats.to_dict() for stats in self.phases],
+            "counters": dict(self.counters),
+        }
+
+    def summary(self) -> str:
+        """Return a short human-readable summary, one line per phase."""
+        lines = [f"Rapport {self.label} : {self.wall_s:.3f} s"]
+        for stats in self.phases:
+            lines.append(
+                f"  {stats.name:20s} {stats.wall_s:8.3f} s  (CPU {stats.cpu_s:.3f} s)"
+            )
+        for name, value in self.counters.items():
+            lines.append(f"  {name:20s} {value}")
+        return "\n".join(lines)
+
+    def close(self) -> None:
+        """Stop memory tracing if this report started it, and write the JSON line."""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        if self.jsonl_path:
+            try:
+                with open(self.jsonl_path, "a", encoding="utf-8") as report_file:
+                    report_file.write(json.dumps(self.to_dict(), ensure_ascii=False))
+                    report_file.write("\n")
+            except OSError:
+                logger.warning(
+                    "Impossible d'écrire le rapport : %s",
+                    self.jsonl_path,
+                    exc_info=True,
+                )
+
+
+class _NullReport:
+    """RunReport stand-in used when instrumentation is disabled."""
+
+    __slots__ = ()
+
+    def phase(self, name: str):
+        return nullcontext()
+
+    def count(self, name: str, value: int) -> None:
+        pass
+
+
+# Rapport inactif utilisé par défaut
+NULL_REPORT = _NullReport()
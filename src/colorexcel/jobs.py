@@ -0,0 +1,578 @@
+"""
+Bounded queue of colouring jobs run in a pool of processes.
+
+JobQueue is the core of the local HTTP service (see service): it stores the
+source and target workbooks uploaded for a job, then runs the job through
+apply_colors_to_file2 in a pool of processes of fixed size.
+
+- Backpressure: at most ``workers + max_queued`` jobs are waiting or
+  running; beyond that, new jobs are refused (QueueFull) instead of piling
+  up in memory and on disk.
+- Isolation: each job has its own directory holding its uploads, its output
+  and the small files shared with its worker process, so concurrent jobs
+  with files of the same name never touch each other's files.
+- Progress and cancellation: the worker writes the current phase and row
+  counts to a progress file, and stops at its next progress notification
+  once a cancel file appears or its time budget is spent. The time budget
+  is checked between rows, not while a workbook is being loaded or saved.
+- Retention: finished jobs and their files are kept for ``keep`` seconds,
+  then removed.
+"""
+
+import json
+import logging
+import os
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+
+from . import __version__
+from .logic import ALL_SHEETS, apply_colors_to_file2, get_sheet_names
+from .matching import MATCH_EXACT, NORMALIZATIONS
+from .parallel import available_cpus
+from .progress import CancelToken, ProcessingCancelled
+from .watch import TARGET_SUFFIXES
+
+logger = logging.getLogger(__name__)
+
+# Adresse d'écoute par défaut du service : la machine locale uniquement
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Taille maximale d'une requête de dépôt (octets)
+DEFAULT_MAX_UPLOAD = 100 * 1024 * 1024
+
+# Nombre de travaux en attente au-delà des travaux en cours
+DEFAULT_MAX_QUEUED = 16
+
+# Durée maximale d'un travail (secondes)
+DEFAULT_TIMEOUT = 600.0
+
+# Durée de conservation d'un travail terminé et de ses fichiers (secondes)
+DEFAULT_KEEP = 3600.0
+
+# États d'un travail
+STATE_QUEUED = "queued"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+STATE_CANCELLED = "cancelled"
+STATE_TIMEOUT = "timeout"
+FINAL_STATES = (STATE_DONE, STATE_FAILED, STATE_CANCELLED, STATE_TIMEOUT)
+
+# Fichiers partagés entre le service et le processus d'un travail
+PROGRESS_NAME = "progress.json"
+CANCEL_NAME = "cancel"
+
+# Intervalle minimal entre deux écritures du fichier de progression (secondes)
+PROGRESS_WRITE_INTERVAL = 0.5
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+def _write_json(path: str, data: dict) -> None:
+    """Write a small JSON file atomically (temporary file then rename)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> dict:
+    """Read a JSON file written by _write_json, or {} if it does not exist yet."""
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _isoformat(timestamp: float | None) -> str | None:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec="seconds")
+
+
+def run_job(
+    job_dir: str,
+    source_path: str,
+    source_sheet: str,
+    target_path: str,
+    target_sheet,
+    output_path: str,
+    timeout: float | None = None,
+    normalize: str = MATCH_EXACT,
+    **options,
+) -> tuple[str, str | None, str | None, float]:
+    """
+    Run a job in a worker process of the pool.
+
+    Args:
+        job_dir: Directory of the job, holding its progress and cancel files
+        source_path: Path of the uploaded source workbook
+        source_sheet: Source sheet name
+        target_path: Path of the uploaded target workbook
+        target_sheet: Sheet name, list of sheet names or ALL_SHEETS
+        output_path: Path of the coloured copy
+        timeout: Time budget of the run in seconds, or None
+        normalize: Key normalisation preset (see NORMALIZATIONS)
+        **options: Other options of apply_colors_to_file2 (writer,
+            paint_mode, column_range, fuzzy, fuzzy_threshold,
+            use_result_cache)
+
+    Returns:
+        Tuple (final state, output path or None, error or None, seconds)
+    """
+    start = time.perf_counter()
+    progress_path = os.path.join(job_dir, PROGRESS_NAME)
+    cancel_path = os.path.join(job_dir, CANCEL_NAME)
+    deadline = time.monotonic() + timeout if timeout else None
+    token = CancelToken()
+    state = {"started": time.time(), "phase": None, "done": 0, "total": None}
+    last_write = 0.0
+
+    def progress(phase, done, total):
+        nonlocal last_write
+        now = time.monotonic()
+        if (deadline is not None and now > deadline) or os.path.exists(cancel_path):
+            token.cancel()
+        new_phase = phase != state["phase"]
+        state.update(phase=phase, done=done, total=total)
+        if new_phase or now - last_write >= PROGRESS_WRITE_INTERVAL:
+            _write_json(progress_path, state)
+            last_write = now
+
+    _write_json(progress_path, state)
+    try:
+        if os.path.exists(cancel_path):
+            raise ProcessingCancelled()
+        output = apply_colors_to_file2(
+            source_path,
+            source_sheet,
+            target_path,
+            target_sheet,
+            # Chemins propres au travail : le cache des couleurs ne servirait pas
+            use_cache=False,
+            progress=progress,
+            cancel_token=token,
+            # Le pool borne à lui seul le nombre de processus du service
+            parallel=False,
+            parallel_sheets=False,
+            output_path=output_path,
+            normalization=NORMALIZATIONS[normalize],
+            **options,
+        )
+    except ProcessingCancelled:
+        seconds = time.perf_counter() - start
+        if deadline is not None and time.monotonic() > deadline:
+            error = f"durée maximale ({timeout:g} s) dépassée"
+            return STATE_TIMEOUT, None, error, seconds
+        return STATE_CANCELLED, None, None, seconds
+    except Exception as exc:
+        logger.error("Échec du travail %s", job_dir, exc_info=True)
+        return STATE_FAILED, None, repr(exc), time.perf_counter() - start
+    finally:
+        # Dernière progression notifiée, que l'écriture régulière a pu sauter
+        _write_json(progress_path, state)
+    seconds = time.perf_counter() - start
+    if output is None:
+        return STATE_FAILED, None, "échec du traitement (voir les logs)", seconds
+    return STATE_DONE, output, None, seconds
+
+
+def _upload_name(file_name: str | None, label: str) -> str:
+    """
+    Validate the name of an uploaded workbook.
+
+    Raises:
+        ValueError: If the file is not an .xlsx or .xlsm workbook
+    """
+    name = os.path.basename((file_name or "").replace("\\", "/")).strip()
+    if "\0" in name or not name.lower().endswith(TARGET_SUFFIXES):
+        raise ValueError(f"Le fichier {label} doit être un classeur .xlsx ou .xlsm")
+    return name
+
+
+class Job:
+    """
+    A job of the queue, as seen by the service process.
+
+    The final state, output and error are set when the worker returns;
+    until then the state is read from the progress file of the job.
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        directory: str,
+        source_name: str,
+        source_sheet: str,
+        target_name: str,
+        target_sheet,
+    ):
+        self.id = job_id
+        self.directory = directory
+        self.source_name = source_name
+        self.source_sheet = source_sheet
+        self.target_name = target_name
+        self.target_sheet = target_sheet
+        self.created = time.time()
+        self.finished: float | None = None
+        self.state: str | None = None
+        self.output: str | None = None
+        self.error: str | None = None
+        self.seconds: float | None = None
+        self.future = None
+        self.executor = None
+        # Oublié pendant son exécution : fichiers supprimés à la fin
+        self.forgotten = False
+        self.cancel_requested = False
+
+    def progress(self) -> dict:
+        """Content of the progress file, {} if the worker has not started."""
+        return _read_json(os.path.join(self.directory, PROGRESS_NAME))
+
+
+class JobQueue:
+    """
+    Bounded queue of colouring jobs run in a pool of processes.
+
+    Args:
+        work_dir: Directory of the job directories; by default a new
+            temporary directory, removed by close()
+        workers: Number of jobs run at the same time (default: number of CPUs)
+        max_queued: Number of jobs waiting for a worker beyond the running
+            ones; a job submitted beyond that raises QueueFull
+        timeout: Time budget of a job in seconds, counted from its start, or
+            None for no limit
+        keep: Seconds a finished job and its files are kept
+        result_cache: Reuse the result of an identical job (see results)
+    """
+
+    def __init__(
+        self,
+        work_dir=None,
+        workers: int | None = None,
+        max_queued: int = DEFAULT_MAX_QUEUED,
+        timeout: float | None = DEFAULT_TIMEOUT,
+        keep: float = DEFAULT_KEEP,
+        result_cache: bool = True,
+    ):
+        if workers is not None and workers < 1:
+            raise ValueError("Le nombre de processus doit être au moins 1")
+        if max_queued < 0:
+            raise ValueError("La taille de la file ne peut pas être négative")
+        self._owns_work_dir = work_dir is None
+        self.work_dir = (
+            Path(work_dir)
+            if work_dir
+            else Path(tempfile.mkdtemp(prefix="colorexcel_service_"))
+        )
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = workers or available_cpus()
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.keep = keep
+        self.result_cache = result_cache
+        self._jobs: dict[str, Job] = {}
+        # Réentrant : future.cancel() appelle le rappel de fin dans ce thread
+        self._lock = threading.RLock()
+        self._executor = None
+        self._replace_pool()
+
+    def _replace_pool(self) -> None:
+        """Start a new pool, after the previous one broke."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        # spawn : le serveur HTTP est multithread, fork pourrait copier un
+        # verrou tenu par un autre thread
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=get_context("spawn")
+        )
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of unfinished (queued or running) jobs."""
+        return self.workers + self.max_queued
+
+    def _unfinished(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.finished is None)
+
+    @property
+    def full(self) -> bool:
+        """Whether a job submitted now would be refused."""
+        with self._lock:
+            return self._unfinished() >= self.capacity
+
+    def submit(
+        self,
+        source: tuple[str, bytes],
+        source_sheet: str,
+        target: tuple[str, bytes],
+        target_sheets: list[str] | None = None,
+        **options,
+    ) -> Job:
+        """
+        Store the uploads of a job in its own directory and queue it.
+
+        Args:
+            source: (file name, content) of the source workbook
+            source_sheet: Source sheet name
+            target: (file name, content) of the target workbook
+            target_sheets: Target sheet names, ``*`` for every sheet with the
+                key columns, or None for the first sheet
+            **options: Colouring options, see parse_job_options
+
+        Returns:
+            The queued Job
+
+        Raises:
+            QueueFull: If the queue is at capacity
+            ValueError: If a workbook or a sheet is invalid
+        """
+        source_name = _upload_name(source[0], "source")
+        target_name = _upload_name(target[0], "cible")
+        if not source_sheet:
+            raise ValueError("Feuille source manquante")
+        self._purge()
+        if self.full:
+            raise QueueFull()
+
+        job_id = secrets.token_hex(16)
+        directory = self.work_dir / job_id
+        try:
+            for folder, (name, content) in (
+                ("source", (source_name, source[1])),
+                ("cible", (target_name, target[1])),
+            ):
+                (directory / folder).mkdir(parents=True)
+                (directory / folder / name).write_bytes(content)
+            source_path = str(directory / "source" / source_name)
+            target_path = str(directory / "cible" / target_name)
+            target_sheet = self._check_sheets(
+                source_path, source_sheet, target_path, target_sheets
+            )
+        except (OSError, ValueError):
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+
+        from .cli import colored_output_path
+
+        job = Job(
+            job_id, str(directory), source_name, source_sheet, target_name, target_sheet
+        )
+        arguments = (
+            job.directory,
+            source_path,
+            source_sheet,
+            target_path,
+            target_sheet,
+            colored_output_path(target_path, job.directory),
+        )
+        options = dict(
+            options, timeout=self.timeout, use_result_cache=self.result_cache
+        )
+        with self._lock:
+            # Vérifiée à nouveau : plusieurs dépôts peuvent arriver en même temps
+            if self._unfinished() >= self.capacity:
+                shutil.rmtree(directory, ignore_errors=True)
+                raise QueueFull()
+            try:
+                job.future = self._executor.submit(run_job, *arguments, **options)
+            except BrokenProcessPool:
+                logger.warning("Pool de processus interrompu, redémarrage")
+                self._replace_pool()
+                job.future = self._executor.submit(run_job, *arguments, **options)
+            job.executor = self._executor
+            self._jobs[job_id] = job
+        job.future.add_done_callback(lambda future: self._finished(job, future))
+        logger.info("Travail %s en file : %s [%s]", job_id, target_name, target_sheet)
+        return job
+
+    @staticmethod
+    def _check_sheets(source_path, source_sheet, target_path, target_sheets):
+        """Check the sheets of a job and return its target sheet selection."""
+        if source_sheet not in get_sheet_names(source_path):
+            raise ValueError(f"Feuille source introuvable : {source_sheet}")
+        sheet_names = get_sheet_names(target_path)
+        if not sheet_names:
+            raise ValueError("Classeur cible illisible")
+        if not target_sheets:
+            return sheet_names[0]
+        if ALL_SHEETS in target_sheets:
+            return ALL_SHEETS
+        missing = [name for name in target_sheets if name not in sheet_names]
+        if missing:
+            raise ValueError(f"Feuilles cibles introuvables : {', '.join(missing)}")
+        return target_sheets[0] if len(target_sheets) == 1 else list(target_sheets)
+
+    def _finished(self, job: Job, future) -> None:
+        """Record the outcome of a job (called when its future completes)."""
+        if future.cancelled():
+            state, output, error, seconds = STATE_CANCELLED, None, None, None
+        else:
+            try:
+                state, output, error, seconds = future.result()
+            except Exception as exc:
+                # Processus du pool arrêté brutalement (mémoire insuffisante...)
+                logger.error("Échec du travail %s", job.id, exc_info=True)
+                state, output, error, seconds = STATE_FAILED, None, repr(exc), None
+        with self._lock:
+            job.state, job.output, job.error, job.seconds = (
+                state,
+                output,
+                error,
+                seconds,
+            )
+            job.finished = time.time()
+            forgotten = job.forgotten
+        logger.info("Travail %s terminé : %s", job.id, state)
+        if forgotten:
+            shutil.rmtree(job.directory, ignore_errors=True)
+
+    def job(self, job_id: str) -> Job | None:
+        """Return a job by id, or None if it is unknown or was removed."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def describe(self, job: Job) -> dict:
+        """
+        Describe the state and progress of a job.
+
+        Args:
+            job: Job returned by submit or job
+
+        Returns:
+            JSON-serialisable dictionary
+        """
+        progress = job.progress()
+        position = None
+        with self._lock:
+            state = job.state
+            if state is None and progress:
+                state = STATE_RUNNING
+            elif state is None:
+                state = STATE_QUEUED
+                # Travaux plus anciens qui n'ont pas encore démarré
+                position = sum(
+                    1
+                    for other in self._jobs.values()
+                    if other.finished is None
+                    and other.created < job.created
+                    and not other.progress()
+                )
+        total = progress.get("total")
+        done = progress.get("done")
+        return {
+            "id": job.id,
+            "state": state,
+            "source": job.source_name,
+            "source_sheet": job.source_sheet,
+            "target": job.target_name,
+            "target_sheet": job.target_sheet,
+            "created": _isoformat(job.created),
+            "started": _isoformat(progress.get("started")),
+            "finished": _isoformat(job.finished),
+            "queue_position": position,
+            "phase": progress.get("phase"),
+            "done": done,
+            "total": total,
+            "percent": round(100 * done / total, 1) if total and done else None,
+            "seconds": None if job.seconds is None else round(job.seconds, 3),
+            "error": job.error,
+            "cancel_requested": job.cancel_requested,
+        }
+
+    def jobs(self) -> list[dict]:
+        """Describe every job, oldest first."""
+        self._purge()
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [self.describe(job) for job in jobs]
+
+    def cancel(self, job_id: str) -> dict | None:
+        """
+        Cancel an unfinished job, or forget a finished one and remove its files.
+
+        A queued job is cancelled at once; a running job stops at its next
+        progress notification. Both stay listed, in the cancelled state,
+        until they are forgotten.
+
+        Args:
+            job_id: Job id
+
+        Returns:
+            Description of the job, or None if it is unknown
+        """
+        job = self.job(job_id)
+        if job is None:
+            return None
+        if job.finished is None:
+            job.cancel_requested = True
+            if not job.future.cancel():
+                # Déjà confié au pool : le processus s'arrête à sa prochaine
+                # vérification, ou dès son démarrage
+                Path(job.directory, CANCEL_NAME).touch()
+                logger.info("Annulation du travail %s demandée", job_id)
+            return self.describe(job)
+        description = self.describe(job)
+        self._forget(job)
+        return description
+
+    def _forget(self, job: Job) -> None:
+        """Remove a job from the queue, and its files once it has finished."""
+        with self._lock:
+            self._jobs.pop(job.id, None)
+            job.forgotten = True
+            finished = job.finished is not None
+        if finished:
+            shutil.rmtree(job.directory, ignore_errors=True)
+
+    def _purge(self) -> None:
+        """Forget the jobs finished more than ``keep`` seconds ago."""
+        limit = time.time() - self.keep
+        with self._lock:
+            expired = [
+                job
+                for job in self._jobs.values()
+                if job.finished is not None and job.finished < limit
+            ]
+        for job in expired:
+            self._forget(job)
+
+    def stats(self) -> dict:
+        """Load of the queue: running, queued and finished jobs."""
+        self._purge()
+        with self._lock:
+            jobs = list(self._jobs.values())
+        states = [self.describe(job)["state"] for job in jobs]
+        return {
+            "version": __version__,
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "capacity": self.capacity,
+            "timeout": self.timeout,
+            "running": states.count(STATE_RUNNING),
+            "queued": states.count(STATE_QUEUED),
+            "finished": sum(1 for state in states if state in FINAL_STATES),
+        }
+
+    def close(self) -> None:
+        """Cancel the unfinished jobs, stop the pool and remove the work files."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            if job.finished is None:
+                Path(job.directory, CANCEL_NAME).touch()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self._owns_work_dir:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
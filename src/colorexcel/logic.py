@@ -1,52 +1,127 @@
 """
 Logic module for Excel color manipulation.
 
-This module provides functions to extract and apply colors from one Excel file to another
-based on matching Implantation, Nom, and Prénom columns.
+This module provides functions to extract and apply colors from one Excel file to
+another based on matching Implantation, Nom, and Prénom columns.
+
+openpyxl and pandas are imported by the functions that need them, so that
+importing this module (from the command line, a script or a worker process)
+stays cheap and does not require the graphical interface.
 """
 
+import colorsys
+import functools
+import io
+import tempfile
 import zipfile
 import xml.etree.ElementTree as ET
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill
 import os
 import logging
-import pandas as pd
+from pathlib import Path
+
+from .cache import default_cache
+from .colormap import ColorMap
+from .instrumentation import (
+    COUNT_CELLS_PAINTED,
+    COUNT_ROWS_MATCHED,
+    COUNT_ROWS_STYLED,
+    COUNT_SOURCE_COLORS,
+    COUNT_SOURCE_ROWS,
+    COUNT_TARGET_ROWS,
+    NULL_REPORT,
+    REPORT_FILE_ENV,
+    RunReport,
+)
+from .progress import (
+    PHASE_LOAD,
+    PHASE_SAVE,
+    PHASE_SOURCE,
+    PHASE_TARGET,
+    CancelToken,
+    ProcessingCancelled,
+    ProgressCallback,
+    ProgressReporter,
+)
+from .matching import DEFAULT_FUZZY_THRESHOLD, KeyMatcher, Normalization
+from .output import (
+    DEFAULT_OUTPUT_NAME,
+    SCRATCH_PREFIX,
+    AtomicOutput,
+    is_buffer,
+    release_output,
+    scratch_output_path,
+)
+from .parallel import (
+    SourceExtraction,
+    patch_sheets_in_parallel,
+    should_extract_in_parallel,
+    should_patch_in_parallel,
+)
+from .results import default_result_cache, result_key, sources_digest
+from .xlsx_patch import write_colored_sheets
+from .xlsx_stream import XlsxPackage
 
 logger = logging.getLogger(__name__)
 
 # Constantes
 ALPHA_PREFIX = "FF"
 
+# Le schéma du thème liste dk1, lt1, dk2, lt2 alors que les indices de thème
+# des cellules commencent par lt1 (0), dk1 (1), lt2 (2), dk2 (3)
+THEME_SCHEME_ORDER = {0: 1, 1: 0, 2: 3, 3: 2}
+
+# Couleurs indexées système : premier plan (64) et arrière-plan (65)
+SYSTEM_INDEXED_COLORS = {64: "000000", 65: "FFFFFF"}
+
+# Moteurs d'extraction des couleurs source
+ENGINE_OPENPYXL = "openpyxl"
+ENGINE_XML = "xml"
+ENGINE_READONLY = "readonly"
+
+# Modes d'écriture du fichier cible
+WRITER_OPENPYXL = "openpyxl"
+WRITER_XML = "xml"
+
+# Modes de coloration d'une ligne cible
+PAINT_CELLS = "cells"
+PAINT_ROW = "row"
+
+# Sélection de toutes les feuilles cibles ayant les colonnes clés ; « * » est
+# interdit dans les noms de feuilles Excel, aucune feuille ne peut s'appeler ainsi
+ALL_SHEETS = "*"
+
+# En-têtes recherchés pour les colonnes clés (texte en minuscules)
+KEY_HEADERS = {
+    "implantation": ["implantation"],
+    "nom": ["nom"],
+    "prenom": ["prénom", "prenom"],
+}
+
 
 def apply_tint(rgb: tuple[int, int, int], tint: float) -> tuple[int, int, int]:
     """
-    Apply tint to an RGB color.
-    
+    Apply an Excel tint to an RGB color.
+
+    Excel changes the luminance of the colour in HLS space and keeps its hue
+    and saturation: a negative tint scales the luminance towards 0, a
+    positive tint moves it towards 1 by the same proportion.
+
     Args:
         rgb: Tuple of (R, G, B) values
         tint: Tint value (-1.0 to 1.0). Positive values lighten, negative darken.
-        
+
     Returns:
         Tuple of (R, G, B) values with tint applied
     """
     if tint == 0:
         return rgb
-    
-    r, g, b = rgb
-    
-    if tint > 0:
-        # Lighten: interpolate towards white (255, 255, 255)
-        r = int(r + (255 - r) * tint)
-        g = int(g + (255 - g) * tint)
-        b = int(b + (255 - b) * tint)
+
+    hue, lum, sat = colorsys.rgb_to_hls(*(channel / 255 for channel in rgb))
+    if tint < 0:
+        lum = lum * (1 + tint)
     else:
-        # Darken: interpolate towards black (0, 0, 0)
-        r = int(r * (1 + tint))
-        g = int(g * (1 + tint))
-        b = int(b * (1 + tint))
-    
-    return (r, g, b)
+        lum = lum * (1 - tint) + tint
+    return tuple(round(channel * 255) for channel in colorsys.hls_to_rgb(hue, lum, sat))
 
 
 def hex_to_rvb(hex_color: str) -> tuple[int, int, int] | None:
@@ -54,25 +129,41 @@ def hex_to_rvb(hex_color: str) -> tuple[int, int, int] | None:
     Convert hex color code to RGB tuple.
 
     Args:
-        hex_color: Hexadecimal color code (e.g., 'FF0000' or 'FFFF0000')
+        hex_color: Hexadecimal color code, RRGGBB or AARRGGBB (e.g., 'FF0000'
+            or 'FFFF0000'); the alpha channel is ignored
 
     Returns:
         Tuple of (R, G, B) values or None if invalid
     """
     if hex_color is None:
         return None
-    if hex_color.startswith(ALPHA_PREFIX):
+    if len(hex_color) == 8:
         hex_color = hex_color[2:]
     try:
         r = int(hex_color[0:2], 16)
         g = int(hex_color[2:4], 16)
         b = int(hex_color[4:6], 16)
+        if len(hex_color) != 6:
+            raise ValueError(hex_color)
         return (r, g, b)
     except ValueError:
         logger.warning("Code couleur hex invalide : %s", hex_color, exc_info=True)
         return None
 
 
+def format_hex(colors) -> str:
+    """
+    Format RGB tuples as space-separated '#RRGGBB' codes.
+
+    Args:
+        colors: Iterable of (R, G, B) tuples
+
+    Returns:
+        Codes of the colours, in order (e.g. '#FF0000 #00B050')
+    """
+    return " ".join("#%02X%02X%02X" % tuple(rvb_color) for rvb_color in colors)
+
+
 def extract_theme_colors(file_path: str) -> dict:
     """
     Extract theme colors from Excel file.
@@ -81,7 +172,8 @@ def extract_theme_colors(file_path: str) -> dict:
         file_path: Path to the Excel file
 
     Returns:
-        Dictionary mapping theme indices to hex color codes
+        Dictionary mapping theme indices, as used by the ``theme`` attribute of
+        cell colours, to hex color codes
     """
     theme_colors: dict[int, str] = {}
     if not os.path.exists(file_path):
@@ -100,7 +192,14 @@ def extract_theme_colors(file_path: str) -> dict:
                     for i, color in enumerate(color_scheme):
                         rgb = color.find("a:srgbClr", ns)
                         if rgb is not None:
-                            theme_colors[i] = rgb.attrib["val"]
+                            hex_color = rgb.attrib["val"]
+                        else:
+                            # Couleur système (dk1/lt1) : dernière valeur connue
+                            system = color.find("a:sysClr", ns)
+                            if system is None or "lastClr" not in system.attrib:
+                                continue
+                            hex_color = system.attrib["lastClr"]
+                        theme_colors[THEME_SCHEME_ORDER.get(i, i)] = hex_color
     except Exception:
         logger.error("Erreur lors de l'extraction des couleurs du thème", exc_info=True)
     return theme_colors
@@ -118,6 +217,21 @@ def _find_columns_by_header(sheet, headers_wanted):
         Dict {logical_name: column_index (0-based)} or None if any column is missing
     """
     header_row = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True))
+    return _find_header_indices(header_row, headers_wanted)
+
+
+def _find_header_indices(header_row, headers_wanted, log_missing: bool = True):
+    """
+    Find column indices in an already read header row.
+
+    Args:
+        header_row: Sequence of header cell values
+        headers_wanted: Dict {logical_name: [list of possible header texts]}
+        log_missing: Log an error when a column is missing
+
+    Returns:
+        Dict {logical_name: column_index (0-based)} or None if any column is missing
+    """
     indices = {}
 
     for logical_name, candidates in headers_wanted.items():
@@ -130,19 +244,139 @@ def _find_columns_by_header(sheet, headers_wanted):
                 idx = i
                 break
         if idx is None:
-            logger.error(
-                "Colonne '%s' introuvable dans l'en‑tête : %s", logical_name, header_row
-            )
+            if log_missing:
+                logger.error(
+                    "Colonne '%s' introuvable dans l'en‑tête : %s",
+                    logical_name,
+                    header_row,
+                )
             return None
         indices[logical_name] = idx
 
     return indices
 
 
+def select_target_sheets(requested, sheet_names, header_row) -> dict | None:
+    """
+    Resolve the target sheets of a run and find their key columns.
+
+    Args:
+        requested: Sheet name, sequence of sheet names, or ALL_SHEETS
+        sheet_names: Sheet names of the target workbook, in order
+        header_row: Callable returning the header values of a sheet
+
+    Returns:
+        Dict {sheet name: {logical_name: column_index}} in workbook order for
+        ALL_SHEETS (sheets without the key headers are skipped) and in the
+        requested order otherwise, or None if a requested sheet is missing or
+        lacks a key column
+    """
+    if requested == ALL_SHEETS:
+        selected = {}
+        for sheet_name in sheet_names:
+            col_indices = _find_header_indices(
+                header_row(sheet_name), KEY_HEADERS, log_missing=False
+            )
+            if col_indices is not None:
+                selected[sheet_name] = col_indices
+        if not selected:
+            logger.error("Aucune feuille cible ne contient les colonnes clés")
+            return None
+        logger.info("Feuilles cibles retenues : %s", list(selected))
+        return selected
+
+    names = [requested] if isinstance(requested, str) else list(requested)
+    if not names:
+        logger.error("Aucune feuille cible demandée")
+        return None
+    selected = {}
+    for sheet_name in dict.fromkeys(names):
+        if sheet_name not in sheet_names:
+            logger.error("Feuille cible introuvable : %s", sheet_name)
+            return None
+        col_indices = _find_header_indices(header_row(sheet_name), KEY_HEADERS)
+        if col_indices is None:
+            return None
+        selected[sheet_name] = col_indices
+    return selected
+
+
+def key_column_indices(col_indices: dict) -> tuple[int, int, int]:
+    """Indices (implantation, nom, prenom) of the key columns of a sheet."""
+    return (
+        col_indices["implantation"],
+        col_indices["nom"],
+        col_indices["prenom"],
+    )
+
+
+def key_row_color(data_colors, key_columns: tuple, on_row=None, on_key=None):
+    """
+    Build the row colour callback of the XML writer for one sheet.
+
+    Args:
+        data_colors: Mapping (implantation, nom, prenom) -> RGB tuple
+        key_columns: 0-based indices of the key columns
+        on_row: Optional callable invoked for every data row (progress)
+        on_key: Optional callable (row_number, key, RGB tuple or None)
+            invoked for every data row with a complete key
+
+    Returns:
+        Callback (row_number, cells) -> RGB tuple or None
+    """
+
+    def row_color(row_number, cells):
+        if row_number < 2:
+            return None
+        if on_row is not None:
+            on_row()
+        key = tuple(cells.get(idx, (None, 0))[0] for idx in key_columns)
+        if None in key:
+            return None
+        rvb_color = data_colors.get(key)
+        if on_key is not None:
+            on_key(row_number, key, rvb_color)
+        return rvb_color
+
+    return row_color
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_sheet_names(file_path: str, mtime_ns: int, size: int) -> tuple:
+    """
+    Read the sheet names of a workbook, cached per file version.
+
+    The modification time and size are part of the cache key only, so that a
+    file rewritten in place is read again.
+
+    Args:
+        file_path: Absolute path to the Excel file
+        mtime_ns: Modification time of the file (nanoseconds)
+        size: Size of the file in bytes
+
+    Returns:
+        Tuple of sheet names, in tab order
+    """
+    if zipfile.is_zipfile(file_path):
+        # Classeur .xlsx/.xlsm : seul xl/workbook.xml (et ses relations) est lu
+        with XlsxPackage(file_path) as package:
+            return tuple(package.sheet_names)
+
+    # Ancien format binaire (.xls) : pandas n'est importé que dans ce cas
+    import pandas as pd
+
+    with pd.ExcelFile(file_path) as xls:
+        return tuple(xls.sheet_names)
+
+
 def get_sheet_names(file_path: str) -> list:
     """
     Get list of sheet names from an Excel file.
 
+    Only the workbook part of the archive is read, and results are cached per
+    (path, modification time, size), so selecting the same file again is
+    instant.
+
     Args:
         file_path: Path to the Excel file
 
@@ -154,8 +388,12 @@ def get_sheet_names(file_path: str) -> list:
             logger.error("Fichier introuvable : %s", file_path)
             return []
 
-        xls = pd.ExcelFile(file_path)
-        sheet_names = xls.sheet_names
+        stat = os.stat(file_path)
+        sheet_names = list(
+            _cached_sheet_names(
+                os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
+            )
+        )
         logger.info("Feuilles trouvées dans %s : %s", file_path, sheet_names)
         return sheet_names
     except Exception:
@@ -165,200 +403,1267 @@ def get_sheet_names(file_path: str) -> list:
         return []
 
 
-def get_implantation_colors(file_path: str, sheet_name: str) -> dict:
+def _indexed_color(index: int, indexed_colors=None) -> str | None:
     """
-    Extract colors from the source Excel file based on Implantation, Nom, Prénom columns.
+    Return the hex code of an indexed colour.
 
     Args:
-        file_path: Path to the source Excel file
-        sheet_name: Name of the sheet to read from
+        index: Index into the palette
+        indexed_colors: Custom palette of the workbook (``<indexedColors>``),
+            or None for the default Excel palette
 
     Returns:
-        Dictionary mapping (implantation, nom, prenom) tuples to RGB color tuples
+        Hex color code, or None if the index is outside the palette
     """
-    if not os.path.exists(file_path):
-        logger.error(
-            "Fichier source introuvable pour get_implantation_colors : %s", file_path
-        )
-        return {}
+    palette = indexed_colors
+    if not palette:
+        from openpyxl.styles.colors import COLOR_INDEX as palette
+    if 0 <= index < len(palette):
+        return palette[index]
+    return SYSTEM_INDEXED_COLORS.get(index)
+
+
+def _resolve_color(
+    color_type, color_value, tint, theme_colors: dict, indexed_colors=None
+):
+    """
+    Resolve a fill foreground colour to an RGB tuple.
+
+    Args:
+        color_type: Colour type ('rgb', 'theme', 'indexed' or 'auto')
+        color_value: Colour value matching the type
+        tint: Tint value (-1.0 to 1.0)
+        theme_colors: Theme colours as returned by extract_theme_colors
+        indexed_colors: Custom indexed palette of the workbook, if any
+
+    Returns:
+        Tuple of (R, G, B) values or None if the colour cannot be resolved
+    """
+    rvb_color = None
+    if color_type == "rgb":
+        rvb_color = hex_to_rvb(color_value)
+    elif color_type == "theme":
+        hex_color = theme_colors.get(color_value)
+        if hex_color:
+            rvb_color = hex_to_rvb(hex_color)
+    elif color_type == "indexed":
+        hex_color = _indexed_color(color_value, indexed_colors)
+        if hex_color:
+            rvb_color = hex_to_rvb(hex_color)
+
+    # Appliquer le tint si présent
+    if rvb_color and tint != 0:
+        rvb_color = apply_tint(rvb_color, tint)
+    return rvb_color
+
+
+def _fill_color(fill, theme_colors: dict, indexed_colors=None):
+    """
+    Resolve the foreground colour of an openpyxl fill to an RGB tuple.
+
+    Args:
+        fill: openpyxl Fill, or None
+        theme_colors: Theme colours as returned by extract_theme_colors
+        indexed_colors: Custom indexed palette of the workbook, if any
+
+    Returns:
+        Tuple of (R, G, B) values or None if the fill has no usable colour
+    """
+    if not fill or fill.fill_type == "none":
+        return None
+    bg_color = fill.fgColor
+    tint = getattr(bg_color, "tint", 0.0) or 0.0  # Gérer le tint
+    return _resolve_color(
+        bg_color.type, bg_color.value, tint, theme_colors, indexed_colors
+    )
+
+
+def dimension_rows(dimension: str | None) -> int | None:
+    """Number of data rows (header excluded) of a ``<dimension ref>``, or None."""
+    if not dimension:
+        return None
+    from openpyxl.utils.cell import range_boundaries
 
     try:
+        return max(range_boundaries(dimension)[3] - 1, 0)
+    except (ValueError, TypeError):
+        return None
+
+
+def _iter_source_colors_openpyxl(
+    file_path: str, sheet_name: str, reporter: ProgressReporter, report=NULL_REPORT
+):
+    """
+    Yield (key, RGB) pairs of a source sheet using a fully loaded workbook.
+
+    Args:
+        file_path: Path to the source Excel file
+        sheet_name: Name of the sheet to read from
+        reporter: Progress reporter of the run (phase PHASE_SOURCE)
+        report: RunReport receiving the phases and row counts
+
+    Yields:
+        Tuples ((implantation, nom, prenom), (R, G, B)) in row order
+    """
+    from openpyxl import load_workbook
+
+    with report.phase("source.theme"):
         theme_colors = extract_theme_colors(file_path)
+    with report.phase("source.load"):
         workbook = load_workbook(filename=file_path, data_only=True)
-    except Exception:
-        logger.error(
-            "Erreur lors de l'ouverture du fichier source : %s",
-            file_path,
-            exc_info=True,
-        )
-        return {}
 
     try:
         if sheet_name not in workbook.sheetnames:
             logger.error(
                 "Feuille source introuvable : %s dans %s", sheet_name, file_path
             )
-            return {}
+            return
 
         sheet = workbook[sheet_name]
 
         # Recherche dynamique des colonnes
-        col_indices = _find_columns_by_header(
-            sheet,
-            {
-                "implantation": ["implantation"],
-                "nom": ["nom"],
-                "prenom": ["prénom", "prenom"],
-            },
-        )
+        with report.phase("source.header"):
+            col_indices = _find_columns_by_header(sheet, KEY_HEADERS)
         if col_indices is None:
-            return {}
+            return
 
         idx_impl = col_indices["implantation"]
         idx_nom = col_indices["nom"]
         idx_prenom = col_indices["prenom"]
 
-        data_colors = {}
+        fills = workbook._fills
+        indexed_colors = workbook._colors
+
+        @functools.cache
+        def fill_color(fill_id: int):
+            # Couleur résolue une seule fois par remplissage
+            return _fill_color(fills[fill_id], theme_colors, indexed_colors)
 
         # Parcourir à partir de la 2e ligne (1 = en-tête)
-        for row in sheet.iter_rows(min_row=2):
-            implantation = row[idx_impl].value
-            nom = row[idx_nom].value
-            prenom = row[idx_prenom].value
+        reporter.start(PHASE_SOURCE, max(sheet.max_row - 1, 0))
+        rows_done = 0
+        with report.phase("source.scan"):
+            for row in sheet.iter_rows(min_row=2):
+                rows_done += 1
+                reporter.update(rows_done)
+                implantation = row[idx_impl].value
+                nom = row[idx_nom].value
+                prenom = row[idx_prenom].value
 
-            if implantation is None or nom is None or prenom is None:
-                continue
+                if implantation is None or nom is None or prenom is None:
+                    continue
+
+                rvb_color = fill_color(row[idx_impl]._style.fillId)
+                if rvb_color:
+                    yield (implantation, nom, prenom), rvb_color
+            reporter.finish(rows_done)
+        report.count(COUNT_SOURCE_ROWS, rows_done)
+    finally:
+        workbook.close()
+
+
+def _iter_source_colors_readonly(
+    file_path: str, sheet_name: str, reporter: ProgressReporter, report=NULL_REPORT
+):
+    """
+    Yield (key, RGB) pairs of a source sheet using a read-only workbook.
+
+    Rows are streamed by openpyxl in read-only mode and restricted to the
+    columns spanned by the key columns, so memory does not grow with the
+    sheet. Fills are resolved once per cell style through the workbook style
+    array, giving the same result as the fully loaded workbook.
+
+    Args:
+        file_path: Path to the source Excel file
+        sheet_name: Name of the sheet to read from
+        reporter: Progress reporter of the run (phase PHASE_SOURCE)
+        report: RunReport receiving the phases and row counts
+
+    Yields:
+        Tuples ((implantation, nom, prenom), (R, G, B)) in row order
+    """
+    from openpyxl import load_workbook
+
+    with report.phase("source.theme"):
+        theme_colors = extract_theme_colors(file_path)
+    with report.phase("source.load"):
+        workbook = load_workbook(filename=file_path, read_only=True, data_only=True)
+
+    try:
+        if sheet_name not in workbook.sheetnames:
+            logger.error(
+                "Feuille source introuvable : %s dans %s", sheet_name, file_path
+            )
+            return
+
+        sheet = workbook[sheet_name]
+
+        with report.phase("source.header"):
+            col_indices = _find_columns_by_header(sheet, KEY_HEADERS)
+        if col_indices is None:
+            return
+
+        # Ne lire que les colonnes comprises entre les colonnes clés
+        first_idx = min(col_indices.values())
+        last_idx = max(col_indices.values())
+        idx_impl = col_indices["implantation"] - first_idx
+        idx_nom = col_indices["nom"] - first_idx
+        idx_prenom = col_indices["prenom"] - first_idx
+
+        cell_styles = workbook._cell_styles
+        fills = workbook._fills
+        indexed_colors = workbook._colors
+
+        @functools.cache
+        def style_color(style_id: int):
+            # Couleur résolue une seule fois par style de cellule
+            fill = fills[cell_styles[style_id].fillId]
+            return _fill_color(fill, theme_colors, indexed_colors)
+
+        max_row = sheet.max_row
+        reporter.start(PHASE_SOURCE, max(max_row - 1, 0) if max_row else None)
+        rows_done = 0
+        with report.phase("source.scan"):
+            for row in sheet.iter_rows(
+                min_row=2, min_col=first_idx + 1, max_col=last_idx + 1
+            ):
+                rows_done += 1
+                reporter.update(rows_done)
+                cell_impl = row[idx_impl]
+                implantation = cell_impl.value
+                nom = row[idx_nom].value
+                prenom = row[idx_prenom].value
+
+                if implantation is None or nom is None or prenom is None:
+                    continue
+
+                rvb_color = style_color(cell_impl._style_id)
+                if rvb_color:
+                    yield (implantation, nom, prenom), rvb_color
+            reporter.finish(rows_done)
+        report.count(COUNT_SOURCE_ROWS, rows_done)
+    finally:
+        workbook.close()
+
+
+def xml_header_row(first_row) -> tuple:
+    """
+    Build the header row values from the first row streamed by XlsxPackage.
+
+    Args:
+        first_row: First (row_number, cells) item of XlsxPackage.iter_rows, or None
+
+    Returns:
+        Tuple of header values, None for missing cells (empty if row 1 is absent)
+    """
+    if first_row is None or first_row[0] != 1:
+        return ()
+    header_cells = first_row[1]
+    width = max(header_cells, default=-1) + 1
+    return tuple(
+        header_cells[i][0] if i in header_cells else None for i in range(width)
+    )
+
+
+def _iter_source_colors_xml(
+    file_path: str, sheet_name: str, reporter: ProgressReporter, report=NULL_REPORT
+):
+    """
+    Yield (key, RGB) pairs of a source sheet by streaming its raw XML.
+
+    Only the workbook, styles, shared strings and the chosen worksheet parts
+    are read, and the worksheet is parsed incrementally, decoding only the key
+    columns, so memory is bounded by the shared string table rather than by
+    the number of cells.
+
+    Args:
+        file_path: Path to the source Excel file
+        sheet_name: Name of the sheet to read from
+        reporter: Progress reporter of the run (phase PHASE_SOURCE)
+        report: RunReport receiving the phases and row counts
+
+    Yields:
+        Tuples ((implantation, nom, prenom), (R, G, B)) in row order
+    """
+    with report.phase("source.theme"):
+        theme_colors = extract_theme_colors(file_path)
+
+    with XlsxPackage(file_path) as package:
+        if package.sheet_part(sheet_name) is None:
+            logger.error(
+                "Feuille source introuvable : %s dans %s", sheet_name, file_path
+            )
+            return
+
+        with report.phase("source.header"):
+            rows = package.iter_rows(sheet_name)
+            first_row = next(rows, None)
+            col_indices = _find_header_indices(xml_header_row(first_row), KEY_HEADERS)
+        if col_indices is None:
+            return
+
+        idx_impl = col_indices["implantation"]
+        idx_nom = col_indices["nom"]
+        idx_prenom = col_indices["prenom"]
+        with report.phase("source.styles"):
+            styles = package.styles
+
+        @functools.cache
+        def style_color(style_id: int):
+            # Couleur résolue une seule fois par style de cellule
+            fill = styles.fill_for_style(style_id)
+            return _resolve_color(
+                fill.color_type,
+                fill.color_value,
+                fill.tint,
+                theme_colors,
+                styles.indexed_colors,
+            )
+
+        # Relire la feuille en ne décodant que les colonnes clés
+        rows.close()
+        rows = package.iter_rows(sheet_name, columns=set(col_indices.values()))
+        next(rows, None)
+
+        reporter.start(
+            PHASE_SOURCE, dimension_rows(package.sheet_dimension(sheet_name))
+        )
+        rows_done = 0
+        with report.phase("source.scan"):
+            for _row_number, cells in rows:
+                rows_done += 1
+                reporter.update(rows_done)
+                impl_cell = cells.get(idx_impl)
+                nom_cell = cells.get(idx_nom)
+                prenom_cell = cells.get(idx_prenom)
+                if impl_cell is None or nom_cell is None or prenom_cell is None:
+                    continue
+
+                implantation, style_id = impl_cell
+                nom = nom_cell[0]
+                prenom = prenom_cell[0]
+                if implantation is None or nom is None or prenom is None:
+                    continue
 
-            key = (implantation, nom, prenom)
-
-            cell_impl = row[idx_impl]
-            if cell_impl.fill and cell_impl.fill.fill_type != "none":
-                bg_color = cell_impl.fill.fgColor
-                rvb_color = None
-                tint = getattr(bg_color, 'tint', 0.0) or 0.0  # Gérer le tint
-
-                if bg_color.type == "rgb":
-                    rvb_color = hex_to_rvb(bg_color.rgb)
-                elif bg_color.type == "theme":
-                    hex_color = theme_colors.get(bg_color.theme)
-                    if hex_color:
-                        rvb_color = hex_to_rvb(hex_color)
-                
-                # Appliquer le tint si présent
-                if rvb_color and tint != 0:
-                    rvb_color = apply_tint(rvb_color, tint)
-
-                # Ignorer les couleurs noires ou nulles
-                if rvb_color and rvb_color != (0, 0, 0):
-                    data_colors[key] = rvb_color
-                    logger.debug(f"Couleur extraite pour {key}: RGB{rvb_color} (type: {bg_color.type}, tint: {tint})")
+                rvb_color = style_color(style_id)
+                if rvb_color:
+                    yield (implantation, nom, prenom), rvb_color
+            reporter.finish(rows_done)
+        report.count(COUNT_SOURCE_ROWS, rows_done)
 
+
+SOURCE_ENGINES = {
+    ENGINE_OPENPYXL: _iter_source_colors_openpyxl,
+    ENGINE_XML: _iter_source_colors_xml,
+    ENGINE_READONLY: _iter_source_colors_readonly,
+}
+
+
+def get_implantation_colors(
+    file_path: str,
+    sheet_name: str,
+    engine: str = ENGINE_OPENPYXL,
+    use_cache: bool = False,
+    progress: ProgressCallback | None = None,
+    cancel_token: CancelToken | None = None,
+    report: RunReport | None = None,
+) -> ColorMap:
+    """
+    Extract colors from the source Excel file by Implantation, Nom, Prénom columns.
+
+    Args:
+        file_path: Path to the source Excel file
+        sheet_name: Name of the sheet to read from
+        engine: Extraction engine, ENGINE_OPENPYXL (full workbook load),
+            ENGINE_READONLY (openpyxl read-only workbook, key columns only)
+            or ENGINE_XML (streaming raw-XML parser with bounded memory).
+            All return the same mapping for the same input.
+        use_cache: Look the map up in the persistent color map cache first,
+            and store it there after a successful extraction
+        progress: Optional callback (phase, rows processed, total rows or
+            None), called every few hundred rows
+        cancel_token: Optional CancelToken checked while scanning rows
+        report: Optional RunReport receiving the timing and memory of each
+            phase and the row counters
+
+    Returns:
+        ColorMap (dict-like) mapping (implantation, nom, prenom) tuples to RGB
+        color tuples; empty on error
+
+    Raises:
+        ProcessingCancelled: If the run was cancelled through cancel_token
+    """
+    if engine not in SOURCE_ENGINES:
+        logger.error("Moteur d'extraction inconnu : %s", engine)
+        return ColorMap()
+
+    if not os.path.exists(file_path):
+        logger.error(
+            "Fichier source introuvable pour get_implantation_colors : %s", file_path
+        )
+        return ColorMap()
+
+    report = report or NULL_REPORT
+    if use_cache:
+        with report.phase("source.cache"):
+            data_colors = default_cache().get(file_path, sheet_name)
+        if data_colors is not None:
+            report.count(COUNT_SOURCE_COLORS, len(data_colors))
+            return data_colors
+
+    reporter = ProgressReporter(progress, cancel_token)
+    try:
+        source_colors = SOURCE_ENGINES[engine](file_path, sheet_name, reporter, report)
+        data_colors = ColorMap()
+        for key, rvb_color in source_colors:
+            # Ignorer les couleurs noires ou nulles
+            if rvb_color != (0, 0, 0):
+                data_colors[key] = rvb_color
+        report.count(COUNT_SOURCE_COLORS, len(data_colors))
+        if use_cache and data_colors:
+            with report.phase("source.cache"):
+                default_cache().put(file_path, sheet_name, data_colors)
         return data_colors
+    except ProcessingCancelled:
+        logger.info("Extraction des couleurs annulée : %s", file_path)
+        raise
+    except (OSError, zipfile.BadZipFile):
+        logger.error(
+            "Erreur lors de l'ouverture du fichier source : %s",
+            file_path,
+            exc_info=True,
+        )
+        return ColorMap()
     except Exception:
         logger.error(
             "Erreur lors de l'extraction des couleurs d'implantation", exc_info=True
         )
-        return {}
-    finally:
-        workbook.close()
+        return ColorMap()
 
 
-def apply_colors_to_file2(
-    file1_path: str, file1_sheet: str, file2_path: str, file2_sheet: str
-) -> str | None:
+def _existing_cell_value(cells: dict, row: int, col_idx: int):
     """
-    Apply colors from source file to a copy of target file based on matching Implantation, Nom, Prénom.
+    Return the value of a cell without creating it.
 
     Args:
-        file1_path: Path to the source Excel file (with colors)
-        file1_sheet: Sheet name in source file
-        file2_path: Path to the target Excel file (to apply colors to)
-        file2_sheet: Sheet name in target file
-        
+        cells: Worksheet cell storage {(row, column): cell}
+        row: Row number (1-based)
+        col_idx: Column index (0-based)
+
     Returns:
-        Path to the new colored file or None if error
+        The cell value, or None if the cell does not exist
     """
-    if not os.path.exists(file2_path):
-        logger.error("Fichier cible introuvable : %s", file2_path)
-        return None
+    cell = cells.get((row, col_idx + 1))
+    return None if cell is None else cell.value
+
+
+def _populated_cells_by_row(sheet, first_col: int, last_col: int) -> dict:
+    """
+    Group the cells that exist in a worksheet by row.
+
+    Args:
+        sheet: openpyxl worksheet
+        first_col: First column kept (1-based, inclusive)
+        last_col: Last column kept (1-based, inclusive)
+
+    Returns:
+        Dict {row: [cells with a value or a style, in column order]}
+    """
+    populated: dict[int, list] = {}
+    for (row, col), cell in sorted(sheet._cells.items()):
+        if first_col <= col <= last_col and (cell.has_style or cell.value is not None):
+            populated.setdefault(row, []).append(cell)
+    return populated
+
+
+class _FillStyleCache:
+    """
+    Intern one solid fill and one cell style per colour for a target workbook.
 
-    # Créer un fichier temporaire pour le traitement
-    import tempfile
-    import shutil
-    from pathlib import Path
-    
-    temp_dir = tempfile.gettempdir()
-    original_path = Path(file2_path)
-    temp_file = Path(temp_dir) / f"colorexcel_temp_{original_path.name}"
-    
-    shutil.copy2(file2_path, temp_file)
-    logger.info(f"Fichier temporaire créé : {temp_file}")
+    Assigning ``cell.fill`` makes openpyxl hash and deduplicate the fill for
+    every cell. Here each RGB colour gets a single PatternFill registered
+    once in the workbook, and each (original style, colour) pair a single
+    style array, so the per-cell work is a dictionary lookup and an array
+    copy. Only the fill id of the original style changes, exactly as with
+    ``cell.fill = fill``.
+    """
+
+    def __init__(self, workbook):
+        from openpyxl.styles import PatternFill
+        from openpyxl.styles.cell_style import StyleArray
+
+        self._pattern_fill = PatternFill
+        self._style_array = StyleArray
+        # Style vide d'une cellule sans mise en forme
+        self._empty_style = StyleArray()
+        self._fills = workbook._fills
+        self._fill_ids: dict[tuple[int, int, int], int] = {}
+        self._styles: dict[tuple, object] = {}
+        self.cells_painted = 0
+        self.rows_styled = 0
+
+    @property
+    def distinct_colors(self) -> int:
+        """Number of distinct colours painted so far."""
+        return len(self._fill_ids)
+
+    def fill_id(self, rvb_color: tuple[int, int, int]) -> int:
+        """
+        Return the workbook fill id of a solid colour, registering it once.
+
+        Args:
+            rvb_color: Tuple of (R, G, B) values
+
+        Returns:
+            Index of the fill in the workbook fill list
+        """
+        fill_id = self._fill_ids.get(rvb_color)
+        if fill_id is None:
+            hex_color = "{:02X}{:02X}{:02X}".format(*rvb_color)
+            fill = self._pattern_fill(
+                start_color=hex_color, end_color=hex_color, fill_type="solid"
+            )
+            fill_id = self._fills.add(fill)
+            self._fill_ids[rvb_color] = fill_id
+        return fill_id
+
+    def _restyle(self, styleable, rvb_color: tuple[int, int, int]) -> None:
+        base = styleable._style
+        if base is None:
+            base = self._empty_style
+        key = (base, rvb_color)
+        style = self._styles.get(key)
+        if style is None:
+            style = self._style_array(base)
+            style.fillId = self.fill_id(rvb_color)
+            self._styles[(self._style_array(base), rvb_color)] = style
+        # Copie : openpyxl modifie les tableaux de style en place
+        styleable._style = self._style_array(style)
+
+    def paint(self, cell, rvb_color: tuple[int, int, int]) -> None:
+        """
+        Set the fill of a cell to a solid colour, keeping its other styles.
+
+        Args:
+            cell: openpyxl cell
+            rvb_color: Tuple of (R, G, B) values
+        """
+        self._restyle(cell, rvb_color)
+        self.cells_painted += 1
+
+    def paint_row(self, row_dimension, rvb_color: tuple[int, int, int]) -> None:
+        """
+        Set a row-level fill (``<row s=... customFormat="1">``).
 
-    data_colors = get_implantation_colors(file1_path, file1_sheet)
+        Args:
+            row_dimension: openpyxl RowDimension of the row
+            rvb_color: Tuple of (R, G, B) values
+        """
+        self._restyle(row_dimension, rvb_color)
+        self.rows_styled += 1
 
+
+def _apply_colors_xml(
+    data_colors,
+    file2_path: str,
+    file2_sheet,
+    output_path,
+    row_style: bool = False,
+    column_range: tuple[int, int] | None = None,
+    reporter: ProgressReporter | None = None,
+    report=NULL_REPORT,
+    parallel_sheets: bool | None = None,
+    manifest=None,
+) -> bool:
+    """
+    Write a colored copy of the target by patching its XML directly.
+
+    Args:
+        data_colors: Mapping (implantation, nom, prenom) -> RGB tuple, or a
+            callable returning it, called once the target header is read
+        file2_path: Path to the target Excel file, or a binary buffer
+        file2_sheet: Sheet name, list of sheet names or ALL_SHEETS
+        output_path: Path or binary buffer the colored copy is written to
+        row_style: Use a row-level style and colour only existing cells
+        column_range: Optional (first, last) 1-based column range to colour
+        reporter: Optional progress reporter (phase PHASE_TARGET)
+        report: RunReport receiving the phases and counters
+        parallel_sheets: Patch the sheets in separate processes (True), in
+            this process (False), or automatically (None); a buffer target is
+            always patched in this process
+        manifest: Optional incremental.RunManifest receiving the key and
+            colour of every row and the coloured cell formats; the sheets are
+            then patched in this process
+
+    Returns:
+        True if the colored copy was written
+
+    Raises:
+        ProcessingCancelled: If the run was cancelled
+    """
+    reporter = reporter or ProgressReporter()
     try:
-        workbook = load_workbook(temp_file)
+        with report.phase("target.header"), XlsxPackage(file2_path) as package:
+            sheets = select_target_sheets(
+                file2_sheet,
+                package.sheet_names,
+                lambda name: xml_header_row(next(package.iter_rows(name), None)),
+            )
+            if sheets is None:
+                return False
+            sheet_rows = [
+                dimension_rows(package.sheet_dimension(name)) for name in sheets
+            ]
     except Exception:
         logger.error(
             "Erreur lors de l'ouverture du fichier cible : %s",
-            temp_file,
+            file2_path,
             exc_info=True,
         )
-        return None
+        return False
+    total_rows = None if None in sheet_rows else sum(sheet_rows)
 
-    try:
-        if file2_sheet not in workbook.sheetnames:
+    if callable(data_colors):
+        try:
+            data_colors = data_colors()
+        except ProcessingCancelled:
+            raise
+        except Exception:
             logger.error(
-                "Feuille cible introuvable : %s dans %s", file2_sheet, temp_file
+                "Erreur lors de l'extraction des couleurs source", exc_info=True
             )
-            return None
+            return False
 
-        sheet = workbook[file2_sheet]
+    if manifest is not None:
+        parallel_sheets = False
+    elif is_buffer(file2_path):
+        # Les processus rouvrent la cible par son chemin : un tampon ne peut
+        # pas leur être transmis
+        if parallel_sheets:
+            logger.info("Cible en mémoire : feuilles recolorées dans ce processus")
+        parallel_sheets = False
+    elif parallel_sheets is None:
+        parallel_sheets = should_patch_in_parallel(file2_path, len(sheets))
 
-        # Même logique : trouver les colonnes Implantation/Nom/Prénom dans le fichier 2
-        col_indices = _find_columns_by_header(
-            sheet,
-            {
-                "implantation": ["implantation"],
-                "nom": ["nom"],
-                "prenom": ["prénom", "prenom"],
-            },
+    rows_done = 0
+
+    def on_row():
+        nonlocal rows_done
+        rows_done += 1
+        reporter.update(rows_done)
+
+    reporter.start(PHASE_TARGET, total_rows)
+    try:
+        with report.phase("target.patch"):
+            if parallel_sheets and len(sheets) > 1:
+                with tempfile.TemporaryDirectory(prefix=SCRATCH_PREFIX) as scratch:
+                    patched = patch_sheets_in_parallel(
+                        file2_path,
+                        {
+                            name: key_column_indices(cols)
+                            for name, cols in sheets.items()
+                        },
+                        data_colors,
+                        scratch,
+                        row_style=row_style,
+                        column_range=column_range,
+                        cancel_token=reporter.cancel_token,
+                    )
+                    colored = write_colored_sheets(
+                        file2_path,
+                        output_path,
+                        {},
+                        report=report,
+                        patched=patched,
+                    )
+            else:
+                row_colors = {
+                    name: key_row_color(
+                        data_colors,
+                        key_column_indices(cols),
+                        on_row,
+                        (
+                            None
+                            if manifest is None
+                            else functools.partial(manifest.record_row, name)
+                        ),
+                    )
+                    for name, cols in sheets.items()
+                }
+                colored = write_colored_sheets(
+                    file2_path,
+                    output_path,
+                    row_colors,
+                    row_style=row_style,
+                    column_range=column_range,
+                    report=report,
+                )
+                if manifest is not None:
+                    manifest.set_styles(colored.colored_from, colored.colored_styles)
+    except ProcessingCancelled:
+        raise
+    except Exception:
+        logger.error(
+            "Erreur lors de l'application des couleurs au fichier cible", exc_info=True
         )
-        if col_indices is None:
-            return None
+        return False
+    reporter.finish(total_rows if total_rows is not None else rows_done)
+    logger.info(
+        "Couleurs appliquées sur %d lignes de %d feuille(s)",
+        colored.rows_patched,
+        len(sheets),
+    )
+    return True
 
-        idx_impl = col_indices["implantation"]
-        idx_nom = col_indices["nom"]
-        idx_prenom = col_indices["prenom"]
 
-        for row in sheet.iter_rows(min_row=2):
-            implantation = row[idx_impl].value
-            nom = row[idx_nom].value
-            prenom = row[idx_prenom].value
+def _paint_sheet_openpyxl(
+    sheet,
+    col_indices: dict,
+    data_colors,
+    fill_styles: "_FillStyleCache",
+    paint_mode: str,
+    column_range: tuple[int, int] | None,
+    reporter: ProgressReporter,
+) -> int:
+    """
+    Colour the matched rows of one loaded target sheet.
 
-            if implantation is None or nom is None or prenom is None:
-                continue
+    Args:
+        sheet: openpyxl worksheet
+        col_indices: Key columns of the sheet (see _find_header_indices)
+        data_colors: Mapping (implantation, nom, prenom) -> RGB tuple
+        fill_styles: Fill and style cache of the workbook
+        paint_mode: PAINT_CELLS or PAINT_ROW (see apply_color_map)
+        column_range: Optional (first, last) 1-based column range to colour
+        reporter: Progress reporter (phase PHASE_TARGET)
+
+    Returns:
+        Number of rows coloured
+    """
+    idx_impl = col_indices["implantation"]
+    idx_nom = col_indices["nom"]
+    idx_prenom = col_indices["prenom"]
+
+    # Lecture directe des cellules existantes : ne pas créer de cellules
+    # vides pour les colonnes qui ne seront pas colorées
+    cells = sheet._cells
+    first_col, last_col = column_range or (1, sheet.max_column)
+    populated = (
+        _populated_cells_by_row(sheet, first_col, last_col)
+        if paint_mode == PAINT_ROW
+        else {}
+    )
+
+    reporter.start(PHASE_TARGET, max(sheet.max_row - 1, 0))
+    rows_matched = 0
+    for row_idx in range(2, sheet.max_row + 1):
+        reporter.update(row_idx - 1)
+        implantation = _existing_cell_value(cells, row_idx, idx_impl)
+        nom = _existing_cell_value(cells, row_idx, idx_nom)
+        prenom = _existing_cell_value(cells, row_idx, idx_prenom)
+
+        if implantation is None or nom is None or prenom is None:
+            continue
+
+        key = (implantation, nom, prenom)
+        rvb_color = data_colors.get(key)
+
+        if rvb_color:
+            rows_matched += 1
+            if paint_mode == PAINT_ROW:
+                # Style de ligne + cellules renseignées uniquement
+                fill_styles.paint_row(sheet.row_dimensions[row_idx], rvb_color)
+                row_cells = populated.get(row_idx, ())
+            else:
+                # Appliquer la couleur sur toute la ligne (ou la plage)
+                row_cells = (
+                    sheet.cell(row=row_idx, column=col)
+                    for col in range(first_col, last_col + 1)
+                )
+            for cell in row_cells:
+                fill_styles.paint(cell, rvb_color)
+    reporter.finish(max(sheet.max_row - 1, 0))
+    return rows_matched
+
+
+def _apply_colors_openpyxl(
+    data_colors,
+    file2_path,
+    file2_sheet,
+    output_path,
+    paint_mode: str = PAINT_CELLS,
+    column_range: tuple[int, int] | None = None,
+    reporter: ProgressReporter | None = None,
+    report=NULL_REPORT,
+) -> bool:
+    """
+    Write a colored copy of the target by loading and saving it with openpyxl.
+
+    The workbook is loaded and saved once, whatever the number of sheets.
+
+    Args:
+        data_colors: Mapping (implantation, nom, prenom) -> RGB tuple, or a
+            callable returning it (called once the header is found)
+        file2_path: Path to the target Excel file, or a binary buffer
+        file2_sheet: Sheet name, list of sheet names or ALL_SHEETS
+        output_path: Path or binary buffer the colored copy is written to
+        paint_mode: PAINT_CELLS or PAINT_ROW (see apply_color_map)
+        column_range: Optional (first, last) 1-based column range to colour
+        reporter: Optional progress reporter
+        report: RunReport receiving the phases and counters
+
+    Returns:
+        True if the colored copy was written
+
+    Raises:
+        ProcessingCancelled: If the run was cancelled
+    """
+    from openpyxl import load_workbook
+
+    reporter = reporter or ProgressReporter(None)
+    reporter.start(PHASE_LOAD)
+    try:
+        # Chargement direct de la cible, sans copie préalable : la sortie est
+        # un fichier distinct écrit par save()
+        with report.phase("target.load"):
+            workbook = load_workbook(file2_path)
+    except Exception:
+        logger.error(
+            "Erreur lors de l'ouverture du fichier cible : %s",
+            file2_path,
+            exc_info=True,
+        )
+        return False
 
-            key = (implantation, nom, prenom)
-            rvb_color = data_colors.get(key)
+    try:
+        reporter.check()
+
+        # Même logique : trouver les colonnes Implantation/Nom/Prénom dans le fichier 2
+        with report.phase("target.header"):
+            sheets = select_target_sheets(
+                file2_sheet,
+                workbook.sheetnames,
+                lambda name: next(
+                    workbook[name].iter_rows(min_row=1, max_row=1, values_only=True),
+                    (),
+                ),
+            )
+        if sheets is None:
+            return False
+
+        fill_styles = _FillStyleCache(workbook)
+        if callable(data_colors):
+            data_colors = data_colors()
 
-            if rvb_color:
-                fill = PatternFill(
-                    start_color=f"{rvb_color[0]:02X}{rvb_color[1]:02X}{rvb_color[2]:02X}",
-                    end_color=f"{rvb_color[0]:02X}{rvb_color[1]:02X}{rvb_color[2]:02X}",
-                    fill_type="solid",
+        rows_matched = 0
+        target_rows = 0
+        with report.phase("target.paint"):
+            for sheet_name, col_indices in sheets.items():
+                sheet = workbook[sheet_name]
+                rows_matched += _paint_sheet_openpyxl(
+                    sheet,
+                    col_indices,
+                    data_colors,
+                    fill_styles,
+                    paint_mode,
+                    column_range,
+                    reporter,
                 )
-                # Appliquer la couleur sur toute la ligne
-                for cell in row:
-                    cell.fill = fill
+                target_rows += max(sheet.max_row - 1, 0)
 
-        workbook.save(temp_file)
-        logger.info("Couleurs appliquées avec succès au fichier temporaire : %s", temp_file)
-        return str(temp_file)
+        report.count(COUNT_TARGET_ROWS, target_rows)
+        report.count(COUNT_ROWS_MATCHED, rows_matched)
+        report.count(COUNT_CELLS_PAINTED, fill_styles.cells_painted)
+        report.count(COUNT_ROWS_STYLED, fill_styles.rows_styled)
+        logger.info(
+            "%d couleurs distinctes appliquées sur %d cellules et %d lignes "
+            "de %d feuille(s)",
+            fill_styles.distinct_colors,
+            fill_styles.cells_painted,
+            fill_styles.rows_styled,
+            len(sheets),
+        )
+        reporter.start(PHASE_SAVE)
+        with report.phase("target.save"):
+            workbook.save(output_path)
+        return True
+    except ProcessingCancelled:
+        raise
     except Exception:
         logger.error(
             "Erreur lors de l'application des couleurs au fichier cible", exc_info=True
         )
-        return None
+        return False
     finally:
         workbook.close()
+
+
+def apply_color_map(
+    data_colors,
+    file2_path: str,
+    file2_sheet: str | list[str],
+    output_path: str | None = None,
+    writer: str = WRITER_OPENPYXL,
+    paint_mode: str = PAINT_CELLS,
+    column_range: tuple[int, int] | None = None,
+    progress: ProgressCallback | None = None,
+    cancel_token: CancelToken | None = None,
+    report: RunReport | None = None,
+    normalization: Normalization | None = None,
+    fuzzy: bool = False,
+    fuzzy_threshold: float = DEFAULT_FUZZY_THRESHOLD,
+    parallel_sheets: bool | None = None,
+    manifest=None,
+) -> str | None:
+    """
+    Apply an already extracted color map to a copy of the target file.
+
+    Args:
+        data_colors: Mapping (implantation, nom, prenom) -> RGB tuple, as
+            returned by get_implantation_colors, or a callable returning it.
+            A callable is called once, after the target is loaded, so that
+            the map can be produced concurrently with the target load.
+        file2_path: Path to the target Excel file (to apply colors to), or a
+            seekable binary file-like object holding it
+        file2_sheet: Sheet name in target file, a list of sheet names, or
+            ALL_SHEETS for every sheet whose header has the key columns.
+            The target is loaded and saved once for all the sheets.
+        output_path: Path of the colored copy, or a writable binary
+            file-like object; defaults to a new scratch directory of the
+            system temporary directory (see release_output). A path is
+            written under a temporary name and renamed once complete.
+        writer: WRITER_OPENPYXL (load and save the whole workbook) or
+            WRITER_XML (stream the target archive and patch only the styles
+            and the recoloured sheet; other parts are copied unchanged)
+        paint_mode: PAINT_CELLS colours every cell of a matched row up to the
+            last used column; PAINT_ROW sets a row-level style and colours only
+            the cells that exist (value or style), so cost and output size
+            scale with populated data rather than sheet width
+        column_range: Optional (first, last) 1-based inclusive column range;
+            only cells in this range are coloured
+        progress: Optional callback (phase, rows processed, total rows or
+            None), called every few hundred rows
+        cancel_token: Optional CancelToken checked between phases and while
+            scanning rows
+        report: Optional RunReport receiving the timing and memory of each
+            phase and the row and cell counters
+        normalization: Also match rows whose keys are equal after this
+            normalisation (see matching.Normalization); None for exact
+            matching only
+        fuzzy: Also match the remaining rows to the most similar source
+            name of the same implantation (see matching.KeyMatcher)
+        fuzzy_threshold: Minimum name similarity (0 to 1) of a fuzzy match
+        parallel_sheets: With WRITER_XML and several sheets, patch each sheet
+            in a separate process (True), all in this process (False), or
+            automatically when several CPUs are available and the target is
+            large (None)
+        manifest: With WRITER_XML, optional incremental.RunManifest recording
+            the key, row and colour of every target row and the cell formats
+            added, so that a later incremental run patches only the rows whose
+            colour changed (see apply_colors_to_file2)
+
+    Returns:
+        Path to the new colored file (the buffer itself when output_path is
+        a buffer) or None if error
+
+    Raises:
+        ProcessingCancelled: If the run was cancelled through cancel_token;
+            the workbook is closed and no output file is left behind
+    """
+    if writer not in (WRITER_OPENPYXL, WRITER_XML):
+        logger.error("Mode d'écriture inconnu : %s", writer)
+        return None
+
+    if paint_mode not in (PAINT_CELLS, PAINT_ROW):
+        logger.error("Mode de coloration inconnu : %s", paint_mode)
+        return None
+
+    if column_range is not None and not 1 <= column_range[0] <= column_range[1]:
+        logger.error("Plage de colonnes invalide : %s", column_range)
+        return None
+
+    if is_buffer(file2_path):
+        destination = output_path or scratch_output_path(DEFAULT_OUTPUT_NAME)
+    else:
+        if not os.path.exists(file2_path):
+            logger.error("Fichier cible introuvable : %s", file2_path)
+            return None
+        # Un dossier de travail propre à chaque exécution : deux traitements
+        # de cibles du même nom ne partagent jamais de fichier
+        destination = output_path or scratch_output_path(Path(file2_path).name)
+
+    report = report or NULL_REPORT
+    matcher = None
+    if normalization is not None or fuzzy:
+        source_colors = data_colors
+
+        def data_colors():
+            # Les niveaux normalisé et approché sont consultés après l'exact
+            nonlocal matcher
+            colors = source_colors() if callable(source_colors) else source_colors
+            matcher = KeyMatcher(colors, normalization, fuzzy, fuzzy_threshold)
+            return matcher
+
+    reporter = ProgressReporter(progress, cancel_token)
+    output = AtomicOutput(destination)
+    try:
+        if writer == WRITER_XML:
+            written = _apply_colors_xml(
+                data_colors,
+                file2_path,
+                file2_sheet,
+                output.target,
+                row_style=paint_mode == PAINT_ROW,
+                column_range=column_range,
+                reporter=reporter,
+                report=report,
+                parallel_sheets=parallel_sheets,
+                manifest=manifest,
+            )
+        else:
+            written = _apply_colors_openpyxl(
+                data_colors,
+                file2_path,
+                file2_sheet,
+                output.target,
+                paint_mode=paint_mode,
+                column_range=column_range,
+                reporter=reporter,
+                report=report,
+            )
+        if not written:
+            return None
+        result = output.commit()
+        if matcher is not None:
+            matcher.record(report)
+    except ProcessingCancelled:
+        logger.info("Application des couleurs annulée : %s", file2_path)
+        raise
+    finally:
+        output.discard()
+        if output_path is None and not output.committed:
+            release_output(destination)
+
+    logger.info("Couleurs appliquées avec succès au fichier : %s", result)
+    return result
+
+
+def apply_color_map_to_bytes(data_colors, target, file2_sheet, **options):
+    """
+    Apply a color map to a workbook held in memory.
+
+    Args:
+        data_colors: Mapping (implantation, nom, prenom) -> RGB tuple, or a
+            callable returning it (see apply_color_map)
+        target: Content of the target workbook, as bytes or a readable binary
+            file-like object
+        file2_sheet: Sheet name, list of sheet names or ALL_SHEETS
+        **options: Other keyword arguments of apply_color_map (writer,
+            paint_mode, column_range, progress, cancel_token, report)
+
+    Returns:
+        Content of the colored workbook as bytes, or None if error
+
+    Raises:
+        ProcessingCancelled: If the run was cancelled through cancel_token
+    """
+    if isinstance(target, (bytes, bytearray, memoryview)):
+        target = io.BytesIO(target)
+    buffer = io.BytesIO()
+    result = apply_color_map(
+        data_colors, target, file2_sheet, output_path=buffer, **options
+    )
+    if result is None:
+        return None
+    return buffer.getvalue()
+
+
+def apply_colors_to_file2(
+    file1_path: str,
+    file1_sheet: str,
+    file2_path: str,
+    file2_sheet: str | list[str],
+    writer: str = WRITER_OPENPYXL,
+    use_cache: bool = True,
+    paint_mode: str = PAINT_CELLS,
+    column_range: tuple[int, int] | None = None,
+    progress: ProgressCallback | None = None,
+    cancel_token: CancelToken | None = None,
+    report: RunReport | None = None,
+    parallel: bool | None = None,
+    output_path: str | None = None,
+    normalization: Normalization | None = None,
+    fuzzy: bool = False,
+    fuzzy_threshold: float = DEFAULT_FUZZY_THRESHOLD,
+    parallel_sheets: bool | None = None,
+    incremental: bool = False,
+    use_result_cache: bool = False,
+) -> str | None:
+    """
+    Apply colors from source file to a copy of target file by Implantation, Nom, Prénom.
+
+    Args:
+        file1_path: Path to the source Excel file (with colors)
+        file1_sheet: Sheet name in source file
+        file2_path: Path to the target Excel file (to apply colors to)
+        file2_sheet: Sheet name, list of sheet names or ALL_SHEETS, see
+            apply_color_map
+        writer: WRITER_OPENPYXL or WRITER_XML, see apply_color_map
+        use_cache: Reuse the cached color map of an unchanged source sheet
+            instead of parsing the source again
+        paint_mode: PAINT_CELLS or PAINT_ROW, see apply_color_map
+        column_range: Optional column range to colour, see apply_color_map
+        progress: Optional callback (phase, rows processed, total rows or
+            None) covering both the source and the target phases
+        cancel_token: Optional CancelToken stopping the run between rows
+        report: Optional RunReport covering the source and target phases.
+            When omitted and $COLOREXCEL_REPORT_FILE is set, a report is
+            created and appended to that file as one JSON line.
+        parallel: Extract the source colours in a separate process while the
+            target is loaded (True), sequentially (False), or automatically
+            for large files whose source map is not cached (None)
+        output_path: Path of the colored copy, see apply_color_map
+        normalization: Key normalisation tier, see apply_color_map
+        fuzzy: Enable the fuzzy matching tier, see apply_color_map
+        fuzzy_threshold: Minimum similarity of a fuzzy match
+        parallel_sheets: Patch the sheets in separate processes, see
+            apply_color_map
+        incremental: With an output_path, keep a manifest of the run next
+            to the copy and, on the next run, restyle only the rows of that
+            copy whose colour changed (see incremental); the source is then
+            read with ENGINE_XML and the copy written with WRITER_XML
+        use_result_cache: Return a copy of the coloured workbook stored by a
+            previous run with the same source and target content, sheets and
+            options, and store the result of this run (see results). Off by
+            default: the caller opts in, as the CLI, the GUI and the job
+            service do. Ignored in incremental mode and for a buffer
+            output_path.
+
+    Returns:
+        Path to the new colored file or None if error
+
+    Raises:
+        ProcessingCancelled: If the run was cancelled through cancel_token
+    """
+    if not os.path.exists(file2_path):
+        logger.error("Fichier cible introuvable : %s", file2_path)
+        return None
+
+    own_report = report is None and bool(os.environ.get(REPORT_FILE_ENV))
+    if own_report:
+        report = RunReport(label=os.path.basename(file2_path))
+
+    if incremental and output_path is None:
+        logger.warning("Mode incrémental ignoré : aucun fichier de sortie indiqué")
+        incremental = False
+    if incremental:
+        from .incremental import apply_color_map_incremental, source_checksum
+
+        try:
+            return apply_color_map_incremental(
+                lambda: get_implantation_colors(
+                    file1_path,
+                    file1_sheet,
+                    engine=ENGINE_XML,
+                    use_cache=use_cache,
+                    progress=progress,
+                    cancel_token=cancel_token,
+                    report=report,
+                ),
+                file2_path,
+                file2_sheet,
+                output_path,
+                source=source_checksum(file1_path, file1_sheet),
+                paint_mode=paint_mode,
+                column_range=column_range,
+                progress=progress,
+                cancel_token=cancel_token,
+                report=report,
+                normalization=normalization,
+                fuzzy=fuzzy,
+                fuzzy_threshold=fuzzy_threshold,
+            )
+        finally:
+            if own_report:
+                report.close()
+
+    def run_key():
+        return result_key(
+            sources_digest([(file1_path, file1_sheet)]),
+            file2_path,
+            file2_sheet,
+            writer=writer,
+            paint_mode=paint_mode,
+            column_range=column_range,
+            normalization=normalization,
+            fuzzy=fuzzy,
+            fuzzy_threshold=fuzzy_threshold,
+        )
+
+    key = None
+    if use_result_cache and not is_buffer(output_path):
+        with (report or NULL_REPORT).phase("result.lookup"):
+            key = run_key()
+            cached = default_result_cache().get(key, output_path, Path(file2_path).name)
+        if cached is not None:
+            if own_report:
+                report.close()
+            return cached
+
+    if parallel is None:
+        parallel = should_extract_in_parallel(
+            file1_path, file1_sheet, file2_path, use_cache
+        )
+
+    extraction = None
+    try:
+        if parallel:
+            if not os.path.exists(file1_path):
+                logger.error("Fichier source introuvable : %s", file1_path)
+                return None
+            extraction = SourceExtraction(file1_path, file1_sheet, use_cache)
+            phase_report = report or NULL_REPORT
+
+            def data_colors():
+                # Attente du processus d'extraction, une fois la cible chargée
+                with phase_report.phase("source.wait"):
+                    colors = extraction.result(cancel_token)
+                phase_report.count(COUNT_SOURCE_COLORS, len(colors))
+                return colors
+
+        else:
+            data_colors = get_implantation_colors(
+                file1_path,
+                file1_sheet,
+                use_cache=use_cache,
+                progress=progress,
+                cancel_token=cancel_token,
+                report=report,
+            )
+        result = apply_color_map(
+            data_colors,
+            file2_path,
+            file2_sheet,
+            output_path=output_path,
+            writer=writer,
+            paint_mode=paint_mode,
+            column_range=column_range,
+            progress=progress,
+            cancel_token=cancel_token,
+            report=report,
+            normalization=normalization,
+            fuzzy=fuzzy,
+            fuzzy_threshold=fuzzy_threshold,
+            parallel_sheets=parallel_sheets,
+        )
+        if result is not None and key is not None:
+            with (report or NULL_REPORT).phase("result.store"):
+                # Fichiers modifiés pendant le traitement : résultat non conservé
+                if run_key() == key:
+                    default_result_cache().put(key, result)
+        return result
+    finally:
+        if extraction is not None:
+            extraction.close()
+        if own_report:
+            report.close()
@@ -0,0 +1,377 @@
+"""
+Matching of target keys against the source colour map.
+
+Keys are (implantation, nom, prenom) tuples read from the cells. By default a
+target row only matches a source row with exactly the same values. KeyMatcher
+adds two optional tiers for the rows that miss:
+
+* normalised: both keys compared after Unicode NFC, whitespace trimming and
+  collapsing, case folding and optionally accent folding (``Normalization``);
+* fuzzy: the closest source key with the same implantation whose name is
+  similar enough (difflib ratio), looked up through a blocking index. A
+  source row is filed under two block keys: the Soundex code of the surname,
+  and the Soundex code of the first name plus the surname code without its
+  first letter (so a typo in the first letter of the surname still lands in
+  a shared block). Only the source rows of the two blocks of a target row
+  are compared, never the whole source, and blocks larger than
+  MAX_BLOCK_SIZE are skipped.
+
+Each tier is built on first use, so a run where every row matches exactly
+costs nothing more than a plain lookup. The normalised tier keeps its index
+in a ColorMap; the fuzzy tier keeps the folded names of the source in memory.
+"""
+
+import logging
+import unicodedata
+from array import array
+from difflib import SequenceMatcher
+from typing import NamedTuple
+
+from .colormap import ColorMap
+from .instrumentation import (
+    COUNT_MATCHED_EXACT,
+    COUNT_MATCHED_FUZZY,
+    COUNT_MATCHED_NORMALIZED,
+)
+
+logger = logging.getLogger(__name__)
+
+# Niveaux d'appariement, du plus strict au plus tolérant
+MATCH_EXACT = "exact"
+MATCH_NORMALIZED = "normalized"
+MATCH_FUZZY = "fuzzy"
+
+# Similarité minimale (0 à 1) des noms pour un appariement approché
+DEFAULT_FUZZY_THRESHOLD = 0.85
+
+# Taille maximale d'un bloc comparé : au-delà, la clé de blocage est trop peu
+# discriminante (nom très courant) et le bloc est ignoré
+MAX_BLOCK_SIZE = 500
+
+# Codes Soundex des consonnes ; les voyelles séparent deux codes identiques
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+
+class Normalization(NamedTuple):
+    """
+    Text normalisation applied to key values before comparing them.
+
+    Attributes:
+        nfc: Compose Unicode characters (NFC), so that 'é' typed as 'e' plus a
+            combining accent equals the precomposed 'é'
+        strip: Remove leading and trailing whitespace and collapse inner runs
+            of whitespace to a single space
+        casefold: Ignore case (str.casefold)
+        fold_accents: Remove accents and other diacritics ('é' -> 'e')
+    """
+
+    nfc: bool = True
+    strip: bool = True
+    casefold: bool = True
+    fold_accents: bool = False
+
+
+# Préréglages proposés par la ligne de commande
+NORMALIZATIONS = {
+    MATCH_EXACT: None,
+    "standard": Normalization(),
+    "accents": Normalization(fold_accents=True),
+}
+
+# Normalisation utilisée par le niveau approché
+_FUZZY_NORMALIZATION = Normalization(fold_accents=True)
+
+
+def normalize_value(value, normalization: Normalization):
+    """
+    Normalise one key value.
+
+    Args:
+        value: Cell value; values other than strings are returned unchanged
+        normalization: Normalisation options
+
+    Returns:
+        Normalised value
+    """
+    if not isinstance(value, str):
+        return value
+    if normalization.fold_accents:
+        value = "".join(
+            char
+            for char in unicodedata.normalize("NFKD", value)
+            if not unicodedata.combining(char)
+        )
+    elif normalization.nfc:
+        value = unicodedata.normalize("NFC", value)
+    if normalization.strip:
+        value = " ".join(value.split())
+    if normalization.casefold:
+        value = value.casefold()
+    return value
+
+
+def normalize_key(key: tuple, normalization: Normalization) -> tuple:
+    """
+    Normalise every value of a key.
+
+    Args:
+        key: Tuple (implantation, nom, prenom)
+        normalization: Normalisation options
+
+    Returns:
+        Normalised tuple
+    """
+    return tuple(normalize_value(value, normalization) for value in key)
+
+
+def soundex(text: str) -> str:
+    """
+    Return the Soundex code of a word (letter followed by three digits).
+
+    Args:
+        text: Accent-folded, lowercase text
+
+    Returns:
+        Soundex code, or an empty string if the text has no ASCII letter
+    """
+    letters = [char for char in text if "a" <= char <= "z"]
+    if not letters:
+        return ""
+    code = letters[0].upper()
+    previous = _SOUNDEX_CODES.get(letters[0], "")
+    for letter in letters[1:]:
+        digit = _SOUNDEX_CODES.get(letter, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # h et w ne séparent pas deux consonnes de même code
+        if letter not in "hw":
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def _name_label(nom, prenom) -> str:
+    return f"{nom} {prenom}"
+
+
+def _block_keys(implantation, nom: str, prenom: str) -> tuple[tuple, tuple]:
+    """Blocking keys of a folded (implantation, nom, prenom) key."""
+    nom_code = soundex(nom)
+    return (
+        (implantation, nom_code),
+        (implantation, soundex(prenom), nom_code[1:]),
+    )
+
+
+class KeyMatcher:
+    """
+    Look up target keys in a colour map, tier by tier.
+
+    KeyMatcher has the ``get`` method of a mapping, so it can be passed to
+    the writers wherever a colour map is expected.
+
+    Args:
+        data_colors: Mapping (implantation, nom, prenom) -> RGB tuple
+        normalization: Normalisation of the second tier, or None to skip it
+        fuzzy: Enable the fuzzy tier for the keys still unmatched
+        fuzzy_threshold: Minimum difflib similarity of 'nom prenom' for a
+            fuzzy match
+
+    Attributes:
+        counts: Number of lookups matched at each tier (MATCH_* keys)
+    """
+
+    def __init__(
+        self,
+        data_colors,
+        normalization: Normalization | None = None,
+        fuzzy: bool = False,
+        fuzzy_threshold: float = DEFAULT_FUZZY_THRESHOLD,
+    ):
+        self.data_colors = data_colors
+        self.normalization = normalization
+        self.fuzzy = fuzzy
+        self.fuzzy_threshold = fuzzy_threshold
+        self.counts = {MATCH_EXACT: 0, MATCH_NORMALIZED: 0, MATCH_FUZZY: 0}
+        self._normalized: ColorMap | None = None
+        self._ambiguous: set = set()
+        self._fuzzy_entries: list | None = None
+        self._blocks: dict = {}
+
+    def get(self, key, default=None):
+        """
+        Return the colour of a target key, trying each enabled tier in turn.
+
+        Args:
+            key: Tuple (implantation, nom, prenom) read from the target
+            default: Value returned when no tier matches
+
+        Returns:
+            RGB tuple, or default
+        """
+        tier, rvb_color, _ = self.match(key)
+        return default if tier is None else rvb_color
+
+    def match(self, key) -> tuple:
+        """
+        Match a target key and tell which tier and source key it matched.
+
+        Args:
+            key: Tuple (implantation, nom, prenom) read from the target
+
+        Returns:
+            Tuple (tier, RGB tuple, source reference), or (None, None, None)
+            if no tier matches. The reference is the source key itself for an
+            exact match, the normalised key for a normalised match and the
+            accent-folded key for a fuzzy match.
+        """
+        rvb_color = self.data_colors.get(key)
+        if rvb_color is not None:
+            self.counts[MATCH_EXACT] += 1
+            return MATCH_EXACT, rvb_color, key
+        if self.normalization is not None:
+            normalized = normalize_key(key, self.normalization)
+            rvb_color = self._normalized_color(normalized)
+            if rvb_color is not None:
+                self.counts[MATCH_NORMALIZED] += 1
+                return MATCH_NORMALIZED, rvb_color, normalized
+        if self.fuzzy:
+            rvb_color, folded = self._fuzzy_match(key)
+            if rvb_color is not None:
+                self.counts[MATCH_FUZZY] += 1
+                return MATCH_FUZZY, rvb_color, folded
+        return None, None, None
+
+    def references(self, key) -> dict:
+        """
+        Return the references under which match() reports a source key.
+
+        Args:
+            key: Source key (implantation, nom, prenom)
+
+        Returns:
+            Dictionary tier -> reference, for the enabled tiers
+        """
+        references = {MATCH_EXACT: key}
+        if self.normalization is not None:
+            references[MATCH_NORMALIZED] = normalize_key(key, self.normalization)
+        if self.fuzzy:
+            references[MATCH_FUZZY] = normalize_key(key, _FUZZY_NORMALIZATION)
+        return references
+
+    def _build_normalized(self) -> None:
+        """Index the source by normalised key, without the ambiguous keys."""
+        normalization = self.normalization
+        index = ColorMap()
+        for key, rvb_color in self.data_colors.items():
+            index[normalize_key(key, normalization)] = rvb_color
+        # Deuxième passage : une clé normalisée partagée par des lignes source
+        # de couleurs différentes est ambiguë
+        for key, rvb_color in self.data_colors.items():
+            normalized = normalize_key(key, normalization)
+            if index[normalized] != rvb_color:
+                self._ambiguous.add(normalized)
+        for normalized in self._ambiguous:
+            del index[normalized]
+        if self._ambiguous:
+            logger.warning(
+                "%d clés source ambiguës après normalisation (couleurs "
+                "différentes) : ignorées au niveau normalisé",
+                len(self._ambiguous),
+            )
+        self._normalized = index
+
+    def _normalized_color(self, normalized):
+        if self._normalized is None:
+            self._build_normalized()
+        return self._normalized.get(normalized)
+
+    def _build_fuzzy(self) -> None:
+        """Build the blocking index: (implantation, Soundex) -> source entries."""
+        entries = []
+        blocks: dict[tuple, array] = {}
+        by_key = {}
+        for key, rvb_color in self.data_colors.items():
+            implantation, nom, prenom = normalize_key(key, _FUZZY_NORMALIZATION)
+            if not isinstance(nom, str) or not isinstance(prenom, str):
+                continue
+            folded = (implantation, nom, prenom)
+            entry_id = by_key.get(folded)
+            if entry_id is not None:
+                # Même clé repliée, autre couleur : ambiguë
+                label, known_color, _ = entries[entry_id]
+                if known_color != rvb_color:
+                    entries[entry_id] = (label, None, folded)
+                continue
+            entry_id = by_key[folded] = len(entries)
+            entries.append((_name_label(nom, prenom), rvb_color, folded))
+            for block_key in _block_keys(implantation, nom, prenom):
+                blocks.setdefault(block_key, array("I")).append(entry_id)
+        self._fuzzy_entries = entries
+        self._blocks = blocks
+        logger.info(
+            "Index approché : %d entrées source, %d blocs", len(entries), len(blocks)
+        )
+
+    def _fuzzy_match(self, key) -> tuple:
+        """Closest source entry of a key: (colour, folded source key) or Nones."""
+        if self._fuzzy_entries is None:
+            self._build_fuzzy()
+        implantation, nom, prenom = normalize_key(key, _FUZZY_NORMALIZATION)
+        if not isinstance(nom, str) or not isinstance(prenom, str):
+            return None, None
+        candidates = set()
+        for block_key in _block_keys(implantation, nom, prenom):
+            block = self._blocks.get(block_key, ())
+            if len(block) <= MAX_BLOCK_SIZE:
+                candidates.update(block)
+        if not candidates:
+            return None, None
+
+        matcher = SequenceMatcher(autojunk=False)
+        matcher.set_seq2(_name_label(nom, prenom))
+        threshold = self.fuzzy_threshold
+        best_ratio, best_colors, best_key = 0.0, set(), None
+        for entry_id in candidates:
+            label, rvb_color, folded = self._fuzzy_entries[entry_id]
+            matcher.set_seq1(label)
+            if matcher.real_quick_ratio() < threshold:
+                continue
+            if matcher.quick_ratio() < threshold:
+                continue
+            ratio = matcher.ratio()
+            if ratio < threshold or ratio < best_ratio:
+                continue
+            if ratio > best_ratio:
+                best_ratio, best_colors = ratio, set()
+            best_colors.add(rvb_color)
+            best_key = folded
+        # Meilleurs candidats de couleurs différentes (ou clé ambiguë) : aucun
+        if len(best_colors) != 1 or None in best_colors:
+            return None, None
+        return next(iter(best_colors)), best_key
+
+    def record(self, report) -> None:
+        """
+        Add the per-tier counts to a run report and log them.
+
+        Args:
+            report: RunReport (or NULL_REPORT)
+        """
+        report.count(COUNT_MATCHED_EXACT, self.counts[MATCH_EXACT])
+        report.count(COUNT_MATCHED_NORMALIZED, self.counts[MATCH_NORMALIZED])
+        report.count(COUNT_MATCHED_FUZZY, self.counts[MATCH_FUZZY])
+        logger.info(
+            "Lignes appariées : %d exactes, %d normalisées, %d approchées",
+            self.counts[MATCH_EXACT],
+            self.counts[MATCH_NORMALIZED],
+            self.counts[MATCH_FUZZY],
+        )
@@ -0,0 +1,126 @@
+"""
+Output files of a run: unique scratch locations and atomic writes.
+
+Every run without an explicit destination gets its own scratch directory, so
+concurrent runs on targets with the same name never share a file. Files are
+written next to their destination under a temporary name and renamed into
+place only once complete, so a failed or cancelled run never leaves a
+truncated workbook behind.
+"""
+
+import os
+import secrets
+import shutil
+import tempfile
+from pathlib import Path
+
+# Préfixe des dossiers de travail créés pour les sorties par défaut
+SCRATCH_PREFIX = "colorexcel_"
+
+# Nom de sortie utilisé lorsque la cible est un tampon en mémoire
+DEFAULT_OUTPUT_NAME = "colorexcel.xlsx"
+
+
+def is_buffer(target) -> bool:
+    """Tell whether ``target`` is a binary file-like object rather than a path."""
+    return hasattr(target, "read") or hasattr(target, "write")
+
+
+def scratch_output_path(file_name: str) -> Path:
+    """
+    Return a fresh output path inside a new private scratch directory.
+
+    Args:
+        file_name: Name of the output file
+
+    Returns:
+        Path '<tmp>/colorexcel_XXXX/<file_name>' (the file does not exist yet)
+    """
+    return Path(tempfile.mkdtemp(prefix=SCRATCH_PREFIX)) / file_name
+
+
+def is_scratch_output(path) -> bool:
+    """
+    Tell whether ``path`` was created by scratch_output_path.
+
+    Args:
+        path: Output path
+
+    Returns:
+        True if the file lives in a scratch directory of the temp folder
+    """
+    parent = Path(path).parent
+    return parent.name.startswith(SCRATCH_PREFIX) and parent.parent == Path(
+        tempfile.gettempdir()
+    )
+
+
+def release_output(path) -> None:
+    """
+    Delete a scratch output file and its scratch directory.
+
+    Paths outside a scratch directory are left untouched.
+
+    Args:
+        path: Output path returned by a run, or None
+    """
+    if path is None or not is_scratch_output(path):
+        return
+    shutil.rmtree(Path(path).parent, ignore_errors=True)
+
+
+class AtomicOutput:
+    """
+    Write a file under a temporary name and rename it into place on commit.
+
+    The temporary file lives in the destination directory so that the final
+    os.replace is an atomic rename on the same file system. It is created by
+    the writer itself, so it gets the usual permissions of a new file.
+    Buffers are written directly.
+
+    Args:
+        destination: Final path, or a writable binary file-like object
+    """
+
+    def __init__(self, destination):
+        self.destination = destination
+        self._committed = False
+        if is_buffer(destination):
+            self.target = destination
+            return
+        destination = Path(destination)
+        self.target = str(
+            destination.with_name(f".{destination.stem}-{secrets.token_hex(8)}.tmp")
+        )
+
+    @property
+    def committed(self) -> bool:
+        """Whether commit() was called."""
+        return self._committed
+
+    def commit(self):
+        """
+        Move the written file to its destination.
+
+        Returns:
+            The destination path as a string, or the buffer
+
+        Raises:
+            OSError: If the file cannot be moved; the output stays
+                uncommitted, so that discard() removes the temporary file
+        """
+        if is_buffer(self.destination):
+            self._committed = True
+            return self.destination
+        os.replace(self.target, self.destination)
+        self._committed = True
+        return str(self.destination)
+
+    def discard(self) -> None:
+        """Remove the temporary file unless the output was committed."""
+        if self._committed or is_buffer(self.destination):
+            return
+        try:
+            os.remove(self.target)
+        except FileNotFoundError:
+            pass
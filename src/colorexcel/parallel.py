@@ -0,0 +1,421 @@
+"""
+Source colour extraction and sheet patching in separate processes.
+
+openpyxl is pure Python, so parsing the source and loading the target in two
+threads would still be serialised by the GIL. SourceExtraction runs
+get_implantation_colors in a child process while the caller loads the
+target, and ships the colour map back as the serialised bytes of its
+ColorMap instead of one pickled tuple per key.
+
+extract_sources_in_parallel extracts several source sheets in a pool of
+processes, each task returning its serialised ColorMap.
+
+patch_sheets_in_parallel patches several sheets of one target with the XML
+writer in a pool of processes; each process receives the serialised colour
+map once and writes its patched sheets to scratch files.
+"""
+
+import logging
+import multiprocessing
+import os
+from pathlib import Path
+
+from .cache import default_cache
+from .colormap import ColorMap
+from .matching import KeyMatcher
+from .output import is_buffer
+from .progress import CancelToken, ProcessingCancelled
+
+logger = logging.getLogger(__name__)
+
+# Taille minimale (octets) des deux fichiers pour extraire la source en parallèle :
+# en dessous, le démarrage d'un processus coûte plus qu'il ne rapporte
+PARALLEL_MIN_BYTES = 1024 * 1024
+
+# Intervalle de vérification de l'annulation pendant l'attente (secondes)
+POLL_INTERVAL = 0.1
+
+
+def pack_colors(data_colors) -> bytes:
+    """
+    Pack a colour map for transfer between processes.
+
+    Args:
+        data_colors: ColorMap or mapping key -> (R, G, B)
+
+    Returns:
+        Serialised ColorMap
+    """
+    if not isinstance(data_colors, ColorMap):
+        data_colors = ColorMap(data_colors)
+    return data_colors.to_bytes()
+
+
+def unpack_colors(packed: bytes) -> ColorMap:
+    """
+    Rebuild a colour map packed by pack_colors.
+
+    Args:
+        packed: Bytes returned by pack_colors
+
+    Returns:
+        ColorMap mapping key -> (R, G, B)
+    """
+    return ColorMap.from_bytes(packed)
+
+
+def available_cpus() -> int:
+    """Number of CPUs this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # Windows, macOS
+        return os.cpu_count() or 1
+
+
+def _extract_packed(conn, file_path: str, sheet_name: str, use_cache: bool) -> None:
+    """Child process entry point: extract, pack and send the colour map."""
+    from .logic import get_implantation_colors
+
+    try:
+        data_colors = get_implantation_colors(
+            file_path, sheet_name, use_cache=use_cache
+        )
+        conn.send(("ok", pack_colors(data_colors)))
+    except Exception as exc:
+        conn.send(("error", repr(exc)))
+    finally:
+        conn.close()
+
+
+def should_extract_in_parallel(
+    file1_path: str, file1_sheet: str, file2_path: str, use_cache: bool
+) -> bool:
+    """
+    Decide whether extracting the source in a separate process is worth it.
+
+    Args:
+        file1_path: Path to the source Excel file
+        file1_sheet: Sheet name in source file
+        file2_path: Path to the target Excel file
+        use_cache: Whether the colour map cache is used
+
+    Returns:
+        True if a second CPU is available, both files are large enough and
+        the source map is not cached
+    """
+    if available_cpus() < 2:
+        return False
+    # Les processus démoniques (pool de la commande batch) ne peuvent pas
+    # créer de processus enfants
+    if multiprocessing.current_process().daemon:
+        return False
+    try:
+        if min(os.path.getsize(file1_path), os.path.getsize(file2_path)) < (
+            PARALLEL_MIN_BYTES
+        ):
+            return False
+    except OSError:
+        return False
+    return not (use_cache and default_cache().contains(file1_path, file1_sheet))
+
+
+class SourceExtraction:
+    """
+    Extract the colour map of a source sheet in a child process.
+
+    The child starts immediately; result() waits for its colour map.
+
+    Args:
+        file_path: Path to the source Excel file
+        sheet_name: Name of the source sheet
+        use_cache: Use the persistent colour map cache in the child
+    """
+
+    def __init__(self, file_path: str, sheet_name: str, use_cache: bool = False):
+        context = multiprocessing.get_context("spawn")
+        self._conn, child_conn = context.Pipe(duplex=False)
+        self._process = context.Process(
+            target=_extract_packed,
+            args=(child_conn, file_path, sheet_name, use_cache),
+            daemon=True,
+        )
+        self._process.start()
+        child_conn.close()
+        logger.info(
+            "Extraction parallèle des couleurs source : %s [%s]", file_path, sheet_name
+        )
+
+    def result(self, cancel_token: CancelToken | None = None) -> ColorMap:
+        """
+        Wait for the colour map extracted by the child process.
+
+        Args:
+            cancel_token: Optional CancelToken checked while waiting
+
+        Returns:
+            Mapping (implantation, nom, prenom) -> (R, G, B)
+
+        Raises:
+            ProcessingCancelled: If cancellation was requested while waiting;
+                the child process is terminated
+            RuntimeError: If the child process failed
+        """
+        try:
+            while not self._conn.poll(POLL_INTERVAL):
+                if cancel_token is not None and cancel_token.cancelled:
+                    self.close()
+                    raise ProcessingCancelled()
+                if not self._process.is_alive() and not self._conn.poll():
+                    raise RuntimeError(
+                        "Le processus d'extraction des couleurs s'est arrêté "
+                        f"(code {self._process.exitcode})"
+                    )
+            status, payload = self._conn.recv()
+        except EOFError:
+            raise RuntimeError("Le processus d'extraction des couleurs s'est arrêté")
+        self._process.join()
+        if status != "ok":
+            raise RuntimeError(f"Échec de l'extraction des couleurs : {payload}")
+        return unpack_colors(payload)
+
+    def close(self) -> None:
+        """Terminate the child process if it is still running."""
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process.join()
+        self._conn.close()
+
+
+def _extract_source(
+    file_path: str, sheet_name: str, engine: str, use_cache: bool
+) -> bytes:
+    """Source pool task: extract one source sheet and pack its colour map."""
+    from .logic import get_implantation_colors
+
+    return pack_colors(
+        get_implantation_colors(
+            file_path, sheet_name, engine=engine, use_cache=use_cache
+        )
+    )
+
+
+def should_extract_sources_in_parallel(sources: list) -> bool:
+    """
+    Decide whether extracting several source sheets in a pool is worth it.
+
+    Args:
+        sources: (file path, sheet name) of the sources still to extract
+
+    Returns:
+        True if there are several sources, a second CPU is available and the
+        source files are large enough together
+    """
+    if len(sources) < 2 or available_cpus() < 2:
+        return False
+    if multiprocessing.current_process().daemon:
+        return False
+    try:
+        return sum(os.path.getsize(path) for path, _ in sources) >= (PARALLEL_MIN_BYTES)
+    except OSError:
+        return False
+
+
+def extract_sources_in_parallel(
+    sources: list,
+    engine: str,
+    use_cache: bool = False,
+    cancel_token: CancelToken | None = None,
+    on_extracted=None,
+) -> list[ColorMap]:
+    """
+    Extract the colour maps of several source sheets, one task per source.
+
+    Args:
+        sources: (file path, sheet name) of each source
+        engine: Extraction engine, see logic.get_implantation_colors
+        use_cache: Store the extracted maps in the colour map cache
+        cancel_token: Optional CancelToken checked while waiting
+        on_extracted: Optional callable receiving the number of sources
+            extracted so far
+
+    Returns:
+        ColorMap of each source, in the order of sources; empty for a source
+        that could not be read
+
+    Raises:
+        ProcessingCancelled: If cancellation was requested; the pool is
+            terminated
+    """
+    context = multiprocessing.get_context("spawn")
+    processes = min(len(sources), available_cpus())
+    logger.info("Extraction de %d sources dans %d processus", len(sources), processes)
+    pool = context.Pool(processes)
+    try:
+        tasks = [
+            pool.apply_async(
+                _extract_source, (file_path, sheet_name, engine, use_cache)
+            )
+            for file_path, sheet_name in sources
+        ]
+        color_maps = []
+        for task in tasks:
+            while not task.ready():
+                if cancel_token is not None and cancel_token.cancelled:
+                    raise ProcessingCancelled()
+                task.wait(POLL_INTERVAL)
+            color_maps.append(unpack_colors(task.get()))
+            if on_extracted is not None:
+                on_extracted(len(color_maps))
+        pool.close()
+        return color_maps
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+# Correspondance utilisée par les processus de coloration des feuilles
+# (voir _init_sheet_worker)
+_sheet_worker_colors = None
+
+
+def _init_sheet_worker(packed: bytes, matching: tuple | None) -> None:
+    """Sheet pool initializer: unpack the colour map once per process."""
+    global _sheet_worker_colors
+    data_colors = unpack_colors(packed)
+    _sheet_worker_colors = (
+        KeyMatcher(data_colors, *matching) if matching is not None else data_colors
+    )
+
+
+def _patch_sheet(
+    file_path: str,
+    sheet_name: str,
+    key_columns: tuple,
+    target_path: str,
+    row_style: bool,
+    column_range: tuple[int, int] | None,
+):
+    """Sheet pool task: patch one sheet, return it with the tier counts."""
+    from .logic import key_row_color
+    from .xlsx_patch import patch_sheet_to_file
+
+    lookup = _sheet_worker_colors
+    counts_before = dict(lookup.counts) if isinstance(lookup, KeyMatcher) else None
+    patched = patch_sheet_to_file(
+        file_path,
+        sheet_name,
+        key_row_color(lookup, key_columns),
+        target_path,
+        row_style=row_style,
+        column_range=column_range,
+    )
+    counts = None
+    if counts_before is not None:
+        counts = {
+            tier: count - counts_before[tier] for tier, count in lookup.counts.items()
+        }
+    return patched, counts
+
+
+def should_patch_in_parallel(file_path: str, sheet_count: int) -> bool:
+    """
+    Decide whether patching the sheets of a target in several processes is worth it.
+
+    Args:
+        file_path: Path to the target Excel file
+        sheet_count: Number of sheets to recolour
+
+    Returns:
+        True if there are several sheets, a second CPU is available and the
+        target is large enough
+    """
+    if sheet_count < 2 or available_cpus() < 2:
+        return False
+    if multiprocessing.current_process().daemon:
+        return False
+    try:
+        return os.path.getsize(file_path) >= PARALLEL_MIN_BYTES
+    except OSError:
+        return False
+
+
+def patch_sheets_in_parallel(
+    file_path: str,
+    sheets: dict[str, tuple],
+    data_colors,
+    scratch_dir: str,
+    row_style: bool = False,
+    column_range: tuple[int, int] | None = None,
+    cancel_token: CancelToken | None = None,
+) -> dict:
+    """
+    Patch several sheets of a target with the XML writer, one task per sheet.
+
+    Args:
+        file_path: Path to the target Excel file
+        sheets: Key column indices (implantation, nom, prenom) of each sheet
+        data_colors: ColorMap, mapping or KeyMatcher giving the row colours;
+            the tier counts of a KeyMatcher are updated with the counts of
+            the child processes
+        scratch_dir: Directory receiving the patched sheet files
+        row_style: See xlsx_patch.write_colored_copy
+        column_range: See xlsx_patch.write_colored_copy
+        cancel_token: Optional CancelToken checked while waiting
+
+    Returns:
+        Dict {sheet name: PatchedSheet} for xlsx_patch.write_colored_sheets
+
+    Raises:
+        ValueError: If file_path is a buffer, which the child processes cannot
+            reopen
+        ProcessingCancelled: If cancellation was requested; the pool is
+            terminated
+    """
+    if is_buffer(file_path):
+        raise ValueError("Feuilles en parallèle : la cible doit être un chemin")
+    matching = None
+    matcher = None
+    if isinstance(data_colors, KeyMatcher):
+        matcher = data_colors
+        matching = (matcher.normalization, matcher.fuzzy, matcher.fuzzy_threshold)
+        data_colors = matcher.data_colors
+
+    context = multiprocessing.get_context("spawn")
+    processes = min(len(sheets), available_cpus())
+    logger.info("Coloration de %d feuilles dans %d processus", len(sheets), processes)
+    pool = context.Pool(
+        processes,
+        initializer=_init_sheet_worker,
+        initargs=(pack_colors(data_colors), matching),
+    )
+    try:
+        tasks = {
+            sheet_name: pool.apply_async(
+                _patch_sheet,
+                (
+                    file_path,
+                    sheet_name,
+                    key_columns,
+                    str(Path(scratch_dir) / f"sheet{index}.xml"),
+                    row_style,
+                    column_range,
+                ),
+            )
+            for index, (sheet_name, key_columns) in enumerate(sheets.items())
+        }
+        patched = {}
+        for sheet_name, task in tasks.items():
+            while not task.ready():
+                if cancel_token is not None and cancel_token.cancelled:
+                    raise ProcessingCancelled()
+                task.wait(POLL_INTERVAL)
+            patched[sheet_name], counts = task.get()
+            if matcher is not None:
+                for tier, count in counts.items():
+                    matcher.counts[tier] += count
+        pool.close()
+        return patched
+    finally:
+        # Sans effet sur un pool déjà fermé dont les tâches sont terminées
+        pool.terminate()
+        pool.join()
@@ -0,0 +1,130 @@
+"""
+Progress reporting and cancellation for long-running operations.
+
+The logic functions accept an optional progress callback and an optional
+CancelToken. Both are driven through a ProgressReporter, which throttles the
+callback and the cancellation check to one every few hundred rows so the row
+loops stay cheap.
+"""
+
+import threading
+from typing import Callable
+
+# Phases signalées au rappel de progression
+PHASE_SOURCE = "source"
+# Extraction parallèle de plusieurs sources : avancement compté en sources
+PHASE_SOURCES = "sources"
+PHASE_LOAD = "load"
+PHASE_TARGET = "target"
+PHASE_SAVE = "save"
+
+# Nombre de lignes entre deux notifications de progression
+DEFAULT_INTERVAL = 500
+
+# Signature : (phase, lignes traitées, total de lignes ou None si inconnu)
+ProgressCallback = Callable[[str, int, "int | None"], None]
+
+
+class ProcessingCancelled(Exception):
+    """Raised when an operation is stopped through its CancelToken."""
+
+
+class CancelToken:
+    """Thread-safe flag used to ask a running operation to stop."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        """Request cancellation."""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """True once cancel() has been called."""
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        """
+        Raise ProcessingCancelled if cancellation was requested.
+
+        Raises:
+            ProcessingCancelled: If cancel() has been called
+        """
+        if self._event.is_set():
+            raise ProcessingCancelled()
+
+
+class ProgressReporter:
+    """
+    Throttled bridge between a row loop and a progress callback / CancelToken.
+
+    Args:
+        callback: Optional progress callback
+        cancel_token: Optional CancelToken checked on every notification
+        interval: Number of rows between two notifications
+    """
+
+    __slots__ = ("callback", "cancel_token", "interval", "phase", "total", "_next")
+
+    def __init__(
+        self,
+        callback: ProgressCallback | None = None,
+        cancel_token: CancelToken | None = None,
+        interval: int = DEFAULT_INTERVAL,
+    ):
+        self.callback = callback
+        self.cancel_token = cancel_token
+        self.interval = interval
+        self.phase = None
+        self.total = None
+        self._next = interval
+
+    def start(self, phase: str, total: int | None = None) -> None:
+        """
+        Begin a new phase.
+
+        Args:
+            phase: Phase name (PHASE_SOURCE, PHASE_LOAD...)
+            total: Total number of rows if known
+        """
+        self.phase = phase
+        self.total = total
+        self._next = self.interval
+        self._notify(0)
+
+    def update(self, done: int) -> None:
+        """
+        Report that ``done`` rows of the current phase were processed.
+
+        Only every ``interval`` rows actually calls the callback and checks
+        the cancel token.
+
+        Args:
+            done: Rows processed so far in the current phase
+
+        Raises:
+            ProcessingCancelled: If cancellation was requested
+        """
+        if done >= self._next:
+            self._next = done + self.interval
+            self._notify(done)
+
+    def finish(self, done: int) -> None:
+        """Report the final row count of the current phase."""
+        self._notify(done)
+
+    def check(self) -> None:
+        """
+        Check the cancel token without reporting progress.
+
+        Raises:
+            ProcessingCancelled: If cancellation was requested
+        """
+        if self.cancel_token is not None:
+            self.cancel_token.raise_if_cancelled()
+
+    def _notify(self, done: int) -> None:
+        self.check()
+        if self.callback is not None:
+            self.callback(self.phase, done, self.total)
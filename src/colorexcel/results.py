@@ -0,0 +1,249 @@
+"""
+Persistent on-disk cache of coloured workbooks, addressed by content.
+
+Processing the same source and target sheets again with the same options
+produces the same workbook. Each coloured copy is stored under the user
+cache directory, keyed by a SHA-256 digest of the content of every source
+file and of the target file, the sheet names, the colouring options and the
+versions of the tool and of the colour extraction. A rerun whose inputs are
+unchanged, even if the files were copied or touched in between, gets a copy
+of the stored workbook instead of running the pipeline. The directory is
+kept under a size budget by evicting the least recently used entries, as the
+colour map cache does.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+from . import __version__
+from .cache import CACHE_VERSION, user_cache_dir
+from .output import (
+    DEFAULT_OUTPUT_NAME,
+    AtomicOutput,
+    release_output,
+    scratch_output_path,
+)
+
+logger = logging.getLogger(__name__)
+
+# Taille maximale par défaut du cache des résultats (octets)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# À incrémenter lorsque l'écriture des fichiers colorés change
+RESULT_CACHE_VERSION = 1
+
+# Taille des blocs lus pour calculer l'empreinte d'un fichier (octets)
+_DIGEST_CHUNK = 1024 * 1024
+
+_ENTRY_SUFFIX = ".result"
+
+
+@lru_cache(maxsize=64)
+def _digest(file_path: str, size: int, mtime_ns: int) -> str:
+    """SHA-256 of a file, memoised per version (size, mtime) of the file."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(_DIGEST_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_digest(file_path: str) -> str | None:
+    """
+    Compute the content digest of a file.
+
+    The digest of an unchanged file (same size and modification time) is
+    computed once per process.
+
+    Args:
+        file_path: Path of the file
+
+    Returns:
+        Hex SHA-256 of the file content, or None if it cannot be read
+    """
+    try:
+        stat = os.stat(file_path)
+        return _digest(os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    except OSError:
+        return None
+
+
+def sources_digest(sources: list, precedence: str | None = None) -> str | None:
+    """
+    Compute the content digest of the source sheets of a run.
+
+    Args:
+        sources: (file path, sheet name) of each source, in order of
+            precedence
+        precedence: Precedence of merged sources, ignored for a single source
+
+    Returns:
+        Hex digest, or None if a source cannot be read
+    """
+    parts = [] if len(sources) == 1 else [precedence or ""]
+    for file_path, sheet_name in sources:
+        digest = file_digest(file_path)
+        if digest is None:
+            return None
+        parts.extend((digest, sheet_name))
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def result_key(
+    source: str | None, target_path: str, target_sheet, **options
+) -> str | None:
+    """
+    Compute the cache key of a run.
+
+    Args:
+        source: Digest returned by sources_digest
+        target_path: Path of the target Excel file
+        target_sheet: Sheet name, list of sheet names or ALL_SHEETS
+        **options: Options changing the coloured workbook (writer,
+            paint_mode, column_range, normalization, fuzzy...)
+
+    Returns:
+        Hex digest, or None if the sources or the target cannot be read
+    """
+    target = file_digest(target_path)
+    if source is None or target is None:
+        return None
+    identity = "\0".join(
+        (
+            str(RESULT_CACHE_VERSION),
+            __version__,
+            str(CACHE_VERSION),
+            source,
+            target,
+            repr(target_sheet),
+            repr(sorted(options.items())),
+        )
+    )
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Size-bounded LRU cache of coloured workbooks stored as files.
+
+    As in ColorMapCache, the recency of an entry is its file modification
+    time, refreshed on every hit.
+    """
+
+    def __init__(self, directory=None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory) if directory else user_cache_dir() / "results"
+        self.max_bytes = max_bytes
+
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / f"{key}{_ENTRY_SUFFIX}"
+
+    def get(
+        self, key: str | None, output_path=None, file_name: str = DEFAULT_OUTPUT_NAME
+    ) -> str | None:
+        """
+        Copy a cached workbook to its output path.
+
+        Args:
+            key: Key returned by result_key, or None
+            output_path: Destination of the copy, written under a temporary
+                name and renamed once complete; by default file_name in a
+                new scratch directory (created only on a hit)
+            file_name: Name of the scratch copy
+
+        Returns:
+            Path of the copy, or None on a cache miss
+        """
+        if key is None:
+            return None
+        entry = self._entry_path(key)
+        if not entry.exists():
+            logger.info("Aucun résultat en cache")
+            return None
+        scratch = output_path is None
+        if scratch:
+            output_path = scratch_output_path(file_name)
+        output = AtomicOutput(output_path)
+        try:
+            shutil.copyfile(entry, output.target)
+            result = output.commit()
+        except OSError:
+            logger.warning("Résultat en cache inutilisable : %s", entry, exc_info=True)
+            if scratch:
+                release_output(output_path)
+            return None
+        finally:
+            output.discard()
+
+        # Rafraîchir la date d'accès pour l'éviction LRU
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        logger.info("Résultat en cache utilisé : %s", result)
+        return result
+
+    def put(self, key: str | None, result_path: str) -> None:
+        """
+        Store a coloured workbook.
+
+        Args:
+            key: Key returned by result_key before the run, or None
+            result_path: Path of the coloured workbook
+        """
+        if key is None:
+            return
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if os.path.getsize(result_path) > self.max_bytes:
+                return
+            # Écriture atomique : fichier temporaire puis renommage
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            os.close(fd)
+            try:
+                shutil.copyfile(result_path, tmp_path)
+                os.replace(tmp_path, self._entry_path(key))
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        except OSError:
+            logger.warning("Impossible d'écrire dans le cache", exc_info=True)
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache fits its budget."""
+        try:
+            entries = [
+                (entry.stat().st_mtime_ns, entry.stat().st_size, entry)
+                for entry in self.directory.glob(f"*{_ENTRY_SUFFIX}")
+            ]
+        except OSError:
+            return
+        total = sum(size for _mtime, size, _entry in entries)
+        for _mtime, size, entry in sorted(entries, key=lambda item: item[0]):
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+            logger.info("Résultat en cache évincé : %s", entry.name)
+
+    def clear(self) -> None:
+        """Remove every entry of the cache."""
+        for entry in self.directory.glob(f"*{_ENTRY_SUFFIX}"):
+            entry.unlink(missing_ok=True)
+
+
+_default_cache: ResultCache | None = None
+
+
+def default_result_cache() -> ResultCache:
+    """Return the process-wide result cache in the user cache directory."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResultCache()
+    return _default_cache
@@ -0,0 +1,339 @@
+"""
+Local HTTP service recolouring uploaded workbooks.
+
+Users who do not have the desktop application post a source workbook, a
+target workbook and their sheet names to the service, poll the job, then
+download the coloured copy. Jobs are run by a JobQueue (see jobs): a full
+queue answers HTTP 503 with a Retry-After header. The server uses the
+standard library only; this module is imported by the ``serve`` command
+alone, so that the other commands do not load http.server.
+
+Routes::
+
+    POST   /jobs              multipart form: source, source_sheet, target,
+                              target_sheet (repeatable, '*' for all), and
+                              optional writer, paint_mode, columns,
+                              normalize, fuzzy, fuzzy_threshold
+    GET    /jobs              status of every job
+    GET    /jobs/<id>         status and progress of a job
+    GET    /jobs/<id>/result  coloured workbook of a finished job
+    DELETE /jobs/<id>         cancel an unfinished job, or forget a
+                              finished one
+    GET    /status            load of the service
+
+The service has no authentication: it listens on localhost by default and
+should only be exposed on a trusted network.
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import shutil
+from email import policy
+from email.parser import BytesParser
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, urlsplit
+
+from . import __version__
+from .jobs import DEFAULT_MAX_UPLOAD, STATE_DONE, Job, JobQueue, QueueFull
+from .logic import PAINT_CELLS, PAINT_ROW, WRITER_OPENPYXL, WRITER_XML
+from .matching import DEFAULT_FUZZY_THRESHOLD, MATCH_EXACT, NORMALIZATIONS
+
+logger = logging.getLogger(__name__)
+
+# Délai suggéré au client lorsque la file est pleine (secondes)
+RETRY_AFTER = 5
+
+# Valeurs acceptées pour les options booléennes du formulaire
+_TRUE_VALUES = ("1", "true", "yes", "on", "oui")
+
+_JOB_PATH = re.compile(r"^/jobs/([0-9a-f]{32})(/result)?$")
+
+_XLSX_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def parse_job_options(fields: dict) -> dict:
+    """
+    Read the colouring options of a job from its form fields.
+
+    Args:
+        fields: Form field name -> list of values
+
+    Returns:
+        Keyword arguments of run_job (writer, paint_mode, column_range,
+        normalize, fuzzy, fuzzy_threshold)
+
+    Raises:
+        ValueError: If an option is invalid
+    """
+    from .cli import parse_column_range
+
+    def value(name, default=None):
+        values = fields.get(name)
+        return values[0].strip() if values and values[0].strip() else default
+
+    writer = value("writer", WRITER_XML)
+    if writer not in (WRITER_OPENPYXL, WRITER_XML):
+        raise ValueError(f"Mode d'écriture inconnu : {writer}")
+    paint_mode = value("paint_mode", PAINT_CELLS)
+    if paint_mode not in (PAINT_CELLS, PAINT_ROW):
+        raise ValueError(f"Mode de coloration inconnu : {paint_mode}")
+    normalize = value("normalize", MATCH_EXACT)
+    if normalize not in NORMALIZATIONS:
+        raise ValueError(f"Normalisation inconnue : {normalize}")
+    column_range = None
+    if value("columns"):
+        try:
+            column_range = parse_column_range(value("columns"))
+        except argparse.ArgumentTypeError:
+            raise ValueError(f"Plage de colonnes invalide : {value('columns')}")
+    try:
+        fuzzy_threshold = float(value("fuzzy_threshold", DEFAULT_FUZZY_THRESHOLD))
+    except ValueError:
+        raise ValueError(f"Seuil invalide : {value('fuzzy_threshold')}")
+    if not 0 <= fuzzy_threshold <= 1:
+        raise ValueError(f"Seuil invalide : {fuzzy_threshold}")
+    return dict(
+        writer=writer,
+        paint_mode=paint_mode,
+        column_range=column_range,
+        normalize=normalize,
+        fuzzy=value("fuzzy", "").lower() in _TRUE_VALUES,
+        fuzzy_threshold=fuzzy_threshold,
+    )
+
+
+def parse_form(content_type: str, body: bytes) -> tuple[dict, dict]:
+    """
+    Parse a multipart/form-data request body.
+
+    Args:
+        content_type: Content-Type header of the request, with its boundary
+        body: Request body
+
+    Returns:
+        Tuple (fields: name -> list of values, files: name -> (file name,
+        content))
+
+    Raises:
+        ValueError: If the body is not a multipart form
+    """
+    message = BytesParser(policy=policy.HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body
+    )
+    if not message.is_multipart():
+        raise ValueError("Formulaire multipart/form-data attendu")
+    fields, files = {}, {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if not name:
+            continue
+        payload = part.get_payload(decode=True) or b""
+        file_name = part.get_filename()
+        if file_name is not None:
+            files[name] = (file_name, payload)
+        else:
+            charset = part.get_content_charset() or "utf-8"
+            fields.setdefault(name, []).append(payload.decode(charset, "replace"))
+    return fields, files
+
+
+class ServiceHTTPServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server of a JobQueue.
+
+    Args:
+        address: (host, port) to listen on; port 0 picks a free port
+        queue: JobQueue running the jobs
+        max_upload: Maximum size of a job submission in bytes
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, queue: JobQueue, max_upload: int = DEFAULT_MAX_UPLOAD):
+        super().__init__(address, ServiceHandler)
+        self.queue = queue
+        self.max_upload = max_upload
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """Request handler of ServiceHTTPServer (see the routes of the module)."""
+
+    server_version = f"ColorExcel/{__version__}"
+    # HTTP/1.1 : connexions persistantes et « Expect: 100-continue »
+    protocol_version = "HTTP/1.1"
+    # Délai d'inactivité d'une connexion (secondes)
+    timeout = 60
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+    def _send_json(self, status: HTTPStatus, data, headers: dict | None = None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error_json(self, status: HTTPStatus, message: str, headers=None):
+        self._send_json(status, {"error": message}, headers)
+
+    def _describe(self, job: Job) -> dict:
+        description = self.server.queue.describe(job)
+        description["url"] = f"/jobs/{job.id}"
+        if description["state"] == STATE_DONE:
+            description["result"] = f"/jobs/{job.id}/result"
+        return description
+
+    def _discard_body(self, length: int) -> None:
+        """Read and drop a request body, so that the client reads the reply."""
+        while length > 0:
+            chunk = self.rfile.read(min(length, 1024 * 1024))
+            if not chunk:
+                break
+            length -= len(chunk)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path.rstrip("/")
+        queue = self.server.queue
+        if path == "/status":
+            self._send_json(HTTPStatus.OK, queue.stats())
+            return
+        if path == "/jobs":
+            self._send_json(HTTPStatus.OK, {"jobs": queue.jobs()})
+            return
+        match = _JOB_PATH.match(path)
+        job = queue.job(match.group(1)) if match else None
+        if job is None:
+            self._send_error_json(HTTPStatus.NOT_FOUND, "Travail introuvable")
+            return
+        description = self._describe(job)
+        if not match.group(2):
+            self._send_json(HTTPStatus.OK, description)
+            return
+        if description["state"] != STATE_DONE:
+            self._send_json(HTTPStatus.CONFLICT, description)
+            return
+        self._send_file(job.output)
+
+    def _send_file(self, file_path: str) -> None:
+        try:
+            file = open(file_path, "rb")
+        except OSError:
+            self._send_error_json(HTTPStatus.GONE, "Résultat supprimé")
+            return
+        with file:
+            name = os.path.basename(file_path)
+            ascii_name = name.encode("ascii", "replace").decode().replace('"', "_")
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", _XLSX_TYPE)
+            self.send_header("Content-Length", str(os.fstat(file.fileno()).st_size))
+            self.send_header(
+                "Content-Disposition",
+                f'attachment; filename="{ascii_name}"; '
+                f"filename*=UTF-8''{quote(name)}",
+            )
+            self.end_headers()
+            shutil.copyfileobj(file, self.wfile)
+
+    def _content_length(self) -> int | None:
+        try:
+            return int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            return None
+
+    def _check_upload(self) -> tuple[HTTPStatus, str] | None:
+        """Reason to refuse a job submission before reading its body, or None."""
+        if urlsplit(self.path).path.rstrip("/") != "/jobs":
+            return HTTPStatus.NOT_FOUND, "Adresse inconnue"
+        length = self._content_length()
+        if length is None:
+            return HTTPStatus.LENGTH_REQUIRED, "Longueur requise"
+        if length > self.server.max_upload:
+            return (
+                HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                f"Requête trop volumineuse (maximum {self.server.max_upload} octets)",
+            )
+        if not self.headers.get("Content-Type", "").startswith("multipart/form-data"):
+            return (
+                HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+                "Formulaire multipart/form-data attendu",
+            )
+        if self.server.queue.full:
+            return HTTPStatus.SERVICE_UNAVAILABLE, "File d'attente pleine"
+        return None
+
+    def _refuse(self, status: HTTPStatus, message: str) -> None:
+        headers = None
+        if status == HTTPStatus.SERVICE_UNAVAILABLE:
+            headers = {"Retry-After": str(RETRY_AFTER)}
+        # Corps non lu : la connexion ne peut pas servir d'autre requête
+        self.close_connection = True
+        self._send_error_json(status, message, headers)
+
+    def handle_expect_100(self):
+        # Refus avant que le client n'envoie les fichiers (curl, requests...)
+        if self.command == "POST":
+            refusal = self._check_upload()
+            if refusal is not None:
+                self._refuse(*refusal)
+                return False
+        return super().handle_expect_100()
+
+    def do_POST(self):
+        refusal = self._check_upload()
+        if refusal is not None:
+            self._refuse(*refusal)
+            length = self._content_length()
+            if length is not None and length <= self.server.max_upload:
+                # Corps lu et ignoré, pour que le client lise la réponse
+                self._discard_body(length)
+            return
+
+        try:
+            fields, files = parse_form(
+                self.headers["Content-Type"], self.rfile.read(self._content_length())
+            )
+            for name in ("source", "target"):
+                if name not in files:
+                    raise ValueError(f"Fichier manquant : {name}")
+            options = parse_job_options(fields)
+            job = self.server.queue.submit(
+                files["source"],
+                (fields.get("source_sheet") or [""])[0],
+                files["target"],
+                fields.get("target_sheet"),
+                **options,
+            )
+        except QueueFull:
+            # File remplie par un autre dépôt pendant la lecture de celui-ci
+            self._send_error_json(
+                HTTPStatus.SERVICE_UNAVAILABLE,
+                "File d'attente pleine",
+                {"Retry-After": str(RETRY_AFTER)},
+            )
+            return
+        except (ValueError, OSError) as exc:
+            self._send_error_json(HTTPStatus.BAD_REQUEST, str(exc))
+            return
+        self._send_json(
+            HTTPStatus.ACCEPTED, self._describe(job), {"Location": f"/jobs/{job.id}"}
+        )
+
+    def do_DELETE(self):
+        match = _JOB_PATH.match(urlsplit(self.path).path.rstrip("/"))
+        description = (
+            self.server.queue.cancel(match.group(1))
+            if match and not match.group(2)
+            else None
+        )
+        if description is None:
+            self._send_error_json(HTTPStatus.NOT_FOUND, "Travail introuvable")
+            return
+        self._send_json(HTTPStatus.OK, description)
@@ -0,0 +1,291 @@
+"""
+Colour map merged from several source sheets.
+
+The colour assignments of a site may live in their own workbook. Each
+(file, sheet) source is extracted as by get_implantation_colors, cached
+sources straight from the colour map cache and the others concurrently in a
+pool of processes, then the maps are merged in the order of the sources: a
+key defined by several sources keeps the colour of the first one
+(PRECEDENCE_FIRST) or of the last one (PRECEDENCE_LAST). The keys given
+different colours by different sources are returned as conflicts and can be
+written to a CSV report.
+"""
+
+import csv
+import logging
+from typing import NamedTuple
+
+from .cache import default_cache
+from .colormap import ColorMap
+from .dryrun import CSV_DELIMITER
+from .instrumentation import COUNT_SOURCE_COLORS, NULL_REPORT, RunReport
+from .logic import ENGINE_OPENPYXL, format_hex, get_implantation_colors
+from .output import AtomicOutput
+from .parallel import extract_sources_in_parallel, should_extract_sources_in_parallel
+from .progress import (
+    PHASE_SOURCES,
+    CancelToken,
+    ProcessingCancelled,
+    ProgressCallback,
+    ProgressReporter,
+)
+
+logger = logging.getLogger(__name__)
+
+# Ordre de priorité des sources qui donnent une même clé
+PRECEDENCE_FIRST = "first"
+PRECEDENCE_LAST = "last"
+PRECEDENCES = (PRECEDENCE_FIRST, PRECEDENCE_LAST)
+
+# En-tête du rapport CSV des conflits
+CONFLICTS_CSV_HEADER = (
+    "implantation",
+    "nom",
+    "prenom",
+    "couleur_retenue",
+    "source_retenue",
+    "autres_sources",
+)
+
+
+class SourceConflict(NamedTuple):
+    """
+    Key given different colours by several sources.
+
+    Attributes:
+        key: (implantation, nom, prenom)
+        colors: (source index, colour) of every source defining the key, in
+            the order of the sources
+        kept: Index of the source whose colour was kept
+    """
+
+    key: tuple
+    colors: tuple
+    kept: int
+
+
+class MergedColors(NamedTuple):
+    """
+    Result of get_merged_colors.
+
+    Attributes:
+        colors: Merged ColorMap
+        conflicts: SourceConflict of every key coloured differently by
+            several sources
+        source_keys: Number of keys extracted from each source
+    """
+
+    colors: ColorMap
+    conflicts: list
+    source_keys: list
+
+
+def merge_color_maps(color_maps: list, precedence: str = PRECEDENCE_FIRST):
+    """
+    Merge colour maps, the order of the list giving their precedence.
+
+    Args:
+        color_maps: ColorMap (or mapping) of each source, in order
+        precedence: PRECEDENCE_FIRST keeps the colour of the first map
+            defining a key, PRECEDENCE_LAST the colour of the last one
+
+    Returns:
+        Tuple (merged ColorMap, list of SourceConflict)
+
+    Raises:
+        ValueError: If precedence is unknown
+    """
+    if precedence not in PRECEDENCES:
+        raise ValueError(f"Priorité des sources inconnue : {precedence}")
+
+    merged = ColorMap()
+    conflicting = {}
+    for color_map in color_maps:
+        if not merged:
+            # Première source non vide : copie directe de la carte compacte
+            merged = (
+                ColorMap.from_bytes(color_map.to_bytes())
+                if isinstance(color_map, ColorMap)
+                else ColorMap(color_map)
+            )
+            continue
+        for key, rvb_color in color_map.items():
+            previous = merged.get(key)
+            if previous is None:
+                merged[key] = rvb_color
+                continue
+            if previous != rvb_color:
+                conflicting[key] = None
+            if precedence == PRECEDENCE_LAST:
+                merged[key] = rvb_color
+
+    # Les conflits sont rares : leurs couleurs sont relues source par source
+    conflicts = []
+    for key in conflicting:
+        colors = tuple(
+            (index, color_map[key])
+            for index, color_map in enumerate(color_maps)
+            if key in color_map
+        )
+        kept = colors[0] if precedence == PRECEDENCE_FIRST else colors[-1]
+        conflicts.append(SourceConflict(key, colors, kept[0]))
+    return merged, conflicts
+
+
+def write_conflicts_csv(sources: list, conflicts: list, csv_path: str) -> str | None:
+    """
+    Write the conflicts of a merge to a CSV report.
+
+    Args:
+        sources: (file path, sheet name) of each merged source
+        conflicts: SourceConflict list returned by merge_color_maps
+        csv_path: Path of the CSV file, written under a temporary name and
+            renamed once complete
+
+    Returns:
+        Path of the report, or None on error
+    """
+
+    def label(index):
+        file_path, sheet_name = sources[index]
+        return f"{file_path} [{sheet_name}]"
+
+    output = AtomicOutput(csv_path)
+    try:
+        with open(output.target, "w", newline="", encoding="utf-8-sig") as csv_file:
+            writer = csv.writer(csv_file, delimiter=CSV_DELIMITER)
+            writer.writerow(CONFLICTS_CSV_HEADER)
+            for conflict in conflicts:
+                colors = dict(conflict.colors)
+                others = " ".join(
+                    f"{label(index)}={format_hex([rvb_color])}"
+                    for index, rvb_color in conflict.colors
+                    if index != conflict.kept
+                )
+                writer.writerow(
+                    (
+                        *conflict.key,
+                        format_hex([colors[conflict.kept]]),
+                        label(conflict.kept),
+                        others,
+                    )
+                )
+        return output.commit()
+    except OSError:
+        logger.error(
+            "Impossible d'écrire le rapport des conflits : %s", csv_path, exc_info=True
+        )
+        return None
+    finally:
+        output.discard()
+
+
+def get_merged_colors(
+    sources: list,
+    engine: str = ENGINE_OPENPYXL,
+    use_cache: bool = False,
+    precedence: str = PRECEDENCE_FIRST,
+    parallel: bool | None = None,
+    conflicts_csv: str | None = None,
+    progress: ProgressCallback | None = None,
+    cancel_token: CancelToken | None = None,
+    report: RunReport | None = None,
+) -> MergedColors:
+    """
+    Extract the colour maps of several source sheets and merge them.
+
+    Args:
+        sources: (file path, sheet name) of each source, in order of
+            precedence (see precedence)
+        engine: Extraction engine, see get_implantation_colors
+        use_cache: Take the cached map of unchanged sources from the colour
+            map cache, and store the maps extracted by this run there
+        precedence: PRECEDENCE_FIRST or PRECEDENCE_LAST, see merge_color_maps
+        parallel: Extract the uncached sources in a pool of processes (True),
+            one after the other in this process (False), or automatically when
+            there are several large enough uncached sources and CPUs (None)
+        conflicts_csv: Optional CSV file receiving one line per conflicting key
+        progress: Optional callback (phase, rows processed, total rows or
+            None); extracting in parallel reports PHASE_SOURCES with the
+            number of sources extracted
+        cancel_token: Optional CancelToken checked between sources and while
+            waiting for the pool
+        report: Optional RunReport receiving the phases and counters
+
+    Returns:
+        MergedColors; a source that cannot be read contributes no key, and
+        the colour map is empty if no source gave any colour
+
+    Raises:
+        ProcessingCancelled: If the run was cancelled through cancel_token
+    """
+    report = report or NULL_REPORT
+    color_maps = [None] * len(sources)
+    if use_cache:
+        with report.phase("source.cache"):
+            for index, (file_path, sheet_name) in enumerate(sources):
+                color_maps[index] = default_cache().get(file_path, sheet_name)
+    pending = [index for index, colors in enumerate(color_maps) if colors is None]
+    if pending:
+        logger.info(
+            "%d sources en cache, %d à extraire",
+            len(sources) - len(pending),
+            len(pending),
+        )
+
+    if parallel is None:
+        parallel = should_extract_sources_in_parallel(
+            [sources[index] for index in pending]
+        )
+    try:
+        if parallel and len(pending) > 1:
+            reporter = ProgressReporter(progress, cancel_token, interval=1)
+            reporter.start(PHASE_SOURCES, len(pending))
+            with report.phase("source.parallel"):
+                extracted = extract_sources_in_parallel(
+                    [sources[index] for index in pending],
+                    engine=engine,
+                    use_cache=use_cache,
+                    cancel_token=cancel_token,
+                    on_extracted=reporter.update,
+                )
+            for index, colors in zip(pending, extracted):
+                color_maps[index] = colors
+        else:
+            with report.phase("source.extract"):
+                for index in pending:
+                    file_path, sheet_name = sources[index]
+                    color_maps[index] = get_implantation_colors(
+                        file_path,
+                        sheet_name,
+                        engine=engine,
+                        use_cache=use_cache,
+                        progress=progress,
+                        cancel_token=cancel_token,
+                    )
+    except ProcessingCancelled:
+        logger.info("Extraction des sources annulée")
+        raise
+
+    for (file_path, sheet_name), colors in zip(sources, color_maps):
+        if not colors:
+            logger.warning(
+                "Aucune couleur dans la source : %s [%s]", file_path, sheet_name
+            )
+
+    with report.phase("source.merge"):
+        merged, conflicts = merge_color_maps(color_maps, precedence)
+    report.count(COUNT_SOURCE_COLORS, len(merged))
+    if conflicts:
+        logger.warning(
+            "%d clés colorées différemment par plusieurs sources", len(conflicts)
+        )
+        if conflicts_csv:
+            write_conflicts_csv(sources, conflicts, conflicts_csv)
+    logger.info(
+        "%d sources fusionnées : %d couleurs, %d conflits",
+        len(sources),
+        len(merged),
+        len(conflicts),
+    )
+    return MergedColors(merged, conflicts, [len(colors) for colors in color_maps])
@@ -0,0 +1,592 @@
+"""
+Watch mode: recolour the targets of a folder whenever they or the source change.
+
+WatchService extracts the source colour map once and keeps it in memory,
+then watches the source files and a target directory (not recursively).
+Changes are collected by a watcher: watchdog's native file system
+notifications when the package is installed, otherwise (or on request) a
+PollingWatcher comparing the size and modification time of the files at a
+fixed interval. A Debouncer holds each changed file until it has been quiet
+for a while, so that a workbook still being copied or saved is processed
+once, after its last write.
+
+Settled targets are queued and recoloured by cli.process_target in a bounded
+pool of processes initialised with the colour map, at most one task per
+target at a time: a target changed again while it is being recoloured is
+queued once more when its task ends. A settled source is extracted again;
+if it gives colours, the pool is replaced by one holding the new map and
+every target is queued. A source that cannot be read (still being written,
+for instance) keeps the previous map until its next change.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
+from .logic import ENGINE_XML, get_implantation_colors
+from .parallel import available_cpus
+from .results import sources_digest
+from .sources import PRECEDENCE_FIRST, get_merged_colors
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # watchdog est optionnel : surveillance par scrutation
+    FileSystemEventHandler = object
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+# Délai sans modification avant de traiter un fichier (secondes)
+DEFAULT_DEBOUNCE = 2.0
+
+# Intervalle de scrutation des fichiers et des tâches terminées (secondes)
+DEFAULT_POLL_INTERVAL = 1.0
+
+# Extensions des classeurs cibles surveillés
+TARGET_SUFFIXES = (".xlsx", ".xlsm")
+
+# Événements watchdog qui signalent une écriture (les ouvertures et les
+# fermetures sans écriture, provoquées par nos propres lectures, sont ignorées)
+WRITE_EVENTS = ("created", "modified", "moved", "deleted", "closed")
+
+# Résultat d'un fichier cible : (cible, sortie ou None, durée, erreur ou None)
+ResultCallback = Callable[[str, str | None, float, str | None], None]
+
+
+def _normalize_path(path) -> str:
+    """Absolute, case-normalised path used to compare watched files."""
+    return os.path.normcase(os.path.abspath(path))
+
+
+def is_target_name(name: str) -> bool:
+    """
+    Tell whether a file name is a target workbook to watch.
+
+    Excel lock files (``~$``) and hidden files, such as the temporary files
+    written by AtomicOutput, are ignored.
+
+    Args:
+        name: Base name of the file
+
+    Returns:
+        True for a .xlsx or .xlsm workbook
+    """
+    if name.startswith(("~$", ".")):
+        return False
+    return name.lower().endswith(TARGET_SUFFIXES)
+
+
+class PollingWatcher:
+    """
+    Detect changes by comparing the size and modification time of the files.
+
+    Args:
+        files: Individual files to watch (the sources)
+        directory: Directory whose target workbooks are watched
+    """
+
+    def __init__(self, files: list[str], directory: str):
+        self._files = [_normalize_path(path) for path in files]
+        self._directory = directory
+        self._snapshot = {}
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        """Return {path: (size, mtime in ns)} of the watched files."""
+        snapshot = {}
+        for path in self._files:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+        try:
+            with os.scandir(self._directory) as entries:
+                for entry in entries:
+                    if not is_target_name(entry.name):
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    snapshot[_normalize_path(entry.path)] = (
+                        stat.st_size,
+                        stat.st_mtime_ns,
+                    )
+        except OSError:
+            logger.warning(
+                "Dossier surveillé illisible : %s", self._directory, exc_info=True
+            )
+        return snapshot
+
+    def start(self) -> None:
+        """Take the reference snapshot."""
+        self._snapshot = self._scan()
+
+    def changes(self) -> set[str]:
+        """
+        Return the files created, modified or deleted since the last call.
+
+        Returns:
+            Set of normalised paths
+        """
+        snapshot = self._scan()
+        changed = {
+            path
+            for path in snapshot.keys() | self._snapshot.keys()
+            if snapshot.get(path) != self._snapshot.get(path)
+        }
+        self._snapshot = snapshot
+        return changed
+
+    def stop(self) -> None:
+        """Nothing to release."""
+
+
+class _ChangeHandler(FileSystemEventHandler):
+    """watchdog handler forwarding the written paths to a WatchdogWatcher."""
+
+    def __init__(self, watcher):
+        super().__init__()
+        self._watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in WRITE_EVENTS:
+            return
+        self._watcher._add(event.src_path)
+        dest_path = getattr(event, "dest_path", "")
+        if dest_path:
+            self._watcher._add(dest_path)
+
+
+class WatchdogWatcher:
+    """
+    Detect changes with watchdog's native file system notifications.
+
+    Args:
+        files: Individual files to watch (the sources)
+        directory: Directory whose target workbooks are watched
+
+    Raises:
+        RuntimeError: If watchdog is not installed
+    """
+
+    def __init__(self, files: list[str], directory: str):
+        if Observer is None:
+            raise RuntimeError("watchdog n'est pas installé")
+        self._files = {_normalize_path(path) for path in files}
+        self._directory = _normalize_path(directory)
+        self._lock = threading.Lock()
+        self._changed = set()
+        self._observer = Observer()
+        handler = _ChangeHandler(self)
+        for folder in {self._directory, *(os.path.dirname(p) for p in self._files)}:
+            self._observer.schedule(handler, folder, recursive=False)
+
+    def _add(self, path) -> None:
+        """Record a written path if it is a watched file (observer thread)."""
+        path = _normalize_path(os.fsdecode(path))
+        if path not in self._files and not (
+            os.path.dirname(path) == self._directory
+            and is_target_name(os.path.basename(path))
+        ):
+            return
+        with self._lock:
+            self._changed.add(path)
+
+    def start(self) -> None:
+        """Start the observer thread."""
+        self._observer.start()
+
+    def changes(self) -> set[str]:
+        """
+        Return the files written since the last call.
+
+        Returns:
+            Set of normalised paths
+        """
+        with self._lock:
+            changed, self._changed = self._changed, set()
+        return changed
+
+    def stop(self) -> None:
+        """Stop the observer thread."""
+        self._observer.stop()
+        self._observer.join()
+
+
+def make_watcher(files: list[str], directory: str, polling: bool = False):
+    """
+    Create the watcher of the source files and the target directory.
+
+    Args:
+        files: Individual files to watch (the sources)
+        directory: Directory whose target workbooks are watched
+        polling: Use a PollingWatcher even when watchdog is installed
+
+    Returns:
+        WatchdogWatcher if watchdog is installed and polling is False,
+        PollingWatcher otherwise
+    """
+    if polling or Observer is None:
+        logger.info("Surveillance par scrutation des fichiers")
+        return PollingWatcher(files, directory)
+    logger.info("Surveillance par notifications du système de fichiers")
+    return WatchdogWatcher(files, directory)
+
+
+class Debouncer:
+    """
+    Hold changed files until they have not changed for a given delay.
+
+    Args:
+        delay: Quiet period in seconds
+    """
+
+    def __init__(self, delay: float = DEFAULT_DEBOUNCE):
+        self.delay = delay
+        self._pending: dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, paths, now: float) -> None:
+        """
+        Record changes, restarting the quiet period of each path.
+
+        Args:
+            paths: Changed paths
+            now: Current time.monotonic()
+        """
+        for path in paths:
+            self._pending[path] = now
+
+    def ready(self, now: float) -> list[str]:
+        """
+        Remove and return the paths quiet for at least the delay.
+
+        Args:
+            now: Current time.monotonic()
+
+        Returns:
+            Settled paths, in order of their last change
+        """
+        settled = [
+            path
+            for path, changed in self._pending.items()
+            if now - changed >= self.delay
+        ]
+        for path in settled:
+            del self._pending[path]
+        return settled
+
+
+class WatchService:
+    """
+    Recolour the targets of a directory whenever they or the sources change.
+
+    Args:
+        sources: (file path, sheet name) of each source, in order of
+            precedence; several sources are merged as by get_merged_colors
+        target_dir: Directory of the target workbooks (not recursive)
+        out_dir: Output directory, outside target_dir's own files
+        target_sheet: Target sheets, see cli.process_target
+        options: Other keyword arguments of cli.process_target (writer,
+            paint_mode, column_range, report_path, normalize, fuzzy,
+            fuzzy_threshold, incremental)
+        result_cache: Reuse the cached result of a target whose content,
+            sources and options are unchanged (see results)
+        engine: Source extraction engine
+        use_cache: Use the colour map cache to extract the sources
+        precedence: Precedence of merged sources, see merge_color_maps
+        workers: Size of the pool, by default the number of CPUs; at most
+            this many targets are recoloured at a time
+        debounce: Quiet period before a changed file is processed (seconds)
+        poll_interval: Interval between two checks of the files and of the
+            finished tasks (seconds)
+        polling: Poll the files even when watchdog is installed
+        on_result: Optional callable receiving (target, output or None,
+            seconds, error or None) for every target processed
+
+    Raises:
+        ValueError: If out_dir is target_dir, whose outputs would be
+            processed as targets
+    """
+
+    def __init__(
+        self,
+        sources: list[tuple[str, str]],
+        target_dir: str,
+        out_dir: str,
+        target_sheet: list[str] | None = None,
+        options: dict | None = None,
+        result_cache: bool = True,
+        engine: str = ENGINE_XML,
+        use_cache: bool = True,
+        precedence: str = PRECEDENCE_FIRST,
+        workers: int | None = None,
+        debounce: float = DEFAULT_DEBOUNCE,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        polling: bool = False,
+        on_result: ResultCallback | None = None,
+    ):
+        if _normalize_path(out_dir) == _normalize_path(target_dir):
+            raise ValueError(
+                "Le dossier de sortie doit être différent du dossier surveillé"
+            )
+        self.sources = list(sources)
+        self.target_dir = target_dir
+        self.out_dir = out_dir
+        self.target_sheet = target_sheet
+        self.options = dict(options or {})
+        self.result_cache = result_cache
+        self.engine = engine
+        self.use_cache = use_cache
+        self.precedence = precedence
+        self.workers = workers or available_cpus()
+        self.poll_interval = poll_interval
+        self.polling = polling
+        self.on_result = on_result
+        self.data_colors = None
+        self._source_paths = {_normalize_path(path) for path, _ in self.sources}
+        self._source_checksum = None
+        self._result_source = None
+        self._debouncer = Debouncer(debounce)
+        self._executor = None
+        self._retired = []
+        # Cibles en attente (dict ordonné utilisé comme ensemble), en cours
+        # {cible: (future, pool)} et à retraiter à la fin de leur tâche
+        self._queue: dict[str, None] = {}
+        self._running = {}
+        self._dirty = set()
+
+    def load_colors(self) -> bool:
+        """
+        Extract the source colour map and keep it in memory.
+
+        Returns:
+            True if the sources gave colours; otherwise the previous map, if
+            any, is kept
+        """
+        start = time.perf_counter()
+        # Empreinte prise avant l'extraction : une source modifiée entre-temps
+        # ne peut pas associer ses anciennes couleurs à son nouveau contenu
+        result_source = (
+            sources_digest(self.sources, self.precedence) if self.result_cache else None
+        )
+        if len(self.sources) == 1:
+            data_colors = get_implantation_colors(
+                *self.sources[0], engine=self.engine, use_cache=self.use_cache
+            )
+        else:
+            data_colors = get_merged_colors(
+                self.sources,
+                engine=self.engine,
+                use_cache=self.use_cache,
+                precedence=self.precedence,
+            ).colors
+        if not data_colors:
+            logger.warning("Aucune couleur extraite des sources, carte conservée")
+            return False
+
+        self.data_colors = data_colors
+        self._source_checksum = None
+        if self.options.get("incremental"):
+            from .cli import _sources_checksum
+
+            self._source_checksum = _sources_checksum(self.sources, self.precedence)
+        self._result_source = result_source
+        if self._executor is not None:
+            # Les tâches en cours se terminent avec l'ancienne carte ; leurs
+            # cibles sont retraitées ensuite (voir _collect)
+            self._dirty.update(self._running)
+        self._replace_pool()
+        logger.info(
+            "Source : %d couleurs extraites en %.2f s",
+            len(data_colors),
+            time.perf_counter() - start,
+        )
+        return True
+
+    def _replace_pool(self) -> None:
+        """Start a pool holding the current colour map, retiring the old one."""
+        from .cli import _init_worker
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._retired.append(self._executor)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.data_colors,),
+        )
+
+    def targets(self) -> list[str]:
+        """
+        List the target workbooks of the watched directory.
+
+        Returns:
+            Sorted normalised paths
+        """
+        try:
+            with os.scandir(self.target_dir) as entries:
+                paths = [
+                    _normalize_path(entry.path)
+                    for entry in entries
+                    if is_target_name(entry.name) and entry.is_file()
+                ]
+        except OSError:
+            logger.warning(
+                "Dossier surveillé illisible : %s", self.target_dir, exc_info=True
+            )
+            return []
+        return sorted(path for path in paths if path not in self._source_paths)
+
+    def _is_stale(self, target: str) -> bool:
+        """Whether the output of a target is missing or older than its inputs."""
+        from .cli import colored_output_path
+
+        try:
+            output_mtime = os.stat(colored_output_path(target, self.out_dir)).st_mtime
+        except OSError:
+            return True
+        try:
+            inputs = [target, *(path for path, _ in self.sources)]
+            return any(os.stat(path).st_mtime > output_mtime for path in inputs)
+        except OSError:
+            return True
+
+    def queue(self, target: str) -> None:
+        """
+        Queue a target, or mark it to be processed again if it is running.
+
+        Args:
+            target: Path of the target workbook
+        """
+        target = _normalize_path(target)
+        if target in self._running:
+            self._dirty.add(target)
+        else:
+            self._queue[target] = None
+
+    def _handle_settled(self, paths: list[str]) -> None:
+        """Reload the colours or queue the targets of settled changes."""
+        if any(path in self._source_paths for path in paths):
+            logger.info("Source modifiée, nouvelle extraction des couleurs")
+            if self.load_colors():
+                for target in self.targets():
+                    self.queue(target)
+        for path in paths:
+            if path in self._source_paths:
+                continue
+            if not os.path.isfile(path):
+                logger.info("Cible supprimée : %s", path)
+                self._queue.pop(path, None)
+                continue
+            self.queue(path)
+
+    def _dispatch(self) -> None:
+        """Submit queued targets while fewer than `workers` are running."""
+        from .cli import process_target
+
+        while self._queue and len(self._running) < self.workers:
+            target = next(iter(self._queue))
+            del self._queue[target]
+            future = self._executor.submit(
+                process_target,
+                target,
+                self.target_sheet,
+                self.out_dir,
+                source=self._source_checksum,
+                result_source=self._result_source,
+                **self.options,
+            )
+            self._running[target] = (future, self._executor)
+
+    def _collect(self, replace_broken: bool = True) -> None:
+        """Report the finished tasks and queue again the targets changed since."""
+        for target, (future, executor) in list(self._running.items()):
+            if not future.done():
+                continue
+            del self._running[target]
+            try:
+                _target, output, seconds, error = future.result()
+            except Exception as exc:
+                # Processus du pool arrêté brutalement
+                logger.error("Échec du traitement de %s", target, exc_info=True)
+                output, seconds, error = None, 0.0, repr(exc)
+                if replace_broken and executor is self._executor:
+                    self._replace_pool()
+            if self.on_result is not None:
+                self.on_result(target, output, seconds, error)
+            if target in self._dirty:
+                self._dirty.discard(target)
+                self._queue[target] = None
+        # Les pools retirés sans tâche en cours ont libéré leurs processus
+        busy = {executor for _future, executor in self._running.values()}
+        self._retired = [executor for executor in self._retired if executor in busy]
+
+    @property
+    def idle(self) -> bool:
+        """Whether no change is pending, queued or being processed."""
+        return not (len(self._debouncer) or self._queue or self._running)
+
+    def run(self, stop_event: threading.Event | None = None) -> bool:
+        """
+        Watch and process changes until stop_event is set.
+
+        Targets whose output is missing or older than the target or the
+        sources are processed first.
+
+        Args:
+            stop_event: Event ending the loop; KeyboardInterrupt also ends it
+
+        Returns:
+            False if the sources gave no colours at startup, True otherwise
+        """
+        stop_event = stop_event or threading.Event()
+        os.makedirs(self.out_dir, exist_ok=True)
+        watcher = make_watcher(
+            [path for path, _ in self.sources], self.target_dir, self.polling
+        )
+        watcher.start()
+        try:
+            if not self.load_colors():
+                return False
+            for target in self.targets():
+                if self._is_stale(target):
+                    self.queue(target)
+            logger.info(
+                "Surveillance de %s (%d cibles à traiter)",
+                self.target_dir,
+                len(self._queue),
+            )
+            while not stop_event.is_set():
+                now = time.monotonic()
+                self._debouncer.add(watcher.changes(), now)
+                settled = self._debouncer.ready(now)
+                if settled:
+                    self._handle_settled(settled)
+                self._collect()
+                self._dispatch()
+                stop_event.wait(self.poll_interval)
+            return True
+        finally:
+            watcher.stop()
+            self._shutdown()
+
+    def _shutdown(self) -> None:
+        """Drop the queued targets and wait for the running ones."""
+        self._queue.clear()
+        for executor in [*self._retired, self._executor]:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+        self._collect(replace_broken=False)
+        self._retired = []
+        self._executor = None
+        logger.info("Surveillance arrêtée")
@@ -0,0 +1,828 @@
+"""
+Direct XML patching of .xlsx workbooks.
+
+Instead of loading a whole workbook with openpyxl and re-serialising every
+part, the writer in this module streams the target archive: untouched parts are
+copied as-is, ``xl/styles.xml`` receives the extra fills / cell formats it
+needs, and only the ``s`` (style) attributes of matched rows of the selected
+worksheets are rewritten while the sheet XML is streamed. Time and memory
+scale with the size of the recoloured sheets, not with the size of the
+workbook.
+
+Sheets can also be patched ahead of time, one per process, by
+patch_sheet_to_file; each records the cell formats it added, and
+write_colored_sheets renumbers them against the shared styles part while
+copying the patched sheet into the archive.
+
+A copy written by this module can itself be patched again: given the cell
+formats the previous patch added (ColoredCopy.colored_styles), StylePatcher
+reuses them, clones new ones from the original format rather than from the
+coloured one, and maps the CLEAR_FILL row colour back to the original
+format. With ``rows``, rows not listed are copied without being parsed.
+"""
+
+import codecs
+import functools
+import re
+import shutil
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Callable, NamedTuple
+
+from .instrumentation import (
+    COUNT_CELLS_PAINTED,
+    COUNT_ROWS_MATCHED,
+    COUNT_TARGET_ROWS,
+    NULL_REPORT,
+)
+from .xlsx_stream import XlsxPackage
+
+# Taille des blocs lus dans la feuille XML
+CHUNK_SIZE = 1 << 16
+
+_ROOT_START_RE = re.compile(r"<(?![?!])([\w.-]+:)?([\w.-]+)\b[^>]*>")
+_ROW_START_RE = re.compile(r"<([\w.-]+:)?row\b[^>]*?(/?)>")
+_CELL_RE = re.compile(
+    r"<(?P<prefix>[\w.-]+:)?c\b(?P<attrs>[^>]*?)(?:/>|>(?P<body>.*?)</(?P=prefix)?c>)",
+    re.DOTALL,
+)
+_ATTR_S_RE = re.compile(r'\ss="[^"]*"')
+_ATTR_R_RE = re.compile(r'\sr="([^"]*)"')
+_ATTR_SPANS_RE = re.compile(r'\sspans="[^"]*"')
+_ATTR_CUSTOM_FORMAT_RE = re.compile(r'\scustomFormat="[^"]*"')
+_ATTR_FILL_ID_RE = re.compile(r'\sfillId="[^"]*"')
+_ATTR_APPLY_FILL_RE = re.compile(r'\sapplyFill="[^"]*"')
+_XF_RE = re.compile(r"<(?:[\w.-]+:)?xf\b[^>]*?(?:/>|>.*?</(?:[\w.-]+:)?xf>)", re.DOTALL)
+_COUNT_RE = re.compile(r'\scount="\d+"')
+_STYLED_TAG_RE = re.compile(r"<(?:[\w.-]+:)?(?:c|row)\b[^>]*>")
+_ATTR_S_VALUE_RE = re.compile(r'\ss="(\d+)"')
+
+# Signature du rappel qui décide de la couleur d'une ligne
+RowColorCallback = Callable[[int, dict], "tuple[int, int, int] | None"]
+
+# Couleur de ligne rendant aux cellules leur format d'origine (sans remplissage
+# ajouté), pour une copie déjà colorée par ce module
+CLEAR_FILL = "clear"
+
+
+@functools.lru_cache(maxsize=None)
+def _row_close_re(prefix: str | None) -> re.Pattern:
+    """Regex matching the closing tag of a row with the given namespace prefix."""
+    return re.compile(rf"</{re.escape(prefix or '')}row>")
+
+
+def _rgb_hex(rvb_color: tuple[int, int, int]) -> str:
+    """
+    Format an RGB tuple as an ARGB hex string.
+
+    The alpha byte is 00, as in the fills of the openpyxl writer (openpyxl
+    prefixes a 6-digit colour with 00), so that both writers produce the same
+    styles; Excel ignores the alpha byte of a solid fill.
+    """
+    return "00{:02X}{:02X}{:02X}".format(*rvb_color)
+
+
+def _set_attr(tag: str, pattern: re.Pattern, name: str, value) -> str:
+    """
+    Set an attribute of an XML start tag, replacing it if already present.
+
+    Args:
+        tag: Start tag text (e.g. '<c r="A1" s="3">')
+        pattern: Regex matching the existing attribute (with leading space)
+        name: Attribute name
+        value: New attribute value
+
+    Returns:
+        The rewritten start tag
+    """
+    attr = f' {name}="{value}"'
+    if pattern.search(tag):
+        return pattern.sub(attr, tag, count=1)
+    # Insérer juste après le nom de l'élément
+    match = re.match(r"<[\w.:-]+", tag)
+    return tag[: match.end()] + attr + tag[match.end() :]
+
+
+class StylePatcher:
+    """
+    Append solid fills and cloned cell formats to ``xl/styles.xml``.
+
+    Each distinct (original cell format, colour) pair gets exactly one new
+    ``<xf>``, cloned from the original so fonts, borders and number formats
+    are preserved; only ``fillId`` changes, as when openpyxl assigns a fill.
+
+    Args:
+        styles_xml: Text of ``xl/styles.xml``
+        colored_from: For a copy already patched by this module, id of the
+            first cell format the previous patches added
+        colored_styles: (original style, colour) of each of those formats,
+            in id order (ColoredCopy.colored_styles)
+    """
+
+    def __init__(
+        self,
+        styles_xml: str,
+        colored_from: int | None = None,
+        colored_styles: list | None = None,
+    ):
+        self._xml = styles_xml
+        fills = self._section("fills")
+        xfs = self._section("cellXfs")
+        if fills is None or xfs is None:
+            raise ValueError("styles.xml sans <fills> ou <cellXfs>")
+        self._fill_count = len(re.findall(r"<(?:[\w.-]+:)?fill\b", fills.group(2)))
+        self._xfs = _XF_RE.findall(xfs.group(2))
+        self._base_xf_count = len(self._xfs)
+        self._new_fills: list[str] = []
+        self._fill_ids: dict[tuple[int, int, int], int] = {}
+        self._xf_ids: dict[tuple[int, tuple[int, int, int]], int] = {}
+        # Format d'origine de chaque format coloré
+        self._origins: dict[int, int] = {}
+        self._colored_from = self._base_xf_count
+        if colored_styles:
+            if colored_from + len(colored_styles) > self._base_xf_count:
+                raise ValueError("Formats colorés absents de styles.xml")
+            self._colored_from = colored_from
+            for xf_id, (style_id, rvb_color) in enumerate(colored_styles, colored_from):
+                rvb_color = tuple(rvb_color)
+                self._xf_ids[(style_id, rvb_color)] = xf_id
+                self._origins[xf_id] = style_id
+                fill_id = re.search(r'\sfillId="(\d+)"', self._xfs[xf_id])
+                if fill_id:
+                    self._fill_ids.setdefault(rvb_color, int(fill_id.group(1)))
+
+    def _section(self, name: str, xml: str | None = None):
+        return re.search(
+            rf"(<(?:[\w.-]+:)?{name}\b[^>]*>)(.*?)(</(?:[\w.-]+:)?{name}>)",
+            self._xml if xml is None else xml,
+            re.DOTALL,
+        )
+
+    @property
+    def xf_count(self) -> int:
+        """Number of cell formats once patched."""
+        return len(self._xfs)
+
+    @property
+    def base_xf_count(self) -> int:
+        """Number of cell formats of the original styles part."""
+        return self._base_xf_count
+
+    @property
+    def new_styles(self) -> list[tuple[int, tuple[int, int, int]]]:
+        """(original style, colour) of each added cell format, in id order."""
+        return [
+            key for key, xf_id in self._xf_ids.items() if xf_id >= self._base_xf_count
+        ]
+
+    @property
+    def colored_from(self) -> int:
+        """Id of the first coloured cell format, including earlier patches."""
+        return self._colored_from
+
+    @property
+    def colored_styles(self) -> list[tuple[int, tuple[int, int, int]]]:
+        """(original style, colour) of every coloured cell format, in id order."""
+        return list(self._xf_ids)
+
+    def fill_id(self, rvb_color: tuple[int, int, int]) -> int:
+        """
+        Return the id of a solid fill of the given colour, creating it once.
+
+        Args:
+            rvb_color: Tuple of (R, G, B) values
+
+        Returns:
+            Index of the fill in ``<fills>``
+        """
+        fill_id = self._fill_ids.get(rvb_color)
+        if fill_id is None:
+            hex_color = _rgb_hex(rvb_color)
+            self._new_fills.append(
+                '<fill><patternFill patternType="solid">'
+                f'<fgColor rgb="{hex_color}"/><bgColor rgb="{hex_color}"/>'
+                "</patternFill></fill>"
+            )
+            fill_id = self._fill_count + len(self._new_fills) - 1
+            self._fill_ids[rvb_color] = fill_id
+        return fill_id
+
+    def style_for(self, style_id: int, rvb_color: tuple[int, int, int]) -> int:
+        """
+        Return the id of a cell format equal to ``style_id`` but filled with a colour.
+
+        Args:
+            style_id: Current ``s`` attribute of the cell
+            rvb_color: Tuple of (R, G, B) values, or CLEAR_FILL for the
+                original format of a cell coloured by an earlier patch
+
+        Returns:
+            Index of the cloned format in ``<cellXfs>``
+        """
+        # Toujours repartir du format d'origine, jamais d'un format déjà coloré
+        style_id = self._origins.get(style_id, style_id)
+        if rvb_color == CLEAR_FILL:
+            return style_id
+        key = (style_id, rvb_color)
+        xf_id = self._xf_ids.get(key)
+        if xf_id is None:
+            base = (
+                self._xfs[style_id] if style_id < self._base_xf_count else self._xfs[0]
+            )
+            start_end = base.index(">") + 1
+            start = base[:start_end]
+            start = _set_attr(
+                start, _ATTR_FILL_ID_RE, "fillId", self.fill_id(rvb_color)
+            )
+            start = _set_attr(start, _ATTR_APPLY_FILL_RE, "applyFill", 1)
+            self._xfs.append(start + base[start_end:])
+            xf_id = len(self._xfs) - 1
+            self._xf_ids[key] = xf_id
+            self._origins[xf_id] = style_id
+        return xf_id
+
+    def render(self) -> str:
+        """Return the patched ``styles.xml`` text."""
+        xml = self._xml
+        if len(self._xfs) == self._base_xf_count:
+            return xml
+
+        # Une copie déjà colorée peut recevoir des formats sans nouveau remplissage
+        if self._new_fills:
+            fills = self._section("fills")
+            open_tag = _set_attr(
+                fills.group(1),
+                _COUNT_RE,
+                "count",
+                self._fill_count + len(self._new_fills),
+            )
+            xml = (
+                xml[: fills.start()]
+                + open_tag
+                + fills.group(2)
+                + "".join(self._new_fills)
+                + fills.group(3)
+                + xml[fills.end() :]
+            )
+
+        xfs = self._section("cellXfs", xml)
+        open_tag = _set_attr(xfs.group(1), _COUNT_RE, "count", len(self._xfs))
+        added = "".join(self._xfs[self._base_xf_count :])
+        return (
+            xml[: xfs.start()]
+            + open_tag
+            + xfs.group(2)
+            + added
+            + xfs.group(3)
+            + xml[xfs.end() :]
+        )
+
+
+class _SheetPatcher:
+    """Rewrite the style attributes of matched rows while streaming a worksheet."""
+
+    def __init__(
+        self,
+        package: XlsxPackage,
+        styles: StylePatcher,
+        row_color: RowColorCallback,
+        max_column: int | None,
+        row_style: bool = False,
+        column_range: tuple[int, int] | None = None,
+        rows: set[int] | None = None,
+    ):
+        from openpyxl.utils.cell import (
+            column_index_from_string,
+            coordinate_to_tuple,
+            get_column_letter,
+        )
+
+        self._column_index = column_index_from_string
+        self._coordinate_to_tuple = coordinate_to_tuple
+        self._column_letter = get_column_letter
+        self.package = package
+        self.styles = styles
+        self.row_color = row_color
+        self.max_column = max_column
+        self.row_style = row_style
+        self.column_range = column_range
+        self.rows = rows
+        self.root_open = None
+        self.root_close = None
+        self.rows_scanned = 0
+        self.rows_patched = 0
+        self.cells_patched = 0
+
+    def _parse_row(self, row_text: str) -> ET.Element:
+        return ET.fromstring(self.root_open + row_text + self.root_close)[0]
+
+    def _row_cells(self, row: ET.Element) -> dict:
+        cells = {}
+        col_counter = 0
+        for cell in row:
+            if not cell.tag.endswith("}c"):
+                continue
+            coordinate = cell.get("r")
+            if coordinate:
+                col_counter = self._coordinate_to_tuple(coordinate)[1]
+            else:
+                col_counter += 1
+            style_id = int(cell.get("s", 0) or 0)
+            cells[col_counter - 1] = (
+                self.package.cell_value(cell, style_id),
+                style_id,
+            )
+        return cells
+
+    def patch_row(self, row_text: str, row_counter: int) -> tuple[str, int]:
+        """
+        Patch one ``<row>`` element if its key has a colour.
+
+        Args:
+            row_text: Raw XML text of the row
+            row_counter: Number of the previous row (for rows without ``r``)
+
+        Returns:
+            Tuple (row_text, row_number) with the possibly rewritten row
+        """
+        start = _ROW_START_RE.match(row_text)
+        if self.rows is not None:
+            # Seules les lignes demandées sont analysées
+            row_attr = _ATTR_R_RE.search(start.group(0))
+            row_number = int(row_attr.group(1)) if row_attr else row_counter + 1
+            if row_number not in self.rows:
+                if row_number > 1:
+                    self.rows_scanned += 1
+                return row_text, row_number
+
+        row = self._parse_row(row_text)
+        row_attr = row.get("r")
+        row_number = int(row_attr) if row_attr else row_counter + 1
+        if row_number > 1:
+            self.rows_scanned += 1
+        rvb_color = self.row_color(row_number, self._row_cells(row))
+        if rvb_color is None:
+            return row_text, row_number
+
+        self.rows_patched += 1
+        prefix = start.group(1) or ""
+        row_open = _ATTR_SPANS_RE.sub("", start.group(0))
+        if start.group(2):
+            # <row .../> sans cellule : le rouvrir pour y ajouter des cellules
+            row_open = row_open[:-2].rstrip() + ">"
+            body, row_close = "", f"</{prefix}row>"
+        else:
+            close_at = row_text.rindex("</")
+            body, row_close = row_text[start.end() : close_at], row_text[close_at:]
+
+        if self.row_style:
+            # Style de ligne : couvre aussi les cellules vides de la ligne
+            row_style_id = (
+                int(row.get("s", 0) or 0)
+                if row.get("customFormat") in ("1", "true")
+                else 0
+            )
+            new_style = self.styles.style_for(row_style_id, rvb_color)
+            row_open = _set_attr(row_open, _ATTR_S_RE, "s", new_style)
+            row_open = _set_attr(row_open, _ATTR_CUSTOM_FORMAT_RE, "customFormat", 1)
+
+        first_col, last_col = self.column_range or (1, self.max_column or 0)
+        cells = []
+        col_counter = 0
+        last_end = 0
+        for match in _CELL_RE.finditer(body):
+            last_end = match.end()
+            attrs = match.group("attrs")
+            ref = _ATTR_R_RE.search(attrs)
+            if ref:
+                col_counter = self._column_index(
+                    ref.group(1).rstrip("0123456789").lstrip("$")
+                )
+            else:
+                col_counter += 1
+            cell_text = match.group(0)
+            if self.column_range and not first_col <= col_counter <= last_col:
+                cells.append((col_counter, cell_text))
+                continue
+            tag_end = cell_text.index(">") + 1
+            if cell_text[tag_end - 2] == "/":
+                tag_end -= 2
+            style_match = re.search(r'\ss="(\d*)"', cell_text[:tag_end])
+            style_id = int(style_match.group(1) or 0) if style_match else 0
+            new_tag = _set_attr(
+                cell_text[:tag_end],
+                _ATTR_S_RE,
+                "s",
+                self.styles.style_for(style_id, rvb_color),
+            )
+            cells.append((col_counter, new_tag + cell_text[tag_end:]))
+            self.cells_patched += 1
+        trailing = body[last_end:]
+
+        # Compléter les cellules manquantes jusqu'à la dernière colonne utilisée
+        # (ou de la plage demandée), sauf en mode style de ligne
+        if not self.row_style and last_col and rvb_color != CLEAR_FILL:
+            present = {col for col, _text in cells}
+            empty_style = self.styles.style_for(0, rvb_color)
+            for col in range(first_col, last_col + 1):
+                if col not in present:
+                    ref = f"{self._column_letter(col)}{row_number}"
+                    cells.append((col, f'<{prefix}c r="{ref}" s="{empty_style}"/>'))
+                    self.cells_patched += 1
+            cells.sort(key=lambda item: item[0])
+
+        new_body = "".join(text for _col, text in cells) + trailing
+        return row_open + new_body + row_close, row_number
+
+    def run(self, source, target) -> None:
+        """
+        Stream a worksheet from ``source`` to ``target`` (binary streams).
+
+        Args:
+            source: Readable binary stream of the original sheet XML
+            target: Writable binary stream for the patched sheet XML
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        buffer = ""
+        row_counter = 0
+        eof = False
+
+        while True:
+            if not eof:
+                chunk = source.read(CHUNK_SIZE)
+                if chunk:
+                    buffer += decoder.decode(chunk)
+                else:
+                    buffer += decoder.decode(b"", final=True)
+                    eof = True
+
+            if self.root_open is None:
+                match = _ROOT_START_RE.search(buffer)
+                if match is None:
+                    if eof:
+                        break
+                    continue
+                self.root_open = match.group(0)
+                self.root_close = f"</{match.group(1) or ''}{match.group(2)}>"
+                target.write(buffer[: match.end()].encode("utf-8"))
+                buffer = buffer[match.end() :]
+
+            out = []
+            pos = 0
+            incomplete_row = False
+            while True:
+                start = _ROW_START_RE.search(buffer, pos)
+                if start is None:
+                    break
+                if start.group(2):
+                    end = start.end()
+                else:
+                    close_match = _row_close_re(start.group(1)).search(
+                        buffer, start.end()
+                    )
+                    if close_match is None:
+                        incomplete_row = True
+                        break
+                    end = close_match.end()
+                out.append(buffer[pos : start.start()])
+                row_text, row_counter = self.patch_row(
+                    buffer[start.start() : end], row_counter
+                )
+                out.append(row_text)
+                pos = end
+
+            # Conserver la fin du tampon qui peut contenir une ligne ou une
+            # balise incomplète
+            if eof:
+                keep_from = len(buffer)
+            elif incomplete_row:
+                keep_from = start.start()
+            else:
+                keep_from = buffer.rfind("<", pos)
+                if keep_from == -1:
+                    keep_from = len(buffer)
+            out.append(buffer[pos:keep_from])
+            buffer = buffer[keep_from:]
+            target.write("".join(out).encode("utf-8"))
+            if eof:
+                break
+
+
+def _max_column(dimension: str | None) -> int | None:
+    """Last column (1-based) of a ``<dimension ref>``, or None if unknown."""
+    if not dimension:
+        return None
+    from openpyxl.utils.cell import range_boundaries
+
+    try:
+        return range_boundaries(dimension)[2]
+    except (ValueError, TypeError):
+        return None
+
+
+class PatchedSheet(NamedTuple):
+    """
+    A worksheet patched ahead of time by patch_sheet_to_file.
+
+    Attributes:
+        path: File holding the patched sheet XML
+        new_styles: (original style, colour) of the cell formats the sheet
+            refers to beyond the original ones, in id order
+        rows_scanned: Data rows streamed
+        rows_patched: Rows recoloured
+        cells_patched: Cells restyled
+    """
+
+    path: str
+    new_styles: list
+    rows_scanned: int
+    rows_patched: int
+    cells_patched: int
+
+
+class ColoredCopy(NamedTuple):
+    """
+    Result of write_colored_sheets.
+
+    Attributes:
+        rows_patched: Number of rows recoloured
+        colored_from: Id of the first cell format added by this module
+        colored_styles: (original style, colour) of each cell format added by
+            this module, in id order, including those of earlier patches
+    """
+
+    rows_patched: int
+    colored_from: int
+    colored_styles: list
+
+
+def patch_sheet_to_file(
+    source_path: str,
+    sheet_name: str,
+    row_color: RowColorCallback,
+    target_path: str,
+    row_style: bool = False,
+    column_range: tuple[int, int] | None = None,
+) -> PatchedSheet:
+    """
+    Patch one worksheet of a workbook into a separate file.
+
+    The added cell formats are numbered as if this sheet were the only one
+    recoloured; write_colored_sheets renumbers them when assembling the
+    workbook.
+
+    Args:
+        source_path: Path of the workbook to recolour
+        sheet_name: Name of the worksheet to recolour
+        row_color: Row colour callback, see write_colored_copy
+        target_path: File receiving the patched sheet XML
+        row_style: See write_colored_copy
+        column_range: See write_colored_copy
+
+    Returns:
+        PatchedSheet describing the patched file
+
+    Raises:
+        KeyError: If the sheet does not exist
+        ValueError: If the workbook has no usable styles part
+    """
+    with XlsxPackage(source_path) as package:
+        sheet_part = package.sheet_part(sheet_name)
+        styles_part = package.styles_part
+        if sheet_part is None:
+            raise KeyError(sheet_name)
+        if styles_part is None:
+            raise ValueError("Classeur sans feuille de styles")
+
+        styles = StylePatcher(package.open_part(styles_part).read().decode("utf-8"))
+        patcher = _SheetPatcher(
+            package,
+            styles,
+            row_color,
+            _max_column(package.sheet_dimension(sheet_name)),
+            row_style=row_style,
+            column_range=column_range,
+        )
+        with package.open_part(sheet_part) as src, open(target_path, "wb") as dst:
+            patcher.run(src, dst)
+
+    return PatchedSheet(
+        target_path,
+        styles.new_styles,
+        patcher.rows_scanned,
+        patcher.rows_patched,
+        patcher.cells_patched,
+    )
+
+
+def _renumber_styles(source, target, style_ids: dict[int, int]) -> None:
+    """
+    Stream a sheet XML, replacing the ``s`` attributes of cells and rows.
+
+    Args:
+        source: Readable binary stream of the sheet XML
+        target: Writable binary stream
+        style_ids: Mapping old style id -> new style id
+    """
+
+    def renumber(match):
+        def replace(attr):
+            style_id = int(attr.group(1))
+            return f' s="{style_ids.get(style_id, style_id)}"'
+
+        return _ATTR_S_VALUE_RE.sub(replace, match.group(0), count=1)
+
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    while True:
+        chunk = source.read(CHUNK_SIZE)
+        buffer += decoder.decode(chunk, final=not chunk)
+        # Ne traiter que jusqu'à la dernière balise complète
+        keep_from = len(buffer)
+        if chunk:
+            last_open = buffer.rfind("<")
+            if last_open != -1 and buffer.find(">", last_open) == -1:
+                keep_from = last_open
+        target.write(_STYLED_TAG_RE.sub(renumber, buffer[:keep_from]).encode("utf-8"))
+        buffer = buffer[keep_from:]
+        if not chunk:
+            break
+
+
+def write_colored_copy(
+    source_path: str,
+    output_path: str,
+    sheet_name: str,
+    row_color: RowColorCallback,
+    row_style: bool = False,
+    column_range: tuple[int, int] | None = None,
+    report=NULL_REPORT,
+) -> int:
+    """
+    Write a copy of a workbook with the fills of matched rows rewritten.
+
+    Every part other than the styles and the recoloured worksheet is copied
+    unchanged. Matched rows get each of their cells (up to the last used
+    column) restyled with a solid fill, like the openpyxl writer does.
+
+    Args:
+        source_path: Path of the workbook to recolour
+        output_path: Path of the workbook to write
+        sheet_name: Name of the worksheet to recolour
+        row_color: Callback (row_number, {column_index: (value, style_id)})
+            returning the RGB colour of the row, or None to leave it untouched
+        row_style: Set a row-level style (``customFormat``) on matched rows
+            and restyle only their existing cells instead of filling the row
+            up to the last used column
+        column_range: Optional (first, last) 1-based inclusive column range;
+            cells outside it keep their style
+        report: RunReport receiving the row and cell counters
+
+    Returns:
+        Number of rows recoloured
+
+    Raises:
+        KeyError: If the sheet does not exist
+        ValueError: If the workbook has no usable styles part
+    """
+    return write_colored_sheets(
+        source_path,
+        output_path,
+        {sheet_name: row_color},
+        row_style=row_style,
+        column_range=column_range,
+        report=report,
+    ).rows_patched
+
+
+def write_colored_sheets(
+    source_path: str,
+    output_path: str,
+    row_colors: dict[str, RowColorCallback],
+    row_style: bool = False,
+    column_range: tuple[int, int] | None = None,
+    report=NULL_REPORT,
+    patched: dict[str, PatchedSheet] | None = None,
+    rows: dict[str, set[int]] | None = None,
+    previous_styles: tuple[int, list] | None = None,
+) -> ColoredCopy:
+    """
+    Write a copy of a workbook with several worksheets recoloured.
+
+    Args:
+        source_path: Path of the workbook to recolour
+        output_path: Path of the workbook to write
+        row_colors: Row colour callback of each worksheet patched while the
+            archive is copied (see write_colored_copy)
+        row_style: See write_colored_copy
+        column_range: See write_colored_copy
+        report: RunReport receiving the row and cell counters
+        patched: Worksheets already patched by patch_sheet_to_file, copied
+            from their file with their added cell formats renumbered
+        rows: Optional row numbers to visit in each worksheet of row_colors;
+            the other rows are copied without being parsed
+        previous_styles: (colored_from, colored_styles) of an earlier
+            ColoredCopy when source_path is itself a copy written by this
+            module; its coloured formats are reused and CLEAR_FILL restores
+            the original ones
+
+    Returns:
+        ColoredCopy with the number of rows recoloured and the coloured cell
+        formats of the copy
+
+    Raises:
+        KeyError: If a sheet does not exist
+        ValueError: If the workbook has no usable styles part, or if it does
+            not have the formats of previous_styles
+    """
+    patched = patched or {}
+    rows = rows or {}
+    with XlsxPackage(source_path) as package:
+        styles_part = package.styles_part
+        if styles_part is None:
+            raise ValueError("Classeur sans feuille de styles")
+        sheet_parts = {}
+        for sheet_name in (*row_colors, *patched):
+            sheet_part = package.sheet_part(sheet_name)
+            if sheet_part is None:
+                raise KeyError(sheet_name)
+            sheet_parts[sheet_part] = sheet_name
+
+        styles = StylePatcher(
+            package.open_part(styles_part).read().decode("utf-8"),
+            *(previous_styles or ()),
+        )
+        patchers = {
+            sheet_name: _SheetPatcher(
+                package,
+                styles,
+                row_color,
+                _max_column(package.sheet_dimension(sheet_name)),
+                row_style=row_style,
+                column_range=column_range,
+                rows=rows.get(sheet_name),
+            )
+            for sheet_name, row_color in row_colors.items()
+        }
+
+        with (
+            zipfile.ZipFile(source_path, "r") as zin,
+            zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as zout,
+        ):
+            for info in zin.infolist():
+                if info.filename == styles_part:
+                    continue
+                sheet_name = sheet_parts.get(info.filename)
+                out_info = zipfile.ZipInfo(info.filename, info.date_time)
+                out_info.compress_type = info.compress_type
+                out_info.external_attr = info.external_attr
+                if sheet_name in patched:
+                    _copy_patched_sheet(patched[sheet_name], styles, zout, out_info)
+                    continue
+                # Une feuille recolorée grossit d'une taille inconnue d'avance :
+                # entrée ZIP64 d'office ; une copie garde la taille d'origine
+                force_zip64 = (
+                    sheet_name in patchers or info.file_size > zipfile.ZIP64_LIMIT
+                )
+                with (
+                    zin.open(info) as src,
+                    zout.open(out_info, "w", force_zip64=force_zip64) as dst,
+                ):
+                    if sheet_name in patchers:
+                        patchers[sheet_name].run(src, dst)
+                    else:
+                        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+            # Les styles sont écrits en dernier, une fois toutes les couleurs connues
+            styles_info = zin.getinfo(styles_part)
+            out_info = zipfile.ZipInfo(styles_part, styles_info.date_time)
+            out_info.compress_type = zipfile.ZIP_DEFLATED
+            zout.writestr(out_info, styles.render().encode("utf-8"))
+
+    rows_patched = 0
+    for counters in (*patchers.values(), *patched.values()):
+        report.count(COUNT_TARGET_ROWS, counters.rows_scanned)
+        report.count(COUNT_ROWS_MATCHED, counters.rows_patched)
+        report.count(COUNT_CELLS_PAINTED, counters.cells_patched)
+        rows_patched += counters.rows_patched
+    return ColoredCopy(rows_patched, styles.colored_from, styles.colored_styles)
+
+
+def _copy_patched_sheet(
+    sheet: PatchedSheet, styles: StylePatcher, zout: zipfile.ZipFile, out_info
+) -> None:
+    """Add a sheet patched by patch_sheet_to_file, renumbering its new styles."""
+    base = styles.base_xf_count
+    style_ids = {
+        base + index: styles.style_for(style_id, rvb_color)
+        for index, (style_id, rvb_color) in enumerate(sheet.new_styles)
+    }
+    # Renumérotation possible des styles : taille finale inconnue, ZIP64 d'office
+    with (
+        open(sheet.path, "rb") as src,
+        zout.open(out_info, "w", force_zip64=True) as dst,
+    ):
+        if all(old == new for old, new in style_ids.items()):
+            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        else:
+            _renumber_styles(src, dst, style_ids)
@@ -0,0 +1,494 @@
+"""
+Streaming access to the raw XML parts of an .xlsx workbook.
+
+This module reads only the parts of the archive a caller actually needs
+(workbook, relationships, styles, shared strings and a single worksheet) and
+parses worksheets incrementally, so memory stays bounded by the size of one row
+instead of the size of the whole workbook.
+
+Cell values are decoded the same way openpyxl does with ``data_only=True``, so
+callers can mix both readers and still compare keys.
+"""
+
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from functools import cached_property
+from typing import Iterator, NamedTuple
+
+# Espaces de noms OOXML
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+REL_OFFICE_DOCUMENT = REL_NS + "/officeDocument"
+REL_STYLES = REL_NS + "/styles"
+REL_SHARED_STRINGS = REL_NS + "/sharedStrings"
+REL_THEME = REL_NS + "/theme"
+REL_WORKSHEET = REL_NS + "/worksheet"
+
+DEFAULT_WORKBOOK_PART = "xl/workbook.xml"
+
+_ROW_TAG = f"{{{MAIN_NS}}}row"
+_CELL_TAG = f"{{{MAIN_NS}}}c"
+_VALUE_TAG = f"{{{MAIN_NS}}}v"
+_INLINE_STRING_TAG = f"{{{MAIN_NS}}}is"
+_TEXT_TAG = f"{{{MAIN_NS}}}t"
+_RUN_TAG = f"{{{MAIN_NS}}}r"
+_SHARED_ITEM_TAG = f"{{{MAIN_NS}}}si"
+_SHEET_DATA_TAG = f"{{{MAIN_NS}}}sheetData"
+_DIMENSION_TAG = f"{{{MAIN_NS}}}dimension"
+
+
+class FillSpec(NamedTuple):
+    """Foreground colour of a ``<fill>`` entry of ``xl/styles.xml``."""
+
+    pattern_type: str | None
+    color_type: str
+    color_value: str | int | bool
+    tint: float
+
+
+# Couleur par défaut d'openpyxl lorsqu'un <patternFill> n'a pas de fgColor
+DEFAULT_FILL = FillSpec(None, "rgb", "00000000", 0.0)
+
+
+class StyleTable(NamedTuple):
+    """The subset of ``xl/styles.xml`` needed to resolve cell fills and dates."""
+
+    fills: list[FillSpec]
+    xf_fill_ids: list[int]
+    date_styles: frozenset[int]
+    timedelta_styles: frozenset[int]
+    indexed_colors: tuple[str, ...] | None = None
+
+    def fill_for_style(self, style_id: int) -> FillSpec:
+        """
+        Return the fill referenced by a cell style (``s`` attribute).
+
+        Args:
+            style_id: Index into ``cellXfs``
+
+        Returns:
+            FillSpec of the style, or the default empty fill if out of range
+        """
+        try:
+            return self.fills[self.xf_fill_ids[style_id]]
+        except IndexError:
+            return DEFAULT_FILL
+
+
+def _normalise_rgb(value: str) -> str:
+    """Pad 6-digit RGB values with a ``00`` alpha, as openpyxl does."""
+    if len(value) == 6:
+        return "00" + value
+    return value
+
+
+def _parse_color(element: ET.Element | None) -> tuple[str, str | int | bool, float]:
+    """
+    Decode a ``<fgColor>``-like element with openpyxl's precedence rules.
+
+    Args:
+        element: Colour element or None
+
+    Returns:
+        Tuple of (color_type, value, tint)
+    """
+    if element is None:
+        return "rgb", "00000000", 0.0
+    attrib = element.attrib
+    tint = float(attrib.get("tint", 0.0))
+    if "indexed" in attrib:
+        return "indexed", int(attrib["indexed"]), tint
+    if "theme" in attrib:
+        return "theme", int(attrib["theme"]), tint
+    if "auto" in attrib:
+        return "auto", attrib["auto"] in ("1", "true"), tint
+    return "rgb", _normalise_rgb(attrib.get("rgb", "00000000")), tint
+
+
+def _text_content(element: ET.Element) -> str:
+    """Concatenate the plain and rich-text runs of a string item (no phonetics)."""
+    snippets = []
+    for child in element:
+        if child.tag == _TEXT_TAG:
+            snippets.append(child.text or "")
+        elif child.tag == _RUN_TAG:
+            text = child.find(_TEXT_TAG)
+            if text is not None:
+                snippets.append(text.text or "")
+    return "".join(snippets)
+
+
+def _cast_number(value: str) -> int | float:
+    """Convert a numeric cell value to int or float like openpyxl."""
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+class XlsxPackage:
+    """
+    Read-only, lazily parsed view over an .xlsx archive.
+
+    The archive is opened once; each part is only read the first time it is
+    needed. Use it as a context manager to release the file handle.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._zip = zipfile.ZipFile(file_path, "r")
+        self._names = set(self._zip.namelist())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self) -> None:
+        """Close the underlying zip file."""
+        self._zip.close()
+
+    def has_part(self, part: str) -> bool:
+        """Return True if the archive contains ``part``."""
+        return part in self._names
+
+    def open_part(self, part: str):
+        """Open a part of the archive as a binary stream."""
+        return self._zip.open(part)
+
+    def part_checksum(self, part: str) -> tuple[int, int]:
+        """
+        Return the CRC-32 and size of a part, read from the zip directory.
+
+        Args:
+            part: Path of the part in the archive
+
+        Returns:
+            Tuple (CRC-32, uncompressed size); the part is not decompressed
+        """
+        info = self._zip.getinfo(part)
+        return info.CRC, info.file_size
+
+    def _relationships(self, part: str) -> dict[str, tuple[str, str]]:
+        """
+        Read the relationships of a part.
+
+        Args:
+            part: Path of the part inside the archive (e.g. 'xl/workbook.xml')
+
+        Returns:
+            Dict {relationship_id: (type, absolute_target_path)}
+        """
+        folder, name = posixpath.split(part)
+        rels_part = posixpath.join(folder, "_rels", f"{name}.rels")
+        rels: dict[str, tuple[str, str]] = {}
+        if rels_part not in self._names:
+            return rels
+        root = ET.fromstring(self._zip.read(rels_part))
+        for rel in root.iter(f"{{{PKG_REL_NS}}}Relationship"):
+            if rel.get("TargetMode") == "External":
+                continue
+            target = rel.get("Target", "")
+            if target.startswith("/"):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(posixpath.join(folder, target))
+            rels[rel.get("Id", "")] = (rel.get("Type", ""), target)
+        return rels
+
+    @cached_property
+    def workbook_part(self) -> str:
+        """Path of the workbook part, resolved through the package relationships."""
+        for rel_type, target in self._relationships("").values():
+            if rel_type == REL_OFFICE_DOCUMENT:
+                return target
+        return DEFAULT_WORKBOOK_PART
+
+    @cached_property
+    def _workbook_rels(self) -> dict[str, tuple[str, str]]:
+        return self._relationships(self.workbook_part)
+
+    def _workbook_part_of_type(self, rel_type: str) -> str | None:
+        for target_type, target in self._workbook_rels.values():
+            if target_type == rel_type and target in self._names:
+                return target
+        return None
+
+    @cached_property
+    def _workbook_root(self) -> ET.Element:
+        return ET.fromstring(self._zip.read(self.workbook_part))
+
+    @cached_property
+    def sheets(self) -> list[tuple[str, str | None]]:
+        """
+        List the sheets declared in the workbook, in tab order.
+
+        Returns:
+            List of (sheet_name, worksheet_part) tuples. The part is None for
+            sheets that are not worksheets (e.g. chartsheets).
+        """
+        sheets = []
+        rels = self._workbook_rels
+        for sheet in self._workbook_root.iter(f"{{{MAIN_NS}}}sheet"):
+            rel_type, target = rels.get(sheet.get(f"{{{REL_NS}}}id", ""), ("", ""))
+            part = target if rel_type == REL_WORKSHEET else None
+            sheets.append((sheet.get("name", ""), part))
+        return sheets
+
+    @property
+    def sheet_names(self) -> list[str]:
+        """Names of all sheets of the workbook, in tab order."""
+        return [name for name, _part in self.sheets]
+
+    def sheet_part(self, sheet_name: str) -> str | None:
+        """
+        Resolve the worksheet part of a sheet.
+
+        Args:
+            sheet_name: Name of the sheet
+
+        Returns:
+            Path of the worksheet XML inside the archive, or None
+        """
+        for name, part in self.sheets:
+            if name == sheet_name:
+                return part
+        return None
+
+    @cached_property
+    def epoch(self):
+        """Date epoch of the workbook (1900 or 1904 date system)."""
+        pr = self._workbook_root.find(f"{{{MAIN_NS}}}workbookPr")
+        if pr is not None and pr.get("date1904") in ("1", "true"):
+            return self._dates.CALENDAR_MAC_1904
+        return self._dates.WINDOWS_EPOCH
+
+    @cached_property
+    def _dates(self):
+        """openpyxl's date helpers, imported once the first date is decoded."""
+        from openpyxl.utils import datetime
+
+        return datetime
+
+    @cached_property
+    def styles_part(self) -> str | None:
+        """Path of ``xl/styles.xml`` (or equivalent), if the workbook has one."""
+        return self._workbook_part_of_type(REL_STYLES)
+
+    @cached_property
+    def theme_part(self) -> str | None:
+        """Path of the workbook theme part, if any."""
+        return self._workbook_part_of_type(REL_THEME)
+
+    @cached_property
+    def shared_strings_part(self) -> str | None:
+        """Path of the shared string table part, if the workbook has one."""
+        return self._workbook_part_of_type(REL_SHARED_STRINGS)
+
+    @cached_property
+    def shared_strings(self) -> list[str]:
+        """Shared string table, decoded like openpyxl's ``read_string_table``."""
+        strings: list[str] = []
+        part = self.shared_strings_part
+        if part is None:
+            return strings
+        with self._zip.open(part) as source:
+            for _event, node in ET.iterparse(source):
+                if node.tag == _SHARED_ITEM_TAG:
+                    strings.append(_text_content(node).replace("x005F_", ""))
+                    node.clear()
+        return strings
+
+    @cached_property
+    def styles(self) -> StyleTable:
+        """Fills, cell formats and date styles of the workbook."""
+        from openpyxl.styles.numbers import (
+            builtin_format_code,
+            is_date_format,
+            is_timedelta_format,
+        )
+
+        part = self.styles_part
+        if part is None:
+            return StyleTable([], [], frozenset(), frozenset())
+        root = ET.fromstring(self._zip.read(part))
+
+        fills = []
+        fills_node = root.find(f"{{{MAIN_NS}}}fills")
+        if fills_node is not None:
+            for fill in fills_node.findall(f"{{{MAIN_NS}}}fill"):
+                pattern = fill.find(f"{{{MAIN_NS}}}patternFill")
+                if pattern is None:
+                    # Les dégradés n'ont pas de couleur de fond unique
+                    fills.append(FillSpec("gradient", "rgb", "00000000", 0.0))
+                    continue
+                pattern_type = pattern.get("patternType")
+                if pattern_type == "none":
+                    pattern_type = None
+                color_type, value, tint = _parse_color(
+                    pattern.find(f"{{{MAIN_NS}}}fgColor")
+                )
+                fills.append(FillSpec(pattern_type, color_type, value, tint))
+
+        custom_formats = {}
+        num_fmts = root.find(f"{{{MAIN_NS}}}numFmts")
+        if num_fmts is not None:
+            for num_fmt in num_fmts.findall(f"{{{MAIN_NS}}}numFmt"):
+                custom_formats[int(num_fmt.get("numFmtId", 0))] = num_fmt.get(
+                    "formatCode", ""
+                )
+
+        xf_fill_ids = []
+        date_styles = set()
+        timedelta_styles = set()
+        cell_xfs = root.find(f"{{{MAIN_NS}}}cellXfs")
+        if cell_xfs is not None:
+            for idx, xf in enumerate(cell_xfs.findall(f"{{{MAIN_NS}}}xf")):
+                xf_fill_ids.append(int(xf.get("fillId", 0)))
+                num_fmt_id = int(xf.get("numFmtId", 0))
+                if num_fmt_id in custom_formats:
+                    fmt = custom_formats[num_fmt_id]
+                else:
+                    fmt = builtin_format_code(num_fmt_id)
+                if is_date_format(fmt):
+                    date_styles.add(idx)
+                if is_timedelta_format(fmt):
+                    timedelta_styles.add(idx)
+
+        # Palette indexée personnalisée (<colors><indexedColors>), si présente
+        indexed_colors = None
+        indexed_node = root.find(f"{{{MAIN_NS}}}colors/{{{MAIN_NS}}}indexedColors")
+        if indexed_node is not None:
+            indexed_colors = tuple(
+                _normalise_rgb(color.get("rgb", "00000000"))
+                for color in indexed_node.findall(f"{{{MAIN_NS}}}rgbColor")
+            )
+
+        return StyleTable(
+            fills,
+            xf_fill_ids,
+            frozenset(date_styles),
+            frozenset(timedelta_styles),
+            indexed_colors,
+        )
+
+    def sheet_dimension(self, sheet_name: str) -> str | None:
+        """
+        Read the ``<dimension ref>`` of a worksheet without parsing its rows.
+
+        Args:
+            sheet_name: Name of the sheet
+
+        Returns:
+            The dimension reference (e.g. 'A1:K200') or None if absent
+        """
+        part = self.sheet_part(sheet_name)
+        if part is None:
+            return None
+        with self._zip.open(part) as source:
+            # Évènements « start » : s'arrêter dès l'ouverture de <sheetData>,
+            # sans attendre sa fermeture quand la feuille n'a pas de <dimension>
+            for _event, element in ET.iterparse(source, events=("start",)):
+                if element.tag == _DIMENSION_TAG:
+                    return element.get("ref")
+                if element.tag == _SHEET_DATA_TAG:
+                    break
+        return None
+
+    def cell_value(self, cell: ET.Element, style_id: int):
+        """
+        Decode the cached value of a ``<c>`` element (openpyxl ``data_only``).
+
+        Args:
+            cell: The cell element
+            style_id: Parsed ``s`` attribute of the cell
+
+        Returns:
+            The cell value (str, int, float, bool, datetime...) or None
+        """
+        data_type = cell.get("t", "n")
+        if data_type == "inlineStr":
+            child = cell.find(_INLINE_STRING_TAG)
+            if child is None:
+                return None
+            return _text_content(child)
+
+        value = cell.findtext(_VALUE_TAG, None) or None
+        if value is None:
+            return None
+        if data_type == "n":
+            value = _cast_number(value)
+            styles = self.styles
+            if style_id in styles.date_styles:
+                try:
+                    return self._dates.from_excel(
+                        value,
+                        self.epoch,
+                        timedelta=style_id in styles.timedelta_styles,
+                    )
+                except (OverflowError, ValueError):
+                    return "#VALUE!"
+            return value
+        if data_type == "s":
+            return self.shared_strings[int(value)]
+        if data_type == "b":
+            return bool(int(value))
+        if data_type == "d":
+            return self._dates.from_ISO8601(value)
+        return value
+
+    def iter_rows(
+        self, sheet_name: str, columns: set[int] | None = None
+    ) -> Iterator[tuple[int, dict[int, tuple[object, int]]]]:
+        """
+        Stream the rows of a worksheet.
+
+        Args:
+            sheet_name: Name of the sheet
+            columns: Optional set of 0-based column indices to decode; other
+                cells are skipped without resolving their value
+
+        Yields:
+            Tuples (row_number, {column_index: (value, style_id)}) with 1-based
+            row numbers and 0-based column indices
+        """
+        from openpyxl.utils.cell import coordinate_to_tuple
+
+        part = self.sheet_part(sheet_name)
+        if part is None:
+            return
+        row_counter = 0
+        with self._zip.open(part) as source:
+            sheet_data = None
+            for event, element in ET.iterparse(source, events=("start", "end")):
+                if event == "start":
+                    if element.tag == _SHEET_DATA_TAG:
+                        sheet_data = element
+                    continue
+                if element.tag != _ROW_TAG:
+                    continue
+
+                row_attr = element.get("r")
+                row_counter = int(row_attr) if row_attr else row_counter + 1
+                col_counter = 0
+                cells: dict[int, tuple[object, int]] = {}
+                for cell in element.iter(_CELL_TAG):
+                    coordinate = cell.get("r")
+                    if coordinate:
+                        col_counter = coordinate_to_tuple(coordinate)[1]
+                    else:
+                        col_counter += 1
+                    column = col_counter - 1
+                    if columns is not None and column not in columns:
+                        continue
+                    style_id = int(cell.get("s", 0) or 0)
+                    cells[column] = (self.cell_value(cell, style_id), style_id)
+
+                yield row_counter, cells
+                # Libérer les lignes déjà traitées pour garder une mémoire bornée
+                element.clear()
+                if sheet_data is not None:
+                    sheet_data.clear()
@@ -0,0 +1,169 @@
+"""Fixtures partagées : petits classeurs source/cible écrits dans tmp_path."""
+
+import re
+import zipfile
+from xml.sax.saxutils import escape, unescape
+
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import PatternFill
+
+from colorexcel import cache, results
+from colorexcel.cache import CACHE_DIR_ENV
+
+SOURCE_SHEET = "Source"
+TARGET_SHEET = "Cible"
+
+RED = (255, 0, 0)
+GREEN = (0, 176, 80)
+BLUE = (0, 112, 192)
+
+
+def _fill(rvb_color) -> PatternFill:
+    return PatternFill("solid", fgColor="FF%02X%02X%02X" % rvb_color)
+
+
+def write_source(path, rows) -> str:
+    """
+    Écrit un classeur source dont la colonne Implantation est colorée.
+
+    Args:
+        path: Chemin du classeur
+        rows: Liste de (implantation, nom, prénom, couleur RGB ou None)
+
+    Returns:
+        Chemin du classeur, en texte
+    """
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = SOURCE_SHEET
+    sheet.append(["Id", "Implantation", "Nom", "Prénom"])
+    for index, (implantation, nom, prenom, rvb_color) in enumerate(rows, start=1):
+        sheet.append([index, implantation, nom, prenom])
+        if rvb_color is not None:
+            sheet.cell(row=index + 1, column=2).fill = _fill(rvb_color)
+    workbook.save(path)
+    return str(path)
+
+
+def use_shared_strings(path) -> None:
+    """
+    Réécrit les textes en ligne d'un classeur openpyxl en chaînes partagées.
+
+    openpyxl écrit les textes dans la feuille (``inlineStr``), Excel dans
+    ``xl/sharedStrings.xml`` : la feuille ne contient alors que des indices.
+
+    Args:
+        path: Chemin du classeur, réécrit sur place
+    """
+    with zipfile.ZipFile(path) as source:
+        parts = {info.filename: source.read(info) for info in source.infolist()}
+    strings: list[str] = []
+
+    def shared(match):
+        text = unescape(match.group(2))
+        if text not in strings:
+            strings.append(text)
+        return f'{match.group(1)}t="s"><v>{strings.index(text)}</v></c>'
+
+    sheet = "xl/worksheets/sheet1.xml"
+    parts[sheet] = re.sub(
+        r'(<c [^>]*)t="inlineStr"><is><t>([^<]*)</t></is></c>',
+        shared,
+        parts[sheet].decode("utf-8"),
+    ).encode("utf-8")
+    items = "".join(f"<si><t>{escape(text)}</t></si>" for text in strings)
+    parts["xl/sharedStrings.xml"] = (
+        '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        f'count="{len(strings)}" uniqueCount="{len(strings)}">{items}</sst>'
+    ).encode()
+    parts["xl/_rels/workbook.xml.rels"] = parts["xl/_rels/workbook.xml.rels"].replace(
+        b"</Relationships>",
+        b'<Relationship Id="rIdShared" Target="sharedStrings.xml" Type="http://'
+        b"schemas.openxmlformats.org/officeDocument/2006/relationships/"
+        b'sharedStrings"/></Relationships>',
+    )
+    parts["[Content_Types].xml"] = parts["[Content_Types].xml"].replace(
+        b"</Types>",
+        b'<Override PartName="/xl/sharedStrings.xml" ContentType="application/'
+        b"vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"
+        b'"/></Types>',
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as output:
+        for name, content in parts.items():
+            output.writestr(name, content)
+
+
+def write_target(path, rows) -> str:
+    """
+    Écrit un classeur cible, colonnes clés dans un autre ordre que la source.
+
+    Args:
+        path: Chemin du classeur
+        rows: Liste de (implantation, nom, prénom)
+
+    Returns:
+        Chemin du classeur, en texte
+    """
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = TARGET_SHEET
+    sheet.append(["Prénom", "Nom", "Implantation", "Note"])
+    for index, (implantation, nom, prenom) in enumerate(rows, start=1):
+        sheet.append([prenom, nom, implantation, index])
+    workbook.save(path)
+    return str(path)
+
+
+def read_fills(path, sheet_name: str = TARGET_SHEET) -> dict:
+    """
+    Relève les couleurs de remplissage d'une feuille.
+
+    Returns:
+        Dictionnaire (ligne, colonne) -> code ARGB, pour les cellules au
+        remplissage plein
+    """
+    sheet = load_workbook(path)[sheet_name]
+    fills = {}
+    for row in sheet.iter_rows():
+        for cell in row:
+            if cell.fill.fill_type == "solid":
+                fills[cell.row, cell.column] = cell.fill.fgColor.rgb
+    return fills
+
+
+SOURCE_ROWS = [
+    ("Wavre", "Dupont", "Jean", RED),
+    ("Wavre", "Martin", "Claire", GREEN),
+    ("Nivelles", "Lambert", "Marc", BLUE),
+    ("Nivelles", "Leroy", "Anne", None),
+    ("Tubize", "Dubois", "Luc", RED),
+]
+
+TARGET_ROWS = [
+    ("Nivelles", "Lambert", "Marc"),
+    ("Wavre", "Dupont", "Jean"),
+    ("Wavre", "Absent", "Paul"),
+    ("Tubize", "Dubois", "Luc"),
+    ("Nivelles", "Leroy", "Anne"),
+]
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """Redirige les caches persistants vers tmp_path, hors du dossier utilisateur."""
+    monkeypatch.setenv(CACHE_DIR_ENV, str(tmp_path / "cache"))
+    monkeypatch.setattr(cache, "_default_cache", None)
+    monkeypatch.setattr(results, "_default_cache", None)
+
+
+@pytest.fixture
+def source_path(tmp_path):
+    """Classeur source de SOURCE_ROWS."""
+    return write_source(tmp_path / "source.xlsx", SOURCE_ROWS)
+
+
+@pytest.fixture
+def target_path(tmp_path):
+    """Classeur cible de TARGET_ROWS."""
+    return write_target(tmp_path / "cible.xlsx", TARGET_ROWS)
@@ -0,0 +1,85 @@
+"""Tests du cache persistant des cartes de couleurs."""
+
+import os
+
+from colorexcel import logic
+from colorexcel.cache import ColorMapCache, default_cache
+from colorexcel.colormap import ColorMap
+from colorexcel.logic import get_implantation_colors
+
+from .conftest import BLUE, GREEN, RED, SOURCE_SHEET
+
+
+def _colors():
+    return ColorMap(
+        [
+            (("Wavre", "Dupont", "Jean"), RED),
+            (("Nivelles", "Lambert", "Marc"), BLUE),
+        ]
+    )
+
+
+def test_hit_returns_stored_map(tmp_path, source_path):
+    cache = ColorMapCache(directory=tmp_path / "couleurs")
+    assert cache.get(source_path, SOURCE_SHEET) is None
+
+    cache.put(source_path, SOURCE_SHEET, _colors())
+
+    assert cache.contains(source_path, SOURCE_SHEET)
+    assert dict(cache.get(source_path, SOURCE_SHEET).items()) == dict(_colors().items())
+    assert cache.get(source_path, "Autre feuille") is None
+
+
+def test_miss_after_mtime_or_size_change(tmp_path, source_path):
+    cache = ColorMapCache(directory=tmp_path / "couleurs")
+    cache.put(source_path, SOURCE_SHEET, _colors())
+    stat = os.stat(source_path)
+
+    os.utime(source_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.get(source_path, SOURCE_SHEET) is None
+
+    cache.put(source_path, SOURCE_SHEET, _colors())
+    with open(source_path, "ab") as file:
+        file.write(b"\0")
+    os.utime(source_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.get(source_path, SOURCE_SHEET) is None
+
+
+def test_lru_eviction_under_budget(tmp_path):
+    directory = tmp_path / "couleurs"
+    sources = []
+    for name in ("ancien", "moyen", "recent"):
+        path = tmp_path / f"{name}.xlsx"
+        path.write_bytes(b"")
+        sources.append(str(path))
+    big = ColorMap(((f"Implantation{i}", f"Nom{i}", "Jean"), GREEN) for i in range(50))
+    probe = ColorMapCache(directory=tmp_path / "mesure")
+    probe.put(sources[0], SOURCE_SHEET, big)
+    entry_size = sum(entry.stat().st_size for entry in probe.directory.iterdir())
+
+    cache = ColorMapCache(directory=directory, max_bytes=2 * entry_size)
+    for index, source in enumerate(sources):
+        cache.put(source, SOURCE_SHEET, big)
+        entry = cache._entry_path(cache.key(source, SOURCE_SHEET))
+        os.utime(entry, ns=(index * 10**9, index * 10**9))
+        if index == 1:
+            # Lecture : l'entrée la plus ancienne redevient la plus récente
+            assert cache.get(sources[0], SOURCE_SHEET) is not None
+    cache.evict()
+
+    assert cache.contains(sources[0], SOURCE_SHEET)
+    assert not cache.contains(sources[1], SOURCE_SHEET)
+    assert cache.contains(sources[2], SOURCE_SHEET)
+
+
+def test_use_cache_skips_extraction(source_path, monkeypatch):
+    extracted = get_implantation_colors(source_path, SOURCE_SHEET, use_cache=True)
+    assert default_cache().contains(source_path, SOURCE_SHEET)
+
+    def engine(*args):
+        raise AssertionError("source relue malgré le cache")
+
+    monkeypatch.setitem(logic.SOURCE_ENGINES, logic.ENGINE_OPENPYXL, engine)
+    cached = get_implantation_colors(source_path, SOURCE_SHEET, use_cache=True)
+
+    assert dict(cached.items()) == dict(extracted.items())
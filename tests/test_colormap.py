@@ -0,0 +1,24 @@
+"""Tests de la table compacte des couleurs (ColorMap)."""
+
+from colorexcel.colormap import ColorMap
+
+from .conftest import BLUE, GREEN, RED
+
+
+def test_bytes_roundtrip():
+    color_map = ColorMap()
+    color_map[("Wavre", "Dupont", "Jean")] = RED
+    color_map[("Wavre", "Martin", "Claire")] = GREEN
+    color_map[("Nivelles", 12, None)] = BLUE
+    color_map[("Tubize", "Dubois", 3.5)] = RED
+    del color_map[("Wavre", "Martin", "Claire")]
+
+    restored = ColorMap.from_bytes(color_map.to_bytes())
+
+    assert dict(restored.items()) == dict(color_map.items())
+    assert len(restored) == 3
+    assert restored.get(("Wavre", "Martin", "Claire")) is None
+
+
+def test_empty_map_roundtrip():
+    assert len(ColorMap.from_bytes(ColorMap().to_bytes())) == 0
@@ -0,0 +1,70 @@
+"""Tests des statistiques du mode simulation (dry_run)."""
+
+from colorexcel.dryrun import dry_run
+from colorexcel.matching import (
+    MATCH_EXACT,
+    MATCH_FUZZY,
+    MATCH_NORMALIZED,
+    NORMALIZATIONS,
+)
+
+from .conftest import (
+    GREEN,
+    RED,
+    SOURCE_SHEET,
+    TARGET_SHEET,
+    write_source,
+    write_target,
+)
+
+
+def test_normalized_only_match_uses_source_key(tmp_path):
+    source = write_source(tmp_path / "source.xlsx", [("Wavre", "Dupont", "Jean", RED)])
+    target = write_target(tmp_path / "cible.xlsx", [("wavre", " DUPONT ", "jean")])
+
+    stats = dry_run(
+        source,
+        SOURCE_SHEET,
+        target,
+        TARGET_SHEET,
+        normalization=NORMALIZATIONS["standard"],
+    )
+
+    assert stats.matched[MATCH_EXACT] == 0
+    assert stats.matched[MATCH_NORMALIZED] == 1
+    assert stats.source_keys_unused == 0
+
+
+def test_fuzzy_only_match_uses_source_key(tmp_path):
+    source = write_source(
+        tmp_path / "source.xlsx",
+        [("Wavre", "Dupont", "Jean", RED), ("Wavre", "Martin", "Claire", GREEN)],
+    )
+    target = write_target(tmp_path / "cible.xlsx", [("Wavre", "Dupond", "Jean")])
+
+    stats = dry_run(source, SOURCE_SHEET, target, TARGET_SHEET, fuzzy=True)
+
+    assert stats.matched[MATCH_EXACT] == 0
+    assert stats.matched[MATCH_FUZZY] == 1
+    assert stats.source_keys_unused == 1
+
+
+def test_counts(source_path, target_path, tmp_path):
+    csv_path = tmp_path / "rapport.csv"
+
+    stats = dry_run(
+        source_path, SOURCE_SHEET, target_path, TARGET_SHEET, csv_path=str(csv_path)
+    )
+
+    assert stats.source_entries == 4
+    assert stats.source_keys == 4
+    assert stats.source_duplicates == 0
+    assert stats.source_conflicts == 0
+    assert stats.target_rows == 5
+    assert stats.target_rows_without_key == 0
+    assert stats.matched[MATCH_EXACT] == 3
+    # Clé absente de la source et clé source sans couleur
+    assert stats.rows_unmatched == 2
+    # ("Wavre", "Martin", "Claire") n'apparaît pas dans la cible
+    assert stats.source_keys_unused == 1
+    assert csv_path.exists()
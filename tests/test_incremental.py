@@ -0,0 +1,78 @@
+"""Tests du mode incrémental : une mise à jour égale une exécution complète."""
+
+import logging
+
+from colorexcel.incremental import manifest_path, source_checksum
+from colorexcel.logic import WRITER_XML, apply_colors_to_file2
+
+from .conftest import (
+    BLUE,
+    GREEN,
+    RED,
+    SOURCE_ROWS,
+    SOURCE_SHEET,
+    TARGET_SHEET,
+    read_fills,
+    use_shared_strings,
+    write_source,
+    write_target,
+)
+
+
+def _run(source, target, output, incremental):
+    return apply_colors_to_file2(
+        source,
+        SOURCE_SHEET,
+        target,
+        TARGET_SHEET,
+        writer=WRITER_XML,
+        use_cache=False,
+        output_path=str(output),
+        incremental=incremental,
+        use_result_cache=False,
+    )
+
+
+def test_incremental_rerun_matches_full_run(tmp_path, source_path, target_path, caplog):
+    output = tmp_path / "incremental.xlsx"
+    assert _run(source_path, target_path, output, incremental=True)
+    assert (tmp_path / manifest_path(output.name)).exists()
+
+    # Couleur changée, couleur retirée et couleur ajoutée
+    changed = [
+        ("Wavre", "Dupont", "Jean", GREEN),
+        ("Wavre", "Martin", "Claire", GREEN),
+        ("Nivelles", "Lambert", "Marc", None),
+        ("Nivelles", "Leroy", "Anne", BLUE),
+        ("Tubize", "Dubois", "Luc", RED),
+    ]
+    assert [row[:3] for row in changed] == [row[:3] for row in SOURCE_ROWS]
+    source = write_source(tmp_path / "source.xlsx", changed)
+    with caplog.at_level(logging.INFO, logger="colorexcel.incremental"):
+        assert _run(source, target_path, output, incremental=True)
+    assert "Mise à jour incrémentale : 3 lignes à recolorer" in caplog.text
+
+    full = _run(source, target_path, tmp_path / "complet.xlsx", incremental=False)
+    assert read_fills(output) == read_fills(full)
+
+
+def test_renamed_shared_string_key_is_recoloured(tmp_path):
+    # Texte des clés dans xl/sharedStrings.xml : la feuille reste identique
+    source = write_source(tmp_path / "source.xlsx", [("Wavre", "Dupont", "Jean", RED)])
+    use_shared_strings(source)
+    target = write_target(
+        tmp_path / "cible.xlsx",
+        [("Wavre", "Dupont", "Jean"), ("Wavre", "Durand", "Jean")],
+    )
+    output = tmp_path / "incremental.xlsx"
+    assert _run(source, target, output, incremental=True)
+    checksum = source_checksum(source, SOURCE_SHEET)
+
+    write_source(tmp_path / "source.xlsx", [("Wavre", "Durand", "Jean", RED)])
+    use_shared_strings(source)
+    assert source_checksum(source, SOURCE_SHEET) != checksum
+    assert _run(source, target, output, incremental=True)
+
+    full = _run(source, target, tmp_path / "complet.xlsx", incremental=False)
+    assert set(read_fills(full)) == {(3, 1), (3, 2), (3, 3), (3, 4)}
+    assert read_fills(output) == read_fills(full)
@@ -0,0 +1,174 @@
+"""Tests de la file des travaux du service et de la lecture de leurs options."""
+
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from colorexcel.jobs import (
+    CANCEL_NAME,
+    STATE_CANCELLED,
+    STATE_DONE,
+    STATE_TIMEOUT,
+    JobQueue,
+    QueueFull,
+    run_job,
+)
+from colorexcel.logic import PAINT_CELLS, PAINT_ROW, WRITER_OPENPYXL, WRITER_XML
+from colorexcel.matching import DEFAULT_FUZZY_THRESHOLD, MATCH_EXACT
+from colorexcel.service import parse_job_options
+
+from .conftest import SOURCE_SHEET, TARGET_SHEET, read_fills
+
+
+def _upload(path):
+    return Path(path).name, Path(path).read_bytes()
+
+
+def _wait(job, timeout=120):
+    deadline = time.monotonic() + timeout
+    while job.finished is None:
+        assert time.monotonic() < deadline, "travail non terminé"
+        time.sleep(0.05)
+
+
+def _run_job(tmp_path, source_path, target_path, **options):
+    job_dir = tmp_path / "travail"
+    job_dir.mkdir(exist_ok=True)
+    return run_job(
+        str(job_dir),
+        source_path,
+        SOURCE_SHEET,
+        target_path,
+        TARGET_SHEET,
+        str(job_dir / "sortie.xlsx"),
+        **options,
+    )
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(work_dir=tmp_path / "travaux", workers=1, max_queued=0)
+    yield queue
+    queue.close()
+
+
+def test_backpressure_and_result(queue, source_path, target_path):
+    job = queue.submit(
+        _upload(source_path), SOURCE_SHEET, _upload(target_path), [TARGET_SHEET]
+    )
+    assert queue.full
+    with pytest.raises(QueueFull):
+        queue.submit(
+            _upload(source_path), SOURCE_SHEET, _upload(target_path), [TARGET_SHEET]
+        )
+    # Travail refusé : aucun dossier laissé derrière lui
+    assert os.listdir(queue.work_dir) == [job.id]
+
+    _wait(job)
+
+    assert job.state == STATE_DONE, job.error
+    assert {row for row, _column in read_fills(job.output)} == {2, 3, 5}
+    assert not queue.full
+
+
+def test_cancel_queued_or_running_job(tmp_path, source_path, target_path):
+    queue = JobQueue(work_dir=tmp_path / "travaux", workers=1, max_queued=1)
+    try:
+        jobs = [
+            queue.submit(
+                _upload(source_path),
+                SOURCE_SHEET,
+                _upload(target_path),
+                [TARGET_SHEET],
+            )
+            for _ in range(2)
+        ]
+        description = queue.cancel(jobs[1].id)
+        assert description["cancel_requested"]
+        for job in jobs:
+            _wait(job)
+    finally:
+        queue.close()
+
+    assert jobs[0].state == STATE_DONE
+    assert jobs[1].state == STATE_CANCELLED
+    assert jobs[1].output is None
+
+
+def test_submit_rejects_invalid_uploads(queue, source_path, target_path):
+    with pytest.raises(ValueError):
+        queue.submit(("source.csv", b""), SOURCE_SHEET, _upload(target_path))
+    with pytest.raises(ValueError):
+        queue.submit(_upload(source_path), "Absente", _upload(target_path))
+    assert os.listdir(queue.work_dir) == []
+
+
+def test_run_job_timeout(tmp_path, source_path, target_path):
+    state, output, error, _seconds = _run_job(
+        tmp_path, source_path, target_path, timeout=1e-9
+    )
+
+    assert state == STATE_TIMEOUT
+    assert output is None
+    assert error
+
+
+def test_run_job_cancel_file(tmp_path, source_path, target_path):
+    # Fichier d'annulation déposé par le service avant le démarrage du travail
+    (tmp_path / "travail").mkdir()
+    (tmp_path / "travail" / CANCEL_NAME).touch()
+
+    state, output, _error, _seconds = _run_job(tmp_path, source_path, target_path)
+
+    assert (state, output) == (STATE_CANCELLED, None)
+
+
+def test_parse_job_options_defaults():
+    assert parse_job_options({}) == {
+        "writer": WRITER_XML,
+        "paint_mode": PAINT_CELLS,
+        "column_range": None,
+        "normalize": MATCH_EXACT,
+        "fuzzy": False,
+        "fuzzy_threshold": DEFAULT_FUZZY_THRESHOLD,
+    }
+
+
+def test_parse_job_options_values():
+    options = parse_job_options(
+        {
+            "writer": [WRITER_OPENPYXL],
+            "paint_mode": [PAINT_ROW],
+            "columns": ["A:C"],
+            "normalize": ["accents"],
+            "fuzzy": ["oui"],
+            "fuzzy_threshold": ["0.9"],
+        }
+    )
+
+    assert options == {
+        "writer": WRITER_OPENPYXL,
+        "paint_mode": PAINT_ROW,
+        "column_range": (1, 3),
+        "normalize": "accents",
+        "fuzzy": True,
+        "fuzzy_threshold": 0.9,
+    }
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        {"writer": ["pandas"]},
+        {"paint_mode": ["colonne"]},
+        {"normalize": ["phonétique"]},
+        {"columns": ["C:A"]},
+        {"fuzzy_threshold": ["beaucoup"]},
+        {"fuzzy_threshold": ["1.5"]},
+    ],
+)
+def test_parse_job_options_rejects(fields):
+    with pytest.raises(ValueError):
+        parse_job_options(fields)
@@ -0,0 +1,205 @@
+"""Tests des moteurs d'extraction et des modes d'écriture."""
+
+import io
+import zipfile
+
+import pytest
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import PatternFill
+from openpyxl.styles.colors import Color
+
+from colorexcel import logic
+from colorexcel.logic import (
+    ENGINE_OPENPYXL,
+    ENGINE_READONLY,
+    ENGINE_XML,
+    PAINT_CELLS,
+    PAINT_ROW,
+    WRITER_OPENPYXL,
+    WRITER_XML,
+    THEME_SCHEME_ORDER,
+    _indexed_color,
+    apply_color_map_to_bytes,
+    apply_colors_to_file2,
+    apply_tint,
+    extract_theme_colors,
+    get_implantation_colors,
+    hex_to_rvb,
+)
+
+from .conftest import (
+    BLUE,
+    GREEN,
+    RED,
+    SOURCE_SHEET,
+    TARGET_SHEET,
+    read_fills,
+)
+
+
+def test_engines_return_the_same_map(source_path):
+    maps = {
+        engine: dict(get_implantation_colors(source_path, SOURCE_SHEET, engine))
+        for engine in (ENGINE_OPENPYXL, ENGINE_READONLY, ENGINE_XML)
+    }
+
+    assert maps[ENGINE_OPENPYXL] == {
+        ("Wavre", "Dupont", "Jean"): RED,
+        ("Wavre", "Martin", "Claire"): GREEN,
+        ("Nivelles", "Lambert", "Marc"): BLUE,
+        ("Tubize", "Dubois", "Luc"): RED,
+    }
+    assert maps[ENGINE_READONLY] == maps[ENGINE_OPENPYXL]
+    assert maps[ENGINE_XML] == maps[ENGINE_OPENPYXL]
+
+
+@pytest.mark.parametrize("paint_mode", [PAINT_CELLS, PAINT_ROW])
+def test_writers_colour_the_same_cells(tmp_path, source_path, target_path, paint_mode):
+    fills = {}
+    for writer in (WRITER_OPENPYXL, WRITER_XML):
+        output = apply_colors_to_file2(
+            source_path,
+            SOURCE_SHEET,
+            target_path,
+            TARGET_SHEET,
+            writer=writer,
+            use_cache=False,
+            paint_mode=paint_mode,
+            output_path=str(tmp_path / f"{writer}.xlsx"),
+            use_result_cache=False,
+        )
+        assert output is not None
+        fills[writer] = read_fills(output)
+
+    assert fills[WRITER_OPENPYXL]
+    assert fills[WRITER_XML] == fills[WRITER_OPENPYXL]
+
+
+def test_unmatched_rows_are_not_coloured(tmp_path, source_path, target_path):
+    output = apply_colors_to_file2(
+        source_path,
+        SOURCE_SHEET,
+        target_path,
+        TARGET_SHEET,
+        writer=WRITER_XML,
+        use_cache=False,
+        output_path=str(tmp_path / "sortie.xlsx"),
+        use_result_cache=False,
+    )
+
+    coloured_rows = {row for row, _column in read_fills(output)}
+    # Ligne 4 : clé absente de la source ; ligne 6 : clé source non colorée
+    assert coloured_rows == {2, 3, 5}
+
+
+def test_parallel_sheets_with_buffer_target(source_path, target_path, monkeypatch):
+    workbook = load_workbook(target_path)
+    workbook.copy_worksheet(workbook[TARGET_SHEET]).title = "Copie"
+    workbook.save(target_path)
+    data_colors = get_implantation_colors(source_path, SOURCE_SHEET)
+
+    def patch_in_parallel(*args, **kwargs):
+        raise AssertionError("tampon transmis aux processus")
+
+    # Cible en mémoire : recoloration dans ce processus
+    monkeypatch.setattr(logic, "patch_sheets_in_parallel", patch_in_parallel)
+
+    with open(target_path, "rb") as file:
+        content = apply_color_map_to_bytes(
+            data_colors,
+            file.read(),
+            [TARGET_SHEET, "Copie"],
+            writer=WRITER_XML,
+            parallel_sheets=True,
+        )
+
+    assert content is not None
+    output = io.BytesIO(content)
+    assert read_fills(output, "Copie") == read_fills(output, TARGET_SHEET)
+    assert read_fills(output, "Copie")
+
+
+# Nuances du thème Office 2013 affichées par Excel pour accent1 (4472C4),
+# avec les tints que Excel enregistre dans le classeur
+@pytest.mark.parametrize(
+    "base, tint, expected",
+    [
+        ("4472C4", -0.499984740745262, "203864"),
+        ("4472C4", -0.249977111117893, "2F5597"),
+        ("4472C4", 0.399975585192419, "8FAADC"),
+        ("4472C4", 0.599993896298105, "B4C7E7"),
+        ("4472C4", 0.799981688894314, "DAE3F3"),
+        ("FFFFFF", -0.249977111117893, "BFBFBF"),
+        ("000000", 0.249977111117893, "404040"),
+        ("000000", 0.5, "808080"),
+    ],
+)
+def test_apply_tint_matches_excel(base, tint, expected):
+    assert apply_tint(hex_to_rvb(base), tint) == hex_to_rvb(expected)
+
+
+def test_apply_tint_zero_keeps_colour():
+    assert apply_tint((68, 114, 196), 0) == (68, 114, 196)
+
+
+_THEME = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<a:theme xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" name="T">
+<a:themeElements><a:clrScheme name="T">
+<a:dk1><a:sysClr val="windowText" lastClr="101010"/></a:dk1>
+<a:lt1><a:sysClr val="window" lastClr="FEFEFE"/></a:lt1>
+<a:dk2><a:srgbClr val="44546A"/></a:dk2>
+<a:lt2><a:srgbClr val="E7E6E6"/></a:lt2>
+<a:accent1><a:srgbClr val="4472C4"/></a:accent1>
+</a:clrScheme></a:themeElements></a:theme>
+"""
+
+
+def test_theme_system_colours_and_scheme_order(tmp_path):
+    path = tmp_path / "theme.xlsx"
+    with zipfile.ZipFile(path, "w") as package:
+        package.writestr("xl/theme/theme1.xml", _THEME)
+
+    theme_colors = extract_theme_colors(str(path))
+
+    # Indices des cellules : lt1 (0), dk1 (1), lt2 (2), dk2 (3), puis accents
+    assert THEME_SCHEME_ORDER == {0: 1, 1: 0, 2: 3, 3: 2}
+    assert theme_colors == {
+        0: "FEFEFE",
+        1: "101010",
+        2: "E7E6E6",
+        3: "44546A",
+        4: "4472C4",
+    }
+
+
+def test_indexed_palette():
+    assert hex_to_rvb(_indexed_color(10)) == (255, 0, 0)
+    assert _indexed_color(64) == "000000"
+    assert _indexed_color(65) == "FFFFFF"
+    assert _indexed_color(10, ["FF000000"] * 11) == "FF000000"
+    assert _indexed_color(99) is None
+
+
+@pytest.mark.parametrize("engine", [ENGINE_OPENPYXL, ENGINE_READONLY, ENGINE_XML])
+def test_engines_resolve_theme_tint_and_indexed_fills(tmp_path, engine):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = SOURCE_SHEET
+    sheet.append(["Implantation", "Nom", "Prénom"])
+    fills = [
+        Color(indexed=10),
+        # Thème Office d'openpyxl : lt1 = window (FFFFFF), accent1 = 4F81BD
+        Color(theme=0),
+        Color(theme=4, tint=-0.5),
+    ]
+    for row, color in enumerate(fills, start=2):
+        sheet.append(["Wavre", f"Nom{row}", "Jean"])
+        sheet.cell(row=row, column=1).fill = PatternFill("solid", fgColor=color)
+    path = tmp_path / "source.xlsx"
+    workbook.save(path)
+
+    assert dict(get_implantation_colors(str(path), SOURCE_SHEET, engine)) == {
+        ("Wavre", "Nom2", "Jean"): (255, 0, 0),
+        ("Wavre", "Nom3", "Jean"): (255, 255, 255),
+        ("Wavre", "Nom4", "Jean"): (0x25, 0x40, 0x61),
+    }
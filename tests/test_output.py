@@ -0,0 +1,37 @@
+"""Tests de l'écriture atomique des fichiers de sortie."""
+
+import os
+
+import pytest
+
+from colorexcel.output import AtomicOutput
+
+
+def test_failed_commit_discards_temporary_file(tmp_path):
+    # Une destination qui est un dossier non vide fait échouer os.replace
+    destination = tmp_path / "sortie.xlsx"
+    destination.mkdir()
+    (destination / "occupé").write_text("")
+    output = AtomicOutput(destination)
+    with open(output.target, "wb") as file:
+        file.write(b"contenu")
+
+    with pytest.raises(OSError):
+        output.commit()
+    assert not output.committed
+    output.discard()
+
+    assert not os.path.exists(output.target)
+
+
+def test_commit_moves_file(tmp_path):
+    destination = tmp_path / "sortie.xlsx"
+    output = AtomicOutput(destination)
+    with open(output.target, "wb") as file:
+        file.write(b"contenu")
+
+    assert output.commit() == str(destination)
+    assert output.committed
+    output.discard()
+
+    assert destination.read_bytes() == b"contenu"
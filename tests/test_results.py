@@ -0,0 +1,125 @@
+"""Tests du cache des résultats adressé par le contenu."""
+
+import os
+
+import pytest
+
+from colorexcel import logic
+from colorexcel.logic import (
+    PAINT_CELLS,
+    PAINT_ROW,
+    WRITER_XML,
+    apply_colors_to_file2,
+)
+from colorexcel.matching import NORMALIZATIONS
+from colorexcel.results import ResultCache, result_key, sources_digest
+
+from .conftest import SOURCE_SHEET, TARGET_SHEET, read_fills
+
+
+def _key(source_path, target_path, **options):
+    options = {"paint_mode": PAINT_CELLS, "normalization": None, **options}
+    return result_key(
+        sources_digest([(source_path, SOURCE_SHEET)]),
+        target_path,
+        TARGET_SHEET,
+        **options,
+    )
+
+
+def _run(source_path, target_path, output, use_result_cache=True):
+    return apply_colors_to_file2(
+        source_path,
+        SOURCE_SHEET,
+        target_path,
+        TARGET_SHEET,
+        writer=WRITER_XML,
+        use_cache=False,
+        output_path=str(output),
+        use_result_cache=use_result_cache,
+    )
+
+
+def _no_pipeline(monkeypatch):
+    def apply_color_map(*args, **kwargs):
+        raise AssertionError("traitement complet au lieu du cache")
+
+    monkeypatch.setattr(logic, "apply_color_map", apply_color_map)
+
+
+def test_key_changes_with_one_byte_of_the_target(source_path, target_path):
+    key = _key(source_path, target_path)
+    assert _key(source_path, target_path) == key
+
+    with open(target_path, "r+b") as file:
+        file.seek(-1, os.SEEK_END)
+        last = file.read(1)
+        file.seek(-1, os.SEEK_END)
+        file.write(bytes([last[0] ^ 1]))
+
+    assert _key(source_path, target_path) != key
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{"paint_mode": PAINT_ROW}, {"normalization": NORMALIZATIONS["standard"]}],
+)
+def test_key_changes_with_options(source_path, target_path, options):
+    assert _key(source_path, target_path, **options) != _key(source_path, target_path)
+
+
+def test_hit_after_identical_run(tmp_path, source_path, target_path, monkeypatch):
+    first = _run(source_path, target_path, tmp_path / "premier.xlsx")
+    _no_pipeline(monkeypatch)
+
+    second = _run(source_path, target_path, tmp_path / "second.xlsx")
+
+    assert second == str(tmp_path / "second.xlsx")
+    assert read_fills(second) == read_fills(first)
+
+
+def test_bypass_runs_the_pipeline(tmp_path, source_path, target_path, monkeypatch):
+    _run(source_path, target_path, tmp_path / "premier.xlsx")
+    _no_pipeline(monkeypatch)
+
+    with pytest.raises(AssertionError):
+        _run(
+            source_path,
+            target_path,
+            tmp_path / "second.xlsx",
+            use_result_cache=False,
+        )
+
+
+def test_miss_stores_nothing_without_opt_in(tmp_path, source_path, target_path):
+    _run(source_path, target_path, tmp_path / "sortie.xlsx", use_result_cache=False)
+
+    assert not (tmp_path / "cache" / "results").exists()
+
+
+def test_get_and_put(tmp_path):
+    cache = ResultCache(directory=tmp_path / "resultats")
+    result = tmp_path / "resultat.xlsx"
+    result.write_bytes(b"contenu")
+
+    assert cache.get("cle", str(tmp_path / "absent.xlsx")) is None
+    cache.put("cle", str(result))
+    copy = cache.get("cle", str(tmp_path / "copie.xlsx"))
+
+    assert copy == str(tmp_path / "copie.xlsx")
+    assert (tmp_path / "copie.xlsx").read_bytes() == b"contenu"
+
+
+def test_evict_respects_max_bytes(tmp_path):
+    cache = ResultCache(directory=tmp_path / "resultats", max_bytes=25)
+    for index, name in enumerate(("ancien", "moyen", "recent")):
+        result = tmp_path / f"{name}.xlsx"
+        result.write_bytes(bytes(10))
+        cache.put(name, str(result))
+        entry = cache._entry_path(name)
+        os.utime(entry, ns=(index * 10**9, index * 10**9))
+    cache.evict()
+
+    kept = sorted(entry.stem for entry in cache.directory.glob("*.result"))
+    assert kept == ["moyen", "recent"]
+    assert sum(entry.stat().st_size for entry in cache.directory.iterdir()) <= 25
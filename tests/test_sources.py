@@ -0,0 +1,62 @@
+"""Tests de la fusion de plusieurs sources et du rapport des conflits."""
+
+import csv
+
+import pytest
+
+from colorexcel.colormap import ColorMap
+from colorexcel.dryrun import CSV_DELIMITER
+from colorexcel.sources import (
+    CONFLICTS_CSV_HEADER,
+    PRECEDENCE_FIRST,
+    PRECEDENCE_LAST,
+    SourceConflict,
+    merge_color_maps,
+    write_conflicts_csv,
+)
+
+from .conftest import BLUE, GREEN, RED
+
+DUPONT = ("Wavre", "Dupont", "Jean")
+MARTIN = ("Wavre", "Martin", "Claire")
+LAMBERT = ("Nivelles", "Lambert", "Marc")
+
+SOURCES = [("nord.xlsx", "Source"), ("sud.xlsx", "Source")]
+
+
+def _maps():
+    return [
+        ColorMap([(DUPONT, RED), (MARTIN, GREEN)]),
+        # Même clé colorée autrement ; MARTIN répété avec la même couleur
+        {DUPONT: BLUE, MARTIN: GREEN, LAMBERT: BLUE},
+    ]
+
+
+@pytest.mark.parametrize(
+    "precedence, kept, color",
+    [(PRECEDENCE_FIRST, 0, RED), (PRECEDENCE_LAST, 1, BLUE)],
+)
+def test_merge_precedence_and_conflicts(precedence, kept, color):
+    merged, conflicts = merge_color_maps(_maps(), precedence)
+
+    assert dict(merged.items()) == {DUPONT: color, MARTIN: GREEN, LAMBERT: BLUE}
+    assert conflicts == [SourceConflict(DUPONT, ((0, RED), (1, BLUE)), kept)]
+
+
+def test_merge_rejects_unknown_precedence():
+    with pytest.raises(ValueError):
+        merge_color_maps(_maps(), "milieu")
+
+
+def test_conflicts_csv(tmp_path):
+    _merged, conflicts = merge_color_maps(_maps(), PRECEDENCE_LAST)
+    csv_path = tmp_path / "conflits.csv"
+
+    assert write_conflicts_csv(SOURCES, conflicts, str(csv_path)) == str(csv_path)
+
+    with open(csv_path, newline="", encoding="utf-8-sig") as csv_file:
+        rows = list(csv.reader(csv_file, delimiter=CSV_DELIMITER))
+    assert rows == [
+        list(CONFLICTS_CSV_HEADER),
+        [*DUPONT, "#0070C0", "sud.xlsx [Source]", "nord.xlsx [Source]=#FF0000"],
+    ]
@@ -0,0 +1,101 @@
+"""Tests du mode surveillance, par scrutation du système de fichiers."""
+
+import os
+import threading
+
+from colorexcel.logic import WRITER_XML
+from colorexcel.watch import Debouncer, PollingWatcher, WatchService
+
+from .conftest import (
+    SOURCE_SHEET,
+    TARGET_ROWS,
+    TARGET_SHEET,
+    read_fills,
+    write_target,
+)
+
+
+def test_debouncer_waits_for_quiet_period():
+    debouncer = Debouncer(delay=2.0)
+    debouncer.add(["a", "b"], now=10.0)
+    debouncer.add(["b"], now=11.0)
+
+    assert debouncer.ready(11.9) == []
+    assert debouncer.ready(12.0) == ["a"]
+    assert len(debouncer) == 1
+    assert debouncer.ready(12.5) == []
+    assert debouncer.ready(13.0) == ["b"]
+    assert len(debouncer) == 0
+
+
+def test_polling_watcher_reports_create_modify_delete(tmp_path):
+    source = tmp_path / "source.xlsx"
+    source.write_bytes(b"source")
+    targets = tmp_path / "cibles"
+    targets.mkdir()
+    watcher = PollingWatcher([str(source)], str(targets))
+    watcher.start()
+    assert watcher.changes() == set()
+
+    target = targets / "cible.xlsx"
+    target.write_bytes(b"v1")
+    (targets / "~$cible.xlsx").write_bytes(b"verrou")
+    (targets / "notes.txt").write_bytes(b"texte")
+    assert watcher.changes() == {os.path.normcase(str(target))}
+
+    target.write_bytes(b"version 2")
+    source.write_bytes(b"source v2")
+    assert watcher.changes() == {
+        os.path.normcase(str(target)),
+        os.path.normcase(str(source)),
+    }
+
+    target.unlink()
+    assert watcher.changes() == {os.path.normcase(str(target))}
+    assert watcher.changes() == set()
+
+
+def test_service_recolours_dropped_target(tmp_path, source_path):
+    targets = tmp_path / "cibles"
+    targets.mkdir()
+    out_dir = tmp_path / "sorties"
+    results = []
+    done = threading.Event()
+
+    def on_result(target, output, seconds, error):
+        results.append((target, output, error))
+        done.set()
+
+    service = WatchService(
+        [(source_path, SOURCE_SHEET)],
+        str(targets),
+        str(out_dir),
+        target_sheet=[TARGET_SHEET],
+        options={"writer": WRITER_XML},
+        result_cache=False,
+        use_cache=False,
+        workers=1,
+        debounce=0.2,
+        poll_interval=0.05,
+        polling=True,
+        on_result=on_result,
+    )
+    stop_event = threading.Event()
+    thread = threading.Thread(target=service.run, args=(stop_event,))
+    thread.start()
+    try:
+        # Cible déposée une fois la surveillance démarrée
+        while service.data_colors is None and thread.is_alive():
+            stop_event.wait(0.05)
+        target = write_target(targets / "cible.xlsx", TARGET_ROWS)
+        assert done.wait(60)
+    finally:
+        stop_event.set()
+        thread.join(60)
+
+    assert not thread.is_alive()
+    [(processed, output, error)] = results
+    assert processed == os.path.normcase(os.path.abspath(target))
+    assert error is None
+    assert output == str(out_dir / "cible_colored.xlsx")
+    assert {row for row, _column in read_fills(output)} == {2, 3, 5}